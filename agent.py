@@ -1,14 +1,23 @@
 # agent.py
 #agent.py
 import pygame
-import heapq  # For priority queue in UCS and A* algorithms
+from collections import deque  # O(1) pops from the front of the planned path and the tour
+from search import SearchSpace, best_first_search, bidirectional_search, merge_stats, new_stats  # Shared search core for UCS and A*
+from tour import TourPlanner  # Multi-task tour planning
+from dstar import DStarLite  # Incremental replanning
+from jps import jump_point_search  # Jump Point Search for the uniform-cost grid
+from hpa import HierarchicalPlanner  # Hierarchical pathfinding for very large maps
+from anytime import AnytimeSearch  # ARA*, improved while the agent walks
+
+
+WEIGHTED_ALGORITHMS = ("UCS", "A*", "ALT")  # Planners that choose paths by the terrain costs; the others plan unit-cost paths
 
 
 
 
 class Agent(pygame.sprite.Sprite):
-    def __init__(self, environment, grid_size):
-        """Initialize the agent."""
+    def __init__(self, environment, grid_size, path_cache=None, instrumentation=None):
+        """Initialize the agent, optionally sharing a PathCache with other agents and reporting to an Instrumentation."""
         super().__init__()  # Initialize the parent class (pygame.sprite.Sprite)
        
         # Set up the agent's visual representation (a blue square)
@@ -19,6 +28,13 @@ class Agent(pygame.sprite.Sprite):
         # Assign environment and grid properties
         self.grid_size = grid_size  # Grid size (defines the size of each square cell in the grid)
         self.environment = environment  # Store the environment to access tasks, barriers, etc.
+        self._search_space = None  # Per-cell arrays reused by every search, allocated on first use
+        self._backward_search_space = None  # Arrays for the backward half of bidirectional searches
+        self._anytime_search_space = None  # Arrays of the ARA* search, kept while it improves
+        self.path_cache = path_cache  # Optional cache of planned paths keyed by map version
+        self.instrumentation = instrumentation  # Optional collector of per-call search metrics
+        self._tour_planner = None  # Plans the task order in "Tour" mode (keeps its distance cache across resets)
+        self._hierarchical_planner = None  # Cluster graph of "HPA*" mode, built on first use
 
 
         # Agent state
@@ -26,9 +42,56 @@ class Agent(pygame.sprite.Sprite):
         self.rect.topleft = (0, 0)  # Set the top-left corner of the agent’s rectangle to (0, 0)
         self.task_completed = 0  # Count of tasks the agent has completed
         self.completed_tasks = []  # List to store completed tasks along with their costs
-        self.path = []  # List to store the planned path (a sequence of grid coordinates)
+        self.path = deque()  # Queue of the planned path (a sequence of grid coordinates)
         self.moving = False  # Flag to check if the agent is currently moving
         self.total_path_cost = 0  # Total cost of all tasks completed by the agent (used for performance tracking)
+        self.search_stats = new_stats()  # Work done by the searches (used for benchmarking)
+        self.tour = deque()  # Remaining tasks of the optimized tour, in visiting order
+        self.algorithm = None  # Algorithm of the current leg
+        self.incremental_planner = None  # D* Lite planner kept between calls
+        self.anytime_search = None  # ARA* search of the current leg, improved by improve_path
+        self.replan_needed = False  # Set when barriers changed under the planned path
+        environment.subscribe(self.on_map_change)  # Get notified when barriers change at runtime
+
+
+    @property
+    def search_space(self):
+        """Per-cell search arrays, allocated on first use so large fleets of agents stay cheap."""
+        if self._search_space is None:
+            self._search_space = SearchSpace(len(self.environment.grid))
+        return self._search_space
+
+
+    @property
+    def backward_search_space(self):
+        """Per-cell arrays of the backward half of bidirectional searches, allocated on first use."""
+        if self._backward_search_space is None:
+            self._backward_search_space = SearchSpace(len(self.environment.grid))
+        return self._backward_search_space
+
+
+    @property
+    def anytime_search_space(self):
+        """Per-cell arrays of ARA* searches, allocated on first use and reused by every leg."""
+        if self._anytime_search_space is None:
+            self._anytime_search_space = SearchSpace(len(self.environment.grid))
+        return self._anytime_search_space
+
+
+    @property
+    def tour_planner(self):
+        """The tour planner of "Tour" mode, created on first use."""
+        if self._tour_planner is None:
+            self._tour_planner = TourPlanner(self.environment)
+        return self._tour_planner
+
+
+    @property
+    def hierarchical_planner(self):
+        """The HPA* planner of "HPA*" mode, created on first use."""
+        if self._hierarchical_planner is None:
+            self._hierarchical_planner = HierarchicalPlanner(self.environment)
+        return self._hierarchical_planner
 
 
     def reset_agent(self):
@@ -37,15 +100,22 @@ class Agent(pygame.sprite.Sprite):
         self.rect.topleft = (0, 0)  # Update the agent's visual position to match its grid position
         self.task_completed = 0  # Reset the task count
         self.completed_tasks = []  # Clear the list of completed tasks
-        self.path = []  # Clear the current path
+        self.path = deque()  # Clear the current path
         self.moving = False  # Stop the agent’s movement
         self.total_path_cost = 0  # Reset the total path cost
+        self.search_stats = new_stats()  # Reset the search counters
+        self.tour = deque()  # Forget the planned tour
+        self.algorithm = None  # No leg is planned
+        self.anytime_search = None  # No leg to improve
+        self.replan_needed = False  # Nothing to replan
 
 
     def move(self):
         """Move the agent one step along its planned path."""
+        if self.path and self.replan_needed:  # The barriers changed under the planned path
+            self.replan()
         if self.path:  # Check if there is a planned path
-            next_position = self.path.pop(0)  # Get the next position in the path
+            next_position = self.path.popleft()  # Get the next position in the path
             self.position = list(next_position)  # Update the agent's position
             self.rect.topleft = (self.position[0] * self.grid_size, self.position[1] * self.grid_size)  # Update visual position
             self.check_task_completion()  # Check if the agent reached a task location
@@ -56,41 +126,201 @@ class Agent(pygame.sprite.Sprite):
     def check_task_completion(self):
         """Check if the agent has reached a task location and mark it as completed."""
         position_tuple = tuple(self.position)  # Convert position to a tuple for comparison
-        if position_tuple in self.environment.task_locations:  # Check if the agent is on a task location
-            task_number = self.environment.task_locations.pop(position_tuple)  # Remove the task from the environment
+        task_number = self.environment.complete_task(position_tuple, self)  # Remove the task unless another agent owns it
+        if task_number is not None:  # The agent completed a task
             self.task_completed += 1  # Increment the task completion counter
             self.completed_tasks.append((task_number, self.total_path_cost))  # Record the task number and total cost
 
 
     def plan_tasks(self, algorithm):
-        """Plan a path to the nearest task using the selected algorithm."""
+        """Plan a path to the next task using the selected algorithm."""
         start = tuple(self.position)  # Current position of the agent (as a tuple)
-        nearest_task = self.find_nearest_task()  # Find the nearest task to the agent
-
-
+        nearest_task = self.next_target(algorithm, start)  # The task of the next leg
         if nearest_task:  # If there is a task to plan for
-            tasks = [nearest_task]  # List of tasks to target (only one task in this case)
-            barriers = self.environment.barrier_locations  # Get the list of barriers (obstacles on the grid)
-
-
-            # Select the path planning algorithm based on the input
-            if algorithm == "UCS":  # If Uniform Cost Search is selected
-                self.path, cost = self.uniform_cost_search(start, tasks, barriers)  # Plan the path with UCS
-            elif algorithm == "A*":  # If A* Search is selected
-                self.path, cost = self.a_star_search(start, tasks, barriers)  # Plan the path with A*
-
-
-            # Update the agent's total path cost and set the agent to start moving
-            self.total_path_cost += cost  # Add the path cost to the total cost
-            self.moving = True  # Enable movement
+            path, cost = self.plan_path(algorithm, start, nearest_task)  # Plan the leg
+            self.start_leg(algorithm, path, cost)  # Start moving along it
+
+
+    def next_target(self, algorithm, start, stats=None):
+        """Return the task of the next leg, or None if no task remains; tour planning counts into stats if given."""
+        if algorithm == "Tour":  # The tour decides the order of all tasks at once
+            return self.next_tour_task(start, stats)  # Next task of the optimized tour
+        return self.find_nearest_task()  # Find the nearest task to the agent
+
+
+    def start_leg(self, algorithm, path, cost):
+        """Follow a planned leg, e.g. one planned in the background by a BackgroundPlanner."""
+        self.algorithm = algorithm  # Remember the algorithm for replanning on barrier changes
+        self.path = deque(path)  # The cells of the leg
+
+
+        # Update the agent's total path cost and set the agent to start moving
+        self.total_path_cost += cost  # Add the path cost to the total cost
+        self.moving = True  # Enable movement
+
+
+    def plan_path(self, algorithm, start, target, stats=None):
+        """
+        Plan the path from start to one task with the selected algorithm, reporting the call to the instrumentation if set.
+
+        The work is added to stats, by default the agent's search_stats. A
+        BackgroundPlanner passes counters of its own, so its worker thread never
+        touches search_stats, which the window may reset meanwhile.
+        """
+        totals = self.search_stats if stats is None else stats
+        if self.instrumentation is None:
+            return self._plan_path(algorithm, start, target, totals)
+        stats = new_stats()  # Count this call on its own
+        token = self.instrumentation.begin()
+        try:
+            path, cost = self._plan_path(algorithm, start, target, stats)
+        finally:
+            merge_stats(totals, stats)
+        self.instrumentation.end(token, algorithm, stats, bool(path) or start == target)
+        return path, cost
+
+
+    def _plan_path(self, algorithm, start, target, stats):
+        """Plan the path from start to one task with the selected algorithm, using the path cache if set."""
+        tasks = [target]  # List of tasks to target (only one task in this case)
+        barriers = self.environment.barrier_locations  # Get the list of barriers (obstacles on the grid)
+
+
+        # Reuse a path planned earlier on the same map if there is one. ARA* legs are never cached: a
+        # cached first path would skip anytime_plan, leaving no search for improve_path to refine.
+        use_cache = self.path_cache is not None and algorithm != "ARA*"
+        cache_key = (self.environment.version, start, target, algorithm)
+        cached = self.path_cache.get(cache_key) if use_cache else None
+        if cached is not None:
+            return cached
+
+
+        # Select the path planning algorithm based on the input
+        path, cost = [], 0
+        if algorithm == "UCS":  # If Uniform Cost Search is selected
+            path, cost = self.uniform_cost_search(start, tasks, barriers, stats)  # Plan the path with UCS
+        elif algorithm == "A*":  # If A* Search is selected
+            path, cost = self.a_star_search(start, tasks, barriers, stats=stats)  # Plan the path with A*
+        elif algorithm == "ALT":  # If A* with landmark heuristics is selected
+            path, cost = self.a_star_search(start, tasks, barriers, True, stats)  # Plan with the precomputed landmarks
+        elif algorithm in ("Bi-UCS", "Bi-A*"):  # If a bidirectional search is selected
+            path, cost = self.bidirectional_search(start, tasks, barriers, algorithm == "Bi-A*", stats)  # Search from both ends
+        elif algorithm == "JPS":  # If Jump Point Search is selected
+            path, cost = self.jump_point_search(start, tasks, barriers, stats)  # Plan the path with JPS
+        elif algorithm == "HPA*":  # If hierarchical pathfinding is selected
+            path, cost = self.hierarchical_planner.plan(start, target, stats)  # Plan on the cluster graph
+        elif algorithm == "Tour":  # If the optimized tour is selected
+            path, cost = self.tour_planner.leg(start, target, stats)  # Follow the cached distance field
+        elif algorithm == "D* Lite":  # If incremental replanning is selected
+            path, cost = self.incremental_search(start, target, stats)  # Plan or repair with D* Lite
+        elif algorithm == "ARA*":  # If anytime search is selected
+            path, cost = self.anytime_plan(start, target, stats)  # First bounded-suboptimal path, improved later
+        if path and algorithm not in WEIGHTED_ALGORITHMS and self.environment.max_cost > 1:
+            cost = self.environment.path_cost(path)  # The planner ignored the terrain; charge what the path really costs
+        if use_cache:
+            self.path_cache.put(cache_key, path, cost)  # Remember the result for identical requests
+        return path, cost
+
+
+    def incremental_search(self, start, target, stats=None):
+        """Plan with the D* Lite planner kept for the current target, creating it for a new target."""
+        stats = self.search_stats if stats is None else stats
+        goal = self.environment.cell_id(*target)
+        if self.incremental_planner is None or self.incremental_planner.goals != {goal}:
+            if self.incremental_planner is not None:
+                self.incremental_planner.close()  # Stop repairing the search for the old target
+            self.incremental_planner = DStarLite(self.environment, [target], stats)
+        self.incremental_planner.stats = stats  # The counters are replaced on reset
+        return self.incremental_planner.plan(start)
+
+
+    def anytime_plan(self, start, target, stats=None):
+        """Find a first path with ARA*, at most INITIAL_EPSILON times the optimum; improve_path refines it."""
+        stats = self.search_stats if stats is None else stats
+        search = self.anytime_search = AnytimeSearch(self.environment, start, target, stats=stats,
+                                                     space=self.anytime_search_space)
+        search.improve()  # Run until the first path is published
+        if not search.path:
+            return [], 0  # No path found
+        return list(search.path), search.cost
+
+
+    def improve_path(self, budget):
+        """
+        Spend up to budget seconds improving the current ARA* leg.
+
+        The better path still starts where the leg started, so the agent only
+        switches to it if it stands on that path and the rest is shorter.
+
+        Args:
+            budget (float): Seconds to spend.
+
+        Returns:
+            bool: True if the agent switched to a shorter path.
+        """
+        search = self.anytime_search
+        if search is None or search.done or self.algorithm != "ARA*" or not self.path:
+            return False
+        if search.version != self.environment.version:
+            self.anytime_search = None  # The barriers changed; replanning takes care of the leg
+            return False
+        search.stats = self.search_stats  # The counters are replaced on reset
+        if not search.improve(budget) or search.path[-1] != self.path[-1]:
+            return False
+        position = tuple(self.position)
+        if self.environment.cell_id(*position) == search.source:
+            remaining = list(search.path)
+        elif position in search.path:
+            remaining = search.path[search.path.index(position) + 1:]
+        else:
+            return False  # The agent already left the improved path
+        saving = self.environment.path_cost(self.path) - self.environment.path_cost(remaining)
+        if saving <= 0:
+            return False
+        self.total_path_cost -= saving
+        self.path = deque(remaining)
+        return True
+
+
+    def on_map_change(self, environment, changed):
+        """Mark the remaining path for replanning when the barriers changed under it."""
+        if not self.path:
+            return
+        if self.algorithm == "D* Lite":  # Repairing is cheap and may also find a shorter path
+            self.replan_needed = True
+        elif any(environment.is_barrier(x, y) for x, y in self.path):  # A new barrier blocks the path
+            self.replan_needed = True
+        elif self.algorithm in WEIGHTED_ALGORITHMS and not set(changed).isdisjoint(self.path):  # Terrain costs changed on the path
+            self.replan_needed = True
+
+
+    def replan(self):
+        """Replan the rest of the current leg from the agent's position."""
+        self.replan_needed = False
+        target = self.path[-1]  # The leg still ends at the same task
+        remaining = self.environment.path_cost(self.path)  # Cost of the moves not taken
+        path, cost = self.plan_path(self.algorithm, tuple(self.position), target)
+        self.path = deque(path)
+        self.total_path_cost += cost - remaining  # Replace the old remainder with the new one
+
+
+    def next_tour_task(self, start, stats=None):
+        """Return the next task of the optimized tour, planning the tour when the tasks changed."""
+        tasks = self.environment.task_locations
+        while self.tour and self.tour[0] not in tasks:
+            self.tour.popleft()  # Completed on the way to the previous task
+        if len(self.tour) != len(tasks):  # Tasks completed further along the tour, new tasks or no tour yet
+            self.tour = deque(task for task in self.tour if task in tasks)
+            if len(self.tour) != len(tasks):
+                order = self.tour_planner.plan_order(start, tasks.keys(), self.search_stats if stats is None else stats)
+                self.tour = deque(order)
+        return self.tour.popleft() if self.tour else None
 
 
     def find_nearest_task(self):
         """Find the nearest task location based on Manhattan distance."""
-        if not self.environment.task_locations:  # If no tasks remain
-            return None
-        # Find the task that is closest to the current position using Manhattan distance
-        return min(self.environment.task_locations.keys(), key=lambda t: abs(t[0] - self.position[0]) + abs(t[1] - self.position[1]))
+        nearest = self.environment.nearest_tasks(self.position)  # Spatial index query instead of a scan over every task
+        return nearest[0] if nearest else None  # None if no tasks remain
 
 
     def is_done(self):
@@ -98,71 +328,46 @@ class Agent(pygame.sprite.Sprite):
         return len(self.environment.task_locations) == 0  # Return True if no tasks remain
 
 
-    def uniform_cost_search(self, start, tasks, barriers):
+    def uniform_cost_search(self, start, tasks, barriers, stats=None):
         """Uniform Cost Search (UCS) to find the shortest path to a task."""
-        queue = [(0, start, [])]  # Priority queue with (cost, current_position, path)
-        visited = set()  # Set to keep track of visited nodes
-
-
-        while queue:  # Continue until the queue is empty
-            cost, current, path = heapq.heappop(queue)  # Get the node with the lowest cost
-            if current in visited:  # Skip if the node has already been visited
-                continue
-            visited.add(current)  # Mark the node as visited
-
-
-            path = path + [current]  # Extend the current path with the current node
-
-
-            if current in tasks:  # If a task is found
-                return path[1:], cost  # Return the path (excluding the start position) and cost
-
-
-            # Explore the neighbors of the current node
-            for neighbor in self.get_neighbors(current, barriers):  # Get valid neighbors
-                if neighbor not in visited:  # Only add unvisited neighbors to the queue
-                    heapq.heappush(queue, (cost + 1, neighbor, path))  # Add the neighbor to the priority queue with updated cost
-
-
-        return [], 0  # Return empty path and zero cost if no path is found
-
-
-    def a_star_search(self, start, tasks, barriers):
-        """A* Search to find the shortest path to a task."""
-        def heuristic(a, b):
-            """Heuristic function: Manhattan distance between two points."""
-            return abs(a[0] - b[0]) + abs(a[1] - b[1])
-
-
-        queue = [(0, start, [])]  # Priority queue with (f_cost, current_position, path)
-        visited = set()  # Set to keep track of visited nodes
-        g_costs = {start: 0}  # Dictionary to store the g_cost (cost from start to each node)
+        grid = self.environment.grid_for(barriers)  # Occupancy grid matching the barriers
+        stats = self.search_stats if stats is None else stats
+        return best_first_search(self.environment, self.search_space, start, tasks, grid, stats=stats,
+                                 weighted=True)  # Search without a heuristic, paying the terrain costs
 
 
-        while queue:  # Continue until the queue is empty
-            _, current, path = heapq.heappop(queue)  # Get the node with the lowest f_cost
-            if current in visited:  # Skip if the node has already been visited
-                continue
-            visited.add(current)  # Mark the node as visited
+    def a_star_search(self, start, tasks, barriers, landmarks=False, stats=None):
+        """A* Search to find the shortest path to a task; with landmarks, guided by the environment's ALT table."""
+        stride = self.environment.stride
+        goals = [tuple(task) for task in tasks]
+        padded_goals = [divmod(self.environment.cell_id(*goal), stride) for goal in goals]  # Goals in padded coordinates
 
 
-            path = path + [current]  # Extend the current path with the current node
+        def heuristic(cell):
+            """Heuristic function: Manhattan distance to the closest task; every move costs at least 1."""
+            x, y = divmod(cell, stride)
+            return min(abs(x - gx) + abs(y - gy) for gx, gy in padded_goals)
 
 
-            if current in tasks:  # If a task is found
-                return path[1:], g_costs[current]  # Return the path (excluding the start position) and g_cost
+        if landmarks and barriers is self.environment.barrier_locations:  # The tables only hold for the environment's own map
+            heuristic = self.environment.landmark_table().heuristic(goals, start)
+        grid = self.environment.grid_for(barriers)  # Occupancy grid matching the barriers
+        return best_first_search(self.environment, self.search_space, start, goals, grid, heuristic=heuristic,
+                                 stats=self.search_stats if stats is None else stats, weighted=True)  # Search guided by the heuristic
 
 
-            # Explore the neighbors of the current node
-            for neighbor in self.get_neighbors(current, barriers):  # Get valid neighbors
-                tentative_g_cost = g_costs[current] + 1  # Calculate tentative g_cost for the neighbor
-                if neighbor not in g_costs or tentative_g_cost < g_costs[neighbor]:  # If a better g_cost is found
-                    g_costs[neighbor] = tentative_g_cost  # Update g_cost
-                    f_cost = tentative_g_cost + min(heuristic(neighbor, task) for task in tasks)  # Calculate f_cost
-                    heapq.heappush(queue, (f_cost, neighbor, path))  # Add the neighbor to the priority queue
+    def bidirectional_search(self, start, tasks, barriers, use_heuristic=False, stats=None):
+        """Bidirectional UCS, or bidirectional A* with use_heuristic, to find the shortest path to a task."""
+        grid = self.environment.grid_for(barriers)  # Occupancy grid matching the barriers
+        return bidirectional_search(self.environment, self.search_space, self.backward_search_space, start, tasks, grid,
+                                    use_heuristic, stats=self.search_stats if stats is None else stats)  # Searches meet in the middle
 
 
-        return [], 0  # Return empty path and zero cost if no path is found
+    def jump_point_search(self, start, tasks, barriers, stats=None):
+        """Jump Point Search (JPS) to find the shortest path to a task."""
+        grid = self.environment.grid_for(barriers)  # Occupancy grid matching the barriers
+        return jump_point_search(self.environment, self.search_space, start, tasks, grid,
+                                 stats=self.search_stats if stats is None else stats)  # Jumps between jump points, returns every cell
 
 
     def get_neighbors(self, position, barriers):
@@ -0,0 +1,196 @@
+# anytime.py
+"""
+Anytime Repairing A* (ARA*) on the Environment's occupancy grid.
+
+The search starts as weighted A* with an inflated heuristic,
+f = g + epsilon * h. That quickly finds a path costing at most epsilon times
+the optimum. Epsilon is then lowered step by step and the search is repaired,
+reusing the g-costs found so far, until epsilon reaches 1 and the path is
+optimal. improve(budget) works in time slices and returns when the budget is
+spent, so a window can keep its frame rate while the path gets better.
+
+g-costs, parents and closed marks live in a SearchSpace that the agent
+reuses across legs, so no slice pays for allocating or growing per-cell
+storage. Between iterations the open cells are re-keyed in time slices too.
+"""
+import heapq  # Binary heap used as the priority queue
+import time  # Enforce the time budget
+from search import SearchSpace, record_search  # Reusable per-cell arrays and shared search counters
+
+
+INITIAL_EPSILON = 3.0  # Heuristic inflation of the first search
+EPSILON_STEP = 0.5  # Decrease of epsilon after every published path
+CHECK_INTERVAL = 64  # Queue pops between two looks at the clock
+INFINITY = float("inf")
+
+
+class AnytimeSearch:
+    """ARA* search for one start and goal, improved in time slices."""
+
+    def __init__(self, environment, start, goal, epsilon=INITIAL_EPSILON, step=EPSILON_STEP, stats=None, space=None):
+        """
+        Create the search; no cells are expanded until improve is called.
+
+        Args:
+            environment (Environment): The environment to plan in.
+            start (tuple): The (x, y) start position.
+            goal (tuple): The (x, y) goal position.
+            epsilon (float): Heuristic inflation of the first search, at least 1.
+            step (float): Decrease of epsilon after every published path.
+            stats (dict): Optional counters from search.new_stats, updated with record_search.
+            space (SearchSpace): Reusable per-cell arrays; the search owns them until another search begins.
+        """
+        self.environment = environment  # The environment to plan in
+        self.version = environment.version  # Map version the g-costs are valid for
+        self.source = environment.cell_id(*start)  # Start cell id
+        self.target = environment.cell_id(*goal)  # Goal cell id
+        self.epsilon = max(1.0, epsilon)  # Current heuristic inflation
+        self.step = step  # Decrease of epsilon per iteration
+        self.stats = stats  # Optional search counters
+        self.space = space if space is not None else SearchSpace(len(environment.grid))  # g-costs, parents, closed marks
+        self.generation = self.space.begin()  # Stamp of the g-costs written by this search
+        self.iteration = self.generation  # Closed mark of the current iteration, a fresh generation per iteration
+        self.previous = -1  # Closed mark of the previous iteration
+        self.space.g_costs[self.source] = 0
+        self.space.parents[self.source] = -1
+        self.space.stamps[self.source] = self.generation
+        self.incons = set()  # Closed cells whose g-cost improved, reopened in the next iteration
+        self.open = [(self.key(self.source), self.source)]  # Heap of (f, cell_id) entries, possibly stale
+        self.rekey = []  # Open entries of the previous iteration still to be pushed with their new keys
+        self.path = []  # Best path found so far, excluding the start
+        self.cost = INFINITY  # Cost of that path
+        self.bound = INFINITY  # Proven bound on the ratio of the path's cost to the optimal cost
+        self.done = False  # True when the path is optimal or no path exists
+
+
+    def heuristic(self, cell):
+        """Manhattan distance from a cell to the goal."""
+        x, y = divmod(cell, self.environment.stride)
+        tx, ty = divmod(self.target, self.environment.stride)
+        return abs(x - tx) + abs(y - ty)
+
+
+    def g(self, cell):
+        """Best known cost from the start to a cell."""
+        return self.space.g_costs[cell] if self.space.stamps[cell] == self.generation else INFINITY
+
+
+    def key(self, cell):
+        """Priority of a cell in the current iteration."""
+        return self.g(cell) + self.epsilon * self.heuristic(cell)
+
+
+    def improve(self, budget=None):
+        """
+        Continue the search for up to budget seconds.
+
+        Args:
+            budget (float): Seconds to spend; None runs until the next path is published.
+
+        Returns:
+            bool: True if a better path was published.
+        """
+        deadline = None if budget is None else time.perf_counter() + budget
+        improved = False
+        while not self.done:
+            if not self._search(deadline):
+                break  # Out of time; the search resumes on the next call
+            improved = self._publish() or improved
+            if self.epsilon <= 1.0 or self.cost == INFINITY:
+                self.done = True  # Optimal, or the goal cannot be reached at all
+                break
+            self._next_iteration()
+            if deadline is None:
+                break
+        return improved
+
+
+    def _search(self, deadline):
+        """
+        Expand cells until the goal's cost cannot improve in this iteration or the deadline passes.
+
+        Returns:
+            bool: True if the iteration finished.
+        """
+        space, incons, queue, rekey = self.space, self.incons, self.open, self.rekey
+        g_costs, parents, stamps, closed = space.g_costs, space.parents, space.stamps, space.closed
+        grid, offsets = self.environment.grid, self.environment.neighbor_offsets
+        target, epsilon, heuristic = self.target, self.epsilon, self.heuristic
+        generation, iteration, previous = self.generation, self.iteration, self.previous
+        expanded = pushes = stale = pops = 0
+        finished = True
+
+
+        # Push the open cells of the previous iteration with their new keys, a slice at a time
+        while rekey and finished:
+            for _, cell in rekey[-CHECK_INTERVAL:]:
+                if closed[cell] != previous:  # Cells closed last iteration are done or already reopened
+                    heapq.heappush(queue, (g_costs[cell] + epsilon * heuristic(cell), cell))
+            del rekey[-CHECK_INTERVAL:]
+            finished = deadline is None or time.perf_counter() < deadline
+
+
+        while queue and finished:
+            pops += 1
+            if deadline is not None and pops % CHECK_INTERVAL == 0 and time.perf_counter() >= deadline:
+                finished = False
+                break
+            f, cell = queue[0]
+            if closed[cell] == iteration or f != g_costs[cell] + epsilon * heuristic(cell):  # Skip stale entries
+                heapq.heappop(queue)
+                stale += 1
+                continue
+            if stamps[target] == generation and g_costs[target] <= f:
+                break  # No open cell can lead to a cheaper path in this iteration
+            heapq.heappop(queue)
+            closed[cell] = iteration
+            expanded += 1
+            g_next = g_costs[cell] + 1  # Every move costs 1
+            for offset in offsets:
+                neighbor = cell + offset
+                if grid[neighbor] or (stamps[neighbor] == generation and g_next >= g_costs[neighbor]):
+                    continue
+                g_costs[neighbor] = g_next
+                parents[neighbor] = cell
+                stamps[neighbor] = generation
+                if closed[neighbor] == iteration:
+                    incons.add(neighbor)  # Reopened in the next iteration
+                else:
+                    heapq.heappush(queue, (g_next + epsilon * heuristic(neighbor), neighbor))
+                    pushes += 1
+        if self.stats is not None:
+            record_search(self.stats, expanded, pushes, stale, len(queue) + len(rekey))
+        return finished
+
+
+    def _publish(self):
+        """
+        Rebuild the path if this iteration found a cheaper one; the path is now within epsilon of optimal.
+
+        The cost is that of the rebuilt path, not the target's g-cost: cells on
+        the path may have got a lower g-cost after the target's was set, so the
+        parent pointers can describe a shorter path than g(target) says.
+        """
+        self.bound = self.epsilon
+        if self.g(self.target) == INFINITY:
+            return False  # The goal was not reached
+        path, cell, parents = [], self.target, self.space.parents
+        while cell != self.source:
+            path.append(self.environment.cell_position(cell))
+            cell = parents[cell]
+        cost = len(path)  # Every move costs 1
+        if cost >= self.cost:
+            return False
+        path.reverse()
+        self.path, self.cost = path, cost
+        return True
+
+
+    def _next_iteration(self):
+        """Lower epsilon and reopen the open and inconsistent cells; the open ones are re-keyed lazily by _search."""
+        self.epsilon = max(1.0, self.epsilon - self.step)
+        self.previous, self.iteration = self.iteration, self.space.begin()  # A fresh closed mark forgets the closed cells
+        self.rekey = self.open
+        self.open = [(self.key(cell), cell) for cell in self.incons]
+        heapq.heapify(self.open)
+        self.incons = set()
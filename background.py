@@ -0,0 +1,126 @@
+# background.py
+"""
+Background planning for the window.
+
+BackgroundPlanner plans an agent's next leg on a worker thread and hands
+back a future, so a long search does not block input handling and drawing.
+The window polls the future once per frame and starts the leg when it is
+ready. Cancelling (when the algorithm is toggled or the map is reset) drops
+the pending request. A search that is already running cannot be interrupted.
+It finishes on the worker and its result is discarded. Cancelling with
+wait_running also waits for it, so it cannot store its tour or ARA* search in
+an agent that was reset, or read a map that is being reset. Requests run one
+at a time, so a search never shares the agent's search arrays with another.
+
+The worker counts the work of a request into counters of its own. poll
+adds them to the agent's search_stats on the main thread together with the
+leg, so the counters of a discarded search never reach the agent.
+
+Threads rather than processes keep the agent's caches (search arrays, HPA*
+clusters, tour distance fields) in place without copying the map. Python
+switches threads every few milliseconds, so the window keeps drawing while
+the worker searches.
+"""
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, wait as wait_for  # Worker thread returning futures
+from search import merge_stats, new_stats  # Per-request search counters
+
+
+class BackgroundPlanner:
+    """Plans the legs of one agent on a single worker thread."""
+
+    def __init__(self, agent):
+        """
+        Create the planner and its worker thread.
+
+        Args:
+            agent (Agent): The agent whose legs are planned.
+        """
+        self.agent = agent  # The agent whose legs are planned
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="planner")  # One search at a time
+        self.future = None  # Pending request, None when idle
+
+
+    @property
+    def busy(self):
+        """Whether a leg is being planned."""
+        return self.future is not None
+
+
+    def submit(self, algorithm):
+        """
+        Plan the agent's next leg from its current position in the background.
+
+        Args:
+            algorithm (str): The algorithm passed to Agent.plan_path.
+
+        Returns:
+            concurrent.futures.Future: Resolves to (stats, leg): the request's search counters and
+                (algorithm, path, cost), or None as the leg if no task remains.
+        """
+        self.cancel()
+        self.future = self.executor.submit(self._plan, algorithm, tuple(self.agent.position))
+        return self.future
+
+
+    def _plan(self, algorithm, start):
+        """Choose the next task and plan the leg to it; runs on the worker thread."""
+        stats = new_stats()  # Counters of this request, added to the agent's by poll
+        target = self.agent.next_target(algorithm, start, stats)
+        if target is None:
+            return stats, None
+        path, cost = self.agent.plan_path(algorithm, start, target, stats)
+        return stats, (algorithm, path, cost)
+
+
+    def poll(self, algorithm):
+        """
+        Start the agent's next leg if it is planned, and request one if none is pending.
+
+        Args:
+            algorithm (str): The algorithm for a new request.
+
+        Returns:
+            bool: True if the agent started a leg.
+        """
+        if self.future is None:
+            self.submit(algorithm)
+            return False
+        if not self.future.done():
+            return False
+        future, self.future = self.future, None
+        stats, leg = future.result()  # Re-raises errors of the worker
+        merge_stats(self.agent.search_stats, stats)
+        if leg is None:
+            return False  # No task remains
+        self.agent.start_leg(*leg)
+        return True
+
+
+    def wait(self, timeout=None):
+        """Block until the pending request is planned; returns False on timeout."""
+        if self.future is None:
+            return True
+        try:
+            self.future.exception(timeout)
+        except TimeoutError:
+            return False
+        return True
+
+
+    def cancel(self, wait_running=False):
+        """
+        Drop the pending request; a search already running finishes on the worker and is ignored.
+
+        Args:
+            wait_running (bool): Whether to block until that search has finished, e.g. before the agent
+                or the map is reset, so it cannot change them afterwards.
+        """
+        future, self.future = self.future, None
+        if future is not None and not future.cancel() and wait_running:
+            wait_for([future])  # Running: cancel() cannot stop it
+
+
+    def shutdown(self):
+        """Cancel the pending request and stop the worker thread without waiting for it."""
+        self.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,358 @@
+# benchmark.py
+"""
+Headless benchmark comparing the path planning algorithms of the Agent.
+
+Builds seeded environments without opening a window, lets an agent complete
+every task with each algorithm and reports wall time, nodes expanded, heap
+pushes and peak memory per run.
+
+Example:
+    python benchmark.py --sizes 20x15 200x200 --densities 0.1 0.3 --tasks 5 --seeds 0 1 2 --csv results.csv
+"""
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")  # Never open a window, even if pygame touches the display
+
+import argparse  # Parse the command line options
+import csv  # Write results as CSV
+import itertools  # Build the parameter sweep
+import json  # Write results as JSON
+import random  # Choose the barriers changed at runtime
+import sys  # Write the summary to stdout
+import time  # Measure wall time
+import tracemalloc  # Measure peak memory
+from agent import Agent  # Import the Agent class from the agent module
+from environment import Environment  # Import the Environment class from the environment module
+from cache import PathCache  # Optional path cache shared between runs
+import mapio  # Load saved maps and MovingAI benchmark maps
+from instrumentation import Instrumentation  # Optional per-call metrics and latency histograms
+
+
+ALGORITHMS = ("UCS", "A*", "ALT", "Bi-UCS", "Bi-A*", "JPS", "HPA*", "Tour", "D* Lite", "ARA*")  # Algorithms benchmarked by default
+RESULT_FIELDS = [
+    "algorithm", "columns", "rows", "density", "num_tasks", "seed",
+    "tasks_completed", "path_cost", "wall_time", "nodes_expanded", "heap_pushes", "stale_pops", "peak_frontier", "peak_memory",
+    "cache_hits", "cache_misses", "optimal_length", "landmark_bytes", "landmark_build_time", "landmark_expanded",
+]  # Column order of the result rows
+
+
+def build_environment(columns, rows, density, num_tasks, seed):
+    """
+    Build a seeded environment measured in cells instead of pixels.
+
+    Args:
+        columns (int): Number of grid columns.
+        rows (int): Number of grid rows.
+        density (float): Fraction of cells covered by barriers.
+        num_tasks (int): Number of tasks to place.
+        seed (int): Seed for the random generator.
+
+    Returns:
+        Environment: The generated environment.
+    """
+    num_barriers = int(columns * rows * density)  # Number of barrier cells for the requested density
+    return Environment(columns, rows, 1, num_tasks, num_barriers, seed)  # A grid size of 1 makes pixels equal cells
+
+
+def change_barriers(environment, agent, count, rng):
+    """
+    Simulate barriers appearing and disappearing while the agent walks.
+
+    Blocks up to count cells of the agent's remaining path (never a task) and
+    removes as many randomly chosen barriers elsewhere.
+
+    Args:
+        environment (Environment): The environment to change.
+        agent (Agent): The walking agent.
+        count (int): The number of barriers to add and to remove.
+        rng (random.Random): The generator choosing the cells.
+    """
+    candidates = [cell for cell in itertools.islice(agent.path, max(0, len(agent.path) - 1)) if cell not in environment.task_locations]
+    for x, y in rng.sample(candidates, min(count, len(candidates))):
+        environment.add_barrier(x, y)
+    removed = 0
+    for _ in range(count * 10):  # Random probes; dense maps find barriers quickly
+        if removed == count:
+            break
+        x, y = rng.randrange(environment.columns), rng.randrange(environment.rows)
+        if (x, y) not in agent.path:
+            removed += environment.remove_barrier(x, y)
+
+
+def run_algorithm(environment, algorithm, task_locations, trace_memory=False, path_cache=None, barrier_changes=0, seed=0,
+                  instrumentation=None):
+    """
+    Let a fresh agent complete every task with one algorithm.
+
+    With barrier_changes, barriers are added on the agent's path and removed
+    elsewhere halfway through every leg, so the agent has to replan mid-path;
+    the original barriers are restored afterwards. For ALT, the landmark table
+    is rebuilt outside the timed sections after every change and restore, and
+    the run reports the build time and expansions of every table it used.
+
+    Args:
+        environment (Environment): The environment to run in.
+        algorithm (str): The algorithm name passed to Agent.plan_tasks.
+        task_locations (dict): The tasks to restore before the run.
+        trace_memory (bool): Whether to measure peak memory with tracemalloc.
+        path_cache (PathCache): Optional cache shared with other runs on the same map.
+        barrier_changes (int): Barriers added and removed halfway through every leg.
+        seed (int): Seed for choosing the changed barriers.
+        instrumentation (Instrumentation): Optional collector of the per-call metrics.
+
+    Returns:
+        dict: Measurements of the run.
+    """
+    environment.task_locations = task_locations.copy()  # Every algorithm starts from the same tasks
+    agent = Agent(environment, environment.grid_size, path_cache, instrumentation)  # Create the agent
+    wall_time = 0.0  # Time spent planning and replanning
+    hits, misses = (path_cache.hits, path_cache.misses) if path_cache else (0, 0)  # Counters before the run
+    barriers = environment.barrier_locations.copy() if barrier_changes else None  # Restored after the run
+    rng = random.Random(seed)  # Chooses the changed barriers
+    landmarks = environment.landmark_table() if algorithm == "ALT" else None  # Built untimed, like its rebuilds below
+    landmark_stats = [landmarks.nbytes, landmarks.build_time, landmarks.expanded] if landmarks else [0, 0.0, 0]  # Over every table used
+
+
+    if trace_memory:
+        tracemalloc.start()  # Start tracking allocations
+    while not agent.is_done():
+        start_time = time.perf_counter()
+        agent.plan_tasks(algorithm)  # Plan the next leg
+        wall_time += time.perf_counter() - start_time
+        if not agent.path:  # The remaining tasks cannot be reached
+            break
+        change_at = len(agent.path) // 2 if barrier_changes else -1  # Remaining length at which barriers change
+        while agent.moving:  # Walk the planned leg
+            if len(agent.path) == change_at:
+                change_barriers(environment, agent, barrier_changes, rng)
+                change_at = -1
+                if landmarks is not None and landmarks.version != environment.version:  # Rebuild before the timed replanning
+                    landmarks = environment.landmark_table()
+                    landmark_stats[0] = max(landmark_stats[0], landmarks.nbytes)
+                    landmark_stats[1] += landmarks.build_time
+                    landmark_stats[2] += landmarks.expanded
+            start_time = time.perf_counter()
+            agent.move()  # Replans first if the barriers changed under the path
+            wall_time += time.perf_counter() - start_time
+    if barriers is not None:
+        environment.barrier_locations = barriers  # Give the next algorithm the same map
+    peak_memory = 0
+    if trace_memory:
+        peak_memory = tracemalloc.get_traced_memory()[1]  # Peak bytes allocated during the run
+        tracemalloc.stop()
+    if barriers is not None and landmarks is not None:
+        environment.landmark_table()  # Rebuild for the restored map untimed, so the next run does not time it
+
+
+    return {
+        "tasks_completed": agent.task_completed,
+        "path_cost": agent.total_path_cost,
+        "wall_time": wall_time,
+        "nodes_expanded": agent.search_stats["nodes_expanded"],
+        "heap_pushes": agent.search_stats["heap_pushes"],
+        "stale_pops": agent.search_stats["stale_pops"],
+        "peak_frontier": agent.search_stats["peak_frontier"],
+        "peak_memory": peak_memory,
+        "cache_hits": path_cache.hits - hits if path_cache else 0,
+        "cache_misses": path_cache.misses - misses if path_cache else 0,
+        "landmark_bytes": landmark_stats[0],
+        "landmark_build_time": landmark_stats[1],
+        "landmark_expanded": landmark_stats[2],
+    }
+
+
+def run_case(columns, rows, density, num_tasks, seed, algorithms=ALGORITHMS, trace_memory=True, cache_bytes=None, repeat=1,
+             barrier_changes=0, environment=None, instrumentation=None):
+    """
+    Benchmark every algorithm on one generated map, or on a given one.
+
+    Timing runs are made without tracemalloc; peak memory comes from a second,
+    traced run so the tracing overhead does not distort the wall time. With
+    cache_bytes, all runs on the map share one PathCache of that size, and
+    repeat runs every algorithm several times to measure how much replanning
+    the cache saves. barrier_changes is passed on to run_algorithm; every
+    change and the restore after a run give the map a new version, so the
+    cache cannot hit across runs then and its columns are meaningless. An
+    environment, e.g. loaded with mapio, replaces the generated map. The
+    timed runs report their planner calls to instrumentation, if given. The
+    ALT landmark table is built before the timed runs and its build time and
+    memory are reported in their own columns.
+
+    Returns:
+        list: One result dictionary per algorithm.
+    """
+    if environment is None:
+        environment = build_environment(columns, rows, density, num_tasks, seed)  # Build the shared map
+    task_locations = environment.task_locations.copy()  # Save the tasks for every algorithm
+    path_cache = PathCache(cache_bytes) if cache_bytes else None  # Shared by every run on this map
+    if "ALT" in algorithms:
+        environment.landmark_table()  # Preprocessing is measured on its own, not in the runs' wall time
+    results = []
+    for algorithm in algorithms:
+        for _ in range(repeat):
+            result = run_algorithm(environment, algorithm, task_locations, path_cache=path_cache,
+                                   barrier_changes=barrier_changes, seed=seed, instrumentation=instrumentation)  # Timed run
+            if trace_memory:
+                result["peak_memory"] = run_algorithm(environment, algorithm, task_locations, True,
+                                                      barrier_changes=barrier_changes, seed=seed)["peak_memory"]
+            result.update(algorithm=algorithm, columns=columns, rows=rows, density=density, num_tasks=num_tasks, seed=seed)
+            results.append(result)
+    return results
+
+
+def run_scenarios(environment, scenarios, algorithms=ALGORITHMS, instrumentation=None):
+    """
+    Plan every start-goal query of a MovingAI scenario file with each algorithm.
+
+    The queries are planned independently from their own start, like the
+    published results, and the MovingAI optimal lengths are summed alongside.
+    Those assume 8-connected moves, so they are a lower bound on the agent's
+    4-connected path costs.
+
+    Args:
+        environment (Environment): The map of the scenarios.
+        scenarios (list): mapio.Scenario records.
+        algorithms (iterable): The algorithms to compare.
+        instrumentation (Instrumentation): Optional collector of the per-query metrics.
+
+    Returns:
+        list: One result dictionary per algorithm.
+    """
+    results = []
+    for algorithm in algorithms:
+        agent = Agent(environment, environment.grid_size, instrumentation=instrumentation)  # Fresh counters for every algorithm
+        landmarks = environment.landmark_table() if algorithm == "ALT" else None  # Built before the timed queries
+        wall_time, solved, path_cost, optimal_length = 0.0, 0, 0, 0.0
+        for scenario in scenarios:
+            start_time = time.perf_counter()
+            path, cost = agent.plan_path(algorithm, scenario.start, scenario.goal)
+            wall_time += time.perf_counter() - start_time
+            if path or scenario.start == scenario.goal:
+                solved += 1
+                path_cost += cost
+                optimal_length += scenario.optimal_length
+        results.append({
+            "algorithm": algorithm, "columns": environment.columns, "rows": environment.rows,
+            "density": float(environment.occupancy.mean()), "num_tasks": len(scenarios), "seed": 0,
+            "tasks_completed": solved, "path_cost": path_cost, "wall_time": wall_time,
+            "nodes_expanded": agent.search_stats["nodes_expanded"], "heap_pushes": agent.search_stats["heap_pushes"],
+            "stale_pops": agent.search_stats["stale_pops"], "peak_frontier": agent.search_stats["peak_frontier"],
+            "peak_memory": 0, "cache_hits": 0, "cache_misses": 0, "optimal_length": optimal_length,
+            "landmark_bytes": landmarks.nbytes if landmarks else 0,
+            "landmark_build_time": landmarks.build_time if landmarks else 0.0,
+            "landmark_expanded": landmarks.expanded if landmarks else 0,
+        })
+    return results
+
+
+def load_environment(path, scen_path=None, num_tasks=None):
+    """
+    Load a map file for benchmarking: a MovingAI .map (with an optional .scen) or a file saved with mapio.save.
+
+    Returns:
+        tuple: The Environment and the list of scenarios (empty unless scen_path is given).
+    """
+    if path.endswith(".map"):
+        return mapio.import_movingai(path, scen_path, num_tasks)
+    environment = mapio.load(path)
+    return environment, mapio.read_movingai_scenarios(scen_path) if scen_path else []
+
+
+def parse_size(text):
+    """Parse a grid size written as COLUMNSxROWS."""
+    try:
+        columns, rows = (int(part) for part in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid grid size {text!r}, expected COLUMNSxROWS")
+    return columns, rows
+
+
+def write_csv(results, path):
+    """Write the result rows to a CSV file."""
+    with open(path, "w", newline="") as handle:
+        writer = csv.DictWriter(handle, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def write_json(results, path):
+    """Write the result rows to a JSON file."""
+    with open(path, "w") as handle:
+        json.dump(results, handle, indent=2)
+
+
+def print_summary(results, stream=sys.stdout):
+    """Print the totals per algorithm."""
+    totals = {}
+    for result in results:
+        total = totals.setdefault(result["algorithm"], {"runs": 0, "path_cost": 0, "wall_time": 0.0, "nodes_expanded": 0,
+                                                          "heap_pushes": 0, "peak_memory": 0, "cache_hits": 0,
+                                                          "landmark_bytes": 0, "landmark_build_time": 0.0,
+                                                          "landmark_expanded": 0})
+        total["runs"] += 1
+        total["path_cost"] += result["path_cost"]
+        total["wall_time"] += result["wall_time"]
+        total["nodes_expanded"] += result["nodes_expanded"]
+        total["heap_pushes"] += result["heap_pushes"]
+        total["peak_memory"] = max(total["peak_memory"], result["peak_memory"])
+        total["cache_hits"] += result["cache_hits"]
+        total["landmark_bytes"] = max(total["landmark_bytes"], result.get("landmark_bytes", 0))
+        total["landmark_build_time"] = max(total["landmark_build_time"], result.get("landmark_build_time", 0.0))
+        total["landmark_expanded"] = max(total["landmark_expanded"], result.get("landmark_expanded", 0))
+    for algorithm, total in totals.items():
+        landmarks = (f" landmarks={total['landmark_bytes'] / 1024:.0f}KiB built in {total['landmark_build_time']:.3f}s"
+                     f" ({total['landmark_expanded']} cells expanded)" if total["landmark_bytes"] else "")
+        print(f"{algorithm:>6}: runs={total['runs']} cost={total['path_cost']} time={total['wall_time']:.3f}s "
+              f"expanded={total['nodes_expanded']} pushes={total['heap_pushes']} "
+              f"peak_memory={total['peak_memory'] / 1024:.0f}KiB cache_hits={total['cache_hits']}{landmarks}", file=stream)
+
+
+def main(argv=None):
+    """Run the benchmark sweep from the command line."""
+    parser = argparse.ArgumentParser(description="Headless UCS vs A* benchmark")
+    parser.add_argument("--sizes", nargs="+", type=parse_size, default=[(20, 15)], help="grid sizes as COLUMNSxROWS")
+    parser.add_argument("--densities", nargs="+", type=float, default=[0.05], help="barrier densities between 0 and 1")
+    parser.add_argument("--tasks", nargs="+", type=int, default=[5], help="task counts")
+    parser.add_argument("--seeds", nargs="+", type=int, default=[0], help="random seeds")
+    parser.add_argument("--algorithms", nargs="+", default=list(ALGORITHMS), choices=ALGORITHMS, help="algorithms to compare")
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced run that measures peak memory")
+    parser.add_argument("--path-cache-mb", type=float,
+                        help="share a path cache of this many MiB between the runs on each map (no hits with --barrier-changes)")
+    parser.add_argument("--repeat", type=int, default=1, help="run every algorithm this many times per map")
+    parser.add_argument("--barrier-changes", type=int, default=0, help="barriers added and removed halfway through every leg")
+    parser.add_argument("--map", help="benchmark on this map instead: a MovingAI .map or a file saved with mapio.save")
+    parser.add_argument("--scen", help="MovingAI .scen file for --map; its start-goal queries are planned one by one")
+    parser.add_argument("--metrics", help="write per-call metrics and latency histograms to this file (.prom for Prometheus text, else JSON)")
+    parser.add_argument("--csv", help="write the results to this CSV file")
+    parser.add_argument("--json", help="write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+
+    results = []
+    instrumentation = Instrumentation() if args.metrics else None
+    cache_bytes = int(args.path_cache_mb * 1024 * 1024) if args.path_cache_mb else None
+    if args.map:  # A fixed map replaces the generated sweep
+        environment, scenarios = load_environment(args.map, args.scen, max(args.tasks))
+        if scenarios:
+            results = run_scenarios(environment, scenarios, args.algorithms, instrumentation)
+        else:
+            results = run_case(environment.columns, environment.rows, float(environment.occupancy.mean()),
+                               len(environment.task_locations), 0, args.algorithms, not args.no_memory, cache_bytes, args.repeat,
+                               args.barrier_changes, environment, instrumentation)
+    else:
+        for (columns, rows), density, num_tasks, seed in itertools.product(args.sizes, args.densities, args.tasks, args.seeds):
+            results += run_case(columns, rows, density, num_tasks, seed, args.algorithms, not args.no_memory, cache_bytes,
+                                args.repeat, args.barrier_changes, instrumentation=instrumentation)
+
+
+    if args.csv:
+        write_csv(results, args.csv)
+    if args.json:
+        write_json(results, args.json)
+    if instrumentation is not None:
+        instrumentation.save(args.metrics)
+    print_summary(results)
+    return results
+
+
+if __name__ == "__main__":
+    main()  # Run the benchmark
@@ -0,0 +1,98 @@
+# cache.py
+"""
+Planner-level cache of planned paths.
+
+Entries are keyed by ``(map_version, start, goal, algorithm)``. The
+Environment gives the map a new version whenever its barriers or terrain
+change, so an entry can never outlive the map it was planned on. Assigning
+the barriers the map already has keeps its version, so resetting an
+untouched map (for example with the Toggle button) keeps hitting the cache.
+A layout restored after changes is a new version, though, and starts cold.
+"""
+from collections import OrderedDict  # Keeps the entries in least-recently-used order
+
+
+ENTRY_BYTES = 200  # Approximate memory of one entry without its path (key tuple, cost, dict slot)
+CELL_BYTES = 72  # Approximate memory of one (x, y) tuple in a stored path
+
+
+class PathCache:
+    """Least-recently-used cache of (path, cost) results bounded by approximate memory."""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        """
+        Create an empty cache.
+
+        Args:
+            max_bytes (int): Approximate memory bound; the least recently used entries are evicted beyond it.
+        """
+        self.max_bytes = max_bytes  # Memory bound in bytes
+        self.entries = OrderedDict()  # key -> (path tuple, cost, size), oldest first
+        self.size_bytes = 0  # Approximate memory used by the entries
+        self.hits = 0  # Lookups answered from the cache
+        self.misses = 0  # Lookups that needed a search
+        self.evictions = 0  # Entries dropped to stay within max_bytes
+
+
+    def get(self, key):
+        """
+        Look up a planned path.
+
+        Args:
+            key (tuple): The (map_version, start, goal, algorithm) key.
+
+        Returns:
+            tuple: A fresh copy of the path as a list and its cost, or None on a miss.
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)  # Mark as most recently used
+        self.hits += 1
+        return list(entry[0]), entry[1]
+
+
+    def put(self, key, path, cost):
+        """
+        Store a planned path, evicting the least recently used entries if needed.
+
+        Args:
+            key (tuple): The (map_version, start, goal, algorithm) key.
+            path (list): The planned path.
+            cost (int): The cost of the path.
+        """
+        size = ENTRY_BYTES + CELL_BYTES * len(path)
+        if size > self.max_bytes:
+            return  # Would evict everything else; not worth caching
+        if key in self.entries:
+            self.size_bytes -= self.entries.pop(key)[2]
+        self.entries[key] = (tuple(path), cost, size)
+        self.size_bytes += size
+        while self.size_bytes > self.max_bytes:
+            _, (_, _, evicted) = self.entries.popitem(last=False)  # Drop the least recently used entry
+            self.size_bytes -= evicted
+            self.evictions += 1
+
+
+    def clear(self):
+        """Remove every entry; the counters are kept."""
+        self.entries.clear()
+        self.size_bytes = 0
+
+
+    def __len__(self):
+        return len(self.entries)
+
+
+    def stats(self):
+        """Return the cache counters as a dictionary."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "size_bytes": self.size_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
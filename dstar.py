@@ -0,0 +1,173 @@
+# dstar.py
+"""
+Incremental replanning with D* Lite.
+
+D* Lite searches backwards from the goals to the agent and keeps its search
+state between calls. When the Environment reports changed barrier cells, only
+the vertices whose costs depend on those cells are updated, and the next plan
+repairs the affected part of the search instead of starting from scratch.
+"""
+import heapq  # Binary heap used as the priority queue
+from search import record_search  # Shared search counters
+
+
+INFINITY = float("inf")  # Cost of unreachable cells
+
+
+class DStarLite:
+    """D* Lite planner for one set of goals on an Environment's occupancy grid."""
+
+    def __init__(self, environment, goals, stats=None):
+        """
+        Create a planner and subscribe it to barrier changes.
+
+        Args:
+            environment (Environment): The environment to plan in.
+            goals (iterable): The (x, y) goal positions.
+            stats (dict): Optional counters from search.new_stats, updated with record_search.
+        """
+        self.environment = environment  # The environment to plan in
+        self.goals = {environment.cell_id(*goal) for goal in goals}  # Goal cell ids
+        self.stats = stats  # Optional search counters
+        self.g = {}  # Current cost-to-goal estimate of each cell (missing means infinity)
+        self.rhs = {goal: 0 for goal in self.goals}  # One-step lookahead cost of each cell
+        self.queue = []  # Heap of (k1, k2, cell) entries, possibly stale
+        self.queued = {}  # Current key of each cell that is in the queue
+        self.km = 0  # Key modifier accumulated as the agent moves
+        self.start = None  # Current agent cell
+        self.last_start = None  # Agent cell when the keys were last corrected
+        self.pending = set()  # Changed cells not yet processed
+        self.pushes = 0  # Queue entries added since the counters were last recorded
+        self.stale_pops = 0  # Stale queue entries dropped since the counters were last recorded
+        environment.subscribe(self.on_map_change)
+
+
+    def close(self):
+        """Stop listening for barrier changes."""
+        self.environment.unsubscribe(self.on_map_change)
+
+
+    def on_map_change(self, environment, changed):
+        """Remember the changed cells until the next plan."""
+        self.pending.update(environment.cell_id(x, y) for x, y in changed)
+
+
+    def heuristic(self, a, b):
+        """Manhattan distance between two cell ids."""
+        ax, ay = divmod(a, self.environment.stride)
+        bx, by = divmod(b, self.environment.stride)
+        return abs(ax - bx) + abs(ay - by)
+
+
+    def key(self, cell):
+        """Return the priority of a cell."""
+        best = min(self.g.get(cell, INFINITY), self.rhs.get(cell, INFINITY))
+        return (best + self.heuristic(self.start, cell) + self.km, best)
+
+
+    def update_vertex(self, cell):
+        """Recompute the lookahead cost of a cell and requeue it if it is inconsistent."""
+        grid = self.environment.grid
+        if cell not in self.goals:
+            if grid[cell] and cell != self.start:
+                best = INFINITY  # A blocked cell is a dead end unless the agent stands on it
+            else:
+                g = self.g
+                best = INFINITY
+                for offset in self.environment.neighbor_offsets:
+                    neighbor = cell + offset
+                    if not grid[neighbor]:
+                        best = min(best, g.get(neighbor, INFINITY) + 1)  # Every move costs 1
+            self.rhs[cell] = best
+        self.queued.pop(cell, None)  # Lazily removes the old heap entry
+        if self.g.get(cell, INFINITY) != self.rhs.get(cell, INFINITY):
+            key = self.key(cell)
+            self.queued[cell] = key
+            heapq.heappush(self.queue, (key[0], key[1], cell))
+            self.pushes += 1
+
+
+    def top_key(self):
+        """Return the smallest key in the queue, dropping stale entries."""
+        queue, queued = self.queue, self.queued
+        while queue:
+            k1, k2, cell = queue[0]
+            if queued.get(cell) == (k1, k2):
+                return (k1, k2)
+            heapq.heappop(queue)
+            self.stale_pops += 1
+        return (INFINITY, INFINITY)
+
+
+    def compute_shortest_path(self):
+        """Expand inconsistent cells until the start is consistent and cannot improve."""
+        g, rhs, grid = self.g, self.rhs, self.environment.grid
+        offsets = self.environment.neighbor_offsets
+        expanded = frontier = 0
+        while self.top_key() < self.key(self.start) or rhs.get(self.start, INFINITY) != g.get(self.start, INFINITY):
+            if len(self.queue) > frontier:
+                frontier = len(self.queue)
+            k_old = self.top_key()
+            _, _, cell = heapq.heappop(self.queue)
+            del self.queued[cell]
+            expanded += 1
+            k_new = self.key(cell)
+            if k_old < k_new:  # The key grew since the agent moved; requeue it
+                self.queued[cell] = k_new
+                heapq.heappush(self.queue, (k_new[0], k_new[1], cell))
+            elif g.get(cell, INFINITY) > rhs[cell]:  # Overconsistent: lower g and update the predecessors
+                g[cell] = rhs[cell]
+                if not grid[cell]:
+                    for offset in offsets:
+                        self.update_vertex(cell + offset)
+            else:  # Underconsistent: raise g and update the cell and its predecessors
+                g[cell] = INFINITY
+                self.update_vertex(cell)
+                for offset in offsets:
+                    self.update_vertex(cell + offset)
+        if self.stats is not None:
+            record_search(self.stats, expanded, self.pushes, self.stale_pops, frontier)
+        self.pushes = self.stale_pops = 0
+
+
+    def plan(self, start):
+        """
+        Plan (or repair) the path from the start to the nearest goal.
+
+        Args:
+            start (tuple): The agent's current (x, y) position.
+
+        Returns:
+            tuple: The path as a list of (x, y) positions excluding the start, and its cost.
+        """
+        environment = self.environment
+        self.start = environment.cell_id(*start)
+        if self.last_start is None:  # First plan: queue the goals
+            self.last_start = self.start
+            for goal in self.goals:
+                self.update_vertex(goal)
+        else:
+            if self.start != self.last_start:  # Keys already queued were computed against the old start
+                self.km += self.heuristic(self.last_start, self.start)
+                self.last_start = self.start
+            changed, self.pending = self.pending, set()  # Repair only around the changed cells
+            for cell in changed:
+                self.update_vertex(cell)
+                for offset in environment.neighbor_offsets:
+                    self.update_vertex(cell + offset)
+        if environment.grid[self.start]:
+            self.update_vertex(self.start)  # The agent stands on a barrier; its moves out still count
+        self.compute_shortest_path()
+
+
+        cost = self.g.get(self.start, INFINITY)
+        if cost == INFINITY:
+            return [], 0  # No path found
+        path = []  # Follow the cheapest successors to a goal
+        g, grid = self.g, environment.grid
+        cell = self.start
+        for _ in range(int(cost)):  # Every move lowers g by exactly 1
+            cell = min((cell + offset for offset in environment.neighbor_offsets if not grid[cell + offset]),
+                       key=lambda neighbor: g.get(neighbor, INFINITY))  # Ties keep the (x, y) order
+            path.append(environment.cell_position(cell))
+        return path, int(cost)
@@ -1,9 +1,50 @@
 # environment.py
-import random  # Import random module for generating random numbers
+import itertools  # Import itertools for the map version counter
+import random  # Import random module for the per-environment random generator
+import threading  # Import threading to guard task ownership
+import weakref  # Import weakref so subscribed planners can be garbage collected
+from collections.abc import Set  # Base class for the read-only barrier view
+import numpy as np  # Import NumPy for the occupancy grid and vectorized sampling
+from taskindex import TaskIndex  # Import the spatial index of the open tasks
+from landmarks import DEFAULT_LANDMARKS, LandmarkTable  # Import the ALT landmark tables
+
+
+class BarrierView(Set):
+    """Read-only set view of the barrier cells stored in an Environment's occupancy grid."""
+
+    def __init__(self, environment):
+        """
+        Create a view over the environment's occupancy grid.
+
+        Args:
+            environment (Environment): The environment whose barriers are viewed.
+        """
+        self.environment = environment  # The environment holding the occupancy grid
+
+    def __contains__(self, location):
+        try:
+            x, y = location  # Accept any (x, y) pair
+        except (TypeError, ValueError):
+            return False
+        return self.environment.is_barrier(x, y)
+
+    def __iter__(self):
+        return (tuple(location) for location in np.argwhere(self.environment.occupancy).tolist())
+
+    def __len__(self):
+        return int(np.count_nonzero(self.environment.occupancy))
+
+    def copy(self):
+        """Return the barrier locations as a regular set."""
+        return set(self)
+
+
+_map_versions = itertools.count(1)  # Map versions are unique across all environments
+UNPACK_BLOCK_CELLS = 1 << 20  # Cells unpacked at a time by Environment.from_bitmap
 
 
 class Environment:
-    def __init__(self, width, height, grid_size, num_tasks, num_barriers):
+    def __init__(self, width, height, grid_size, num_tasks, num_barriers, seed=None):
         """
         Initialize the environment with a grid, tasks, and barriers.
 
@@ -14,18 +55,423 @@ class Environment:
             grid_size (int): The size of each grid cell in pixels.
             num_tasks (int): The number of tasks to place in the environment.
             num_barriers (int): The number of barriers to place in the environment.
+            seed (int): Seed of the environment's own random generator; None draws a fresh seed.
         """
         self.width = width  # Store the total width of the environment
         self.height = height  # Store the total height of the environment
         self.grid_size = grid_size  # Store the size of each grid cell
+        self.rng = random.Random(seed)  # Private generator, so maps are reproducible without touching the global random state
         self.columns = width // grid_size  # Calculate the number of columns in the grid
         self.rows = height // grid_size  # Calculate the number of rows in the grid
 
 
+        # The occupancy grid is padded with a one-cell border of barriers, so the planners can step to
+        # any neighbor id without a bounds check. Cell ids are (x + 1) * stride + (y + 1), which orders
+        # ids exactly like (x, y) tuples.
+        self.stride = self.rows + 2  # Distance between horizontally adjacent cell ids
+        self.grid = bytearray((self.columns + 2) * self.stride)  # 1 marks a blocked cell, shared with the NumPy views
+        self.padded_grid = np.frombuffer(self.grid, dtype=np.uint8).reshape(self.columns + 2, self.stride)
+        self.padded_grid[[0, -1], :] = 1  # Block the left and right border
+        self.padded_grid[:, [0, -1]] = 1  # Block the top and bottom border
+        self.occupancy = self.padded_grid[1:-1, 1:-1]  # Canonical (columns, rows) barrier map, indexed [x, y]
+        self.neighbor_offsets = (-self.stride, -1, 1, self.stride)  # Neighbor id offsets in (x, y) order: left, up, down, right
+        self.costs = bytearray(b"\x01") * len(self.grid)  # Traversal cost of entering each cell id, laid out like grid
+        self.terrain = np.frombuffer(self.costs, dtype=np.uint8).reshape(self.padded_grid.shape)[1:-1, 1:-1]  # Costs indexed [x, y]
+        self.max_cost = 1  # Largest traversal cost, used to choose the planners' priority queue
+        self._barrier_view = BarrierView(self)  # Set-like view handed out as barrier_locations
+        self.version = next(_map_versions)  # Changes whenever the barriers or terrain costs change, used to key planner caches
+        self._subscribers = []  # Callbacks (held weakly for bound methods) notified about barrier changes
+        self._task_lock = threading.Lock()  # Guards task_locations and task_owners when agents claim or complete tasks
+        self.task_owners = {}  # Task location -> agent that claimed it
+        self.landmarks = None  # ALT landmark table of the last landmark_table call, built on demand
+
+
         # Generate tasks and barriers
         self.task_locations = self.generate_tasks(num_tasks)  # Create tasks with unique locations
-        exclude_set = set(self.task_locations.keys())  # Exclude task locations
-        self.barrier_locations = self.generate_random_locations(num_barriers, exclude_set)  # Create barriers
+        self.place_barriers(num_barriers, self.task_locations.keys())  # Create barriers away from the tasks
+
+
+    @classmethod
+    def from_grid(cls, occupancy, task_locations, grid_size=1, seed=None, terrain=None):
+        """
+        Create an environment from an existing barrier grid instead of random placement.
+
+
+        Args:
+            occupancy (numpy.ndarray): Barrier grid of shape (columns, rows), indexed [x, y], nonzero where blocked.
+            task_locations (dict): Task locations and their task numbers.
+            grid_size (int): The size of each grid cell in pixels.
+            seed (int): Seed of the environment's own random generator.
+            terrain (numpy.ndarray): Optional traversal costs of shape (columns, rows), see set_terrain.
+
+
+        Returns:
+            Environment: The new environment.
+        """
+        columns, rows = occupancy.shape
+        environment = cls(columns * grid_size, rows * grid_size, grid_size, 0, 0, seed)  # Empty map of the right size
+        np.not_equal(occupancy, 0, out=environment.occupancy, casting="unsafe")  # Copy the barriers without a temporary
+        environment._finish_loading(task_locations, terrain)
+        return environment
+
+
+    @classmethod
+    def from_bitmap(cls, bitmap, columns, rows, task_locations, grid_size=1, seed=None, terrain=None):
+        """
+        Create an environment from a barrier grid packed to one bit per cell, e.g. read from a map file.
+
+        The bitmap is unpacked a block of columns at a time straight into the
+        padded grid, so no full-size temporary grid is built.
+
+        Args:
+            bitmap (numpy.ndarray): uint8 bytes of the barrier grid packed with numpy.packbits in x-major order.
+            columns (int): The number of columns.
+            rows (int): The number of rows.
+            task_locations (dict): Task locations and their task numbers.
+            grid_size (int): The size of each grid cell in pixels.
+            seed (int): Seed of the environment's own random generator.
+            terrain (numpy.ndarray): Optional traversal costs of shape (columns, rows), see set_terrain.
+
+        Returns:
+            Environment: The new environment.
+        """
+        environment = cls(columns * grid_size, rows * grid_size, grid_size, 0, 0, seed)  # Empty map of the right size
+        block = 8 * max(1, UNPACK_BLOCK_CELLS // (8 * max(rows, 1)))  # Columns per block; a multiple of 8 starts every block on a byte
+        for x in range(0, columns, block):
+            width = min(block, columns - x)
+            first = x * rows // 8
+            bits = np.unpackbits(bitmap[first:first + (width * rows + 7) // 8], count=width * rows)
+            environment.occupancy[x:x + width] = bits.reshape(width, rows)
+        environment._finish_loading(task_locations, terrain)
+        return environment
+
+
+    def _finish_loading(self, task_locations, terrain):
+        """Set the tasks and terrain of an environment built by from_grid or from_bitmap."""
+        if terrain is not None:
+            self.terrain[...] = _checked_costs(terrain, self.terrain.shape)
+            self.max_cost = int(self.terrain.max(initial=1))
+        self.version = next(_map_versions)  # Nobody has subscribed yet, so no cells need to be reported
+        self.task_locations = dict(task_locations)
+
+
+    @property
+    def task_locations(self):
+        """
+        Dictionary of the open task locations and their task numbers.
+
+        Assign a new dictionary or use complete_task to change the tasks, so
+        the spatial index stays in step; do not modify the dictionary in place.
+        """
+        return self._task_locations
+
+
+    @task_locations.setter
+    def task_locations(self, locations):
+        self._task_locations = locations
+        self.task_index = TaskIndex(self.columns, self.rows, locations)  # Spatial index for nearest-task queries
+        self.task_owners = {}  # Claims on the old tasks no longer apply
+
+
+    def nearest_tasks(self, position, k=1, distance=None):
+        """
+        Return the open tasks closest to a position.
+
+        Args:
+            position (tuple): The (x, y) query position.
+            k (int): The number of tasks to return.
+            distance (callable): Optional obstacle-aware distance distance(location) of an (x, y) task location,
+                None where unreachable, see TaskIndex.nearest_by; without it tasks are ranked by Manhattan distance.
+
+        Returns:
+            list: Up to k task locations, closest first; ties in task dictionary order.
+        """
+        with self._task_lock:
+            if distance is None:
+                return self.task_index.nearest(tuple(position), k)
+            return self.task_index.nearest_by(tuple(position), distance, k)
+
+
+    def landmark_table(self, count=DEFAULT_LANDMARKS):
+        """
+        Return the ALT landmark table of the current map, building it on first use.
+
+        The table is cached and reused by every agent and run until the barriers
+        or terrain costs change; the next call after a change rebuilds it.
+
+        Args:
+            count (int): The number of landmarks.
+
+        Returns:
+            LandmarkTable: The table, with its build_time and nbytes.
+        """
+        table = self.landmarks
+        if table is None or table.version != self.version or table.requested != count:
+            table = self.landmarks = LandmarkTable(self, count)
+        return table
+
+
+    def claim_task(self, location, agent):
+        """
+        Reserve an open task for one agent, so no other agent completes it.
+
+        Args:
+            location (tuple): The (x, y) task location.
+            agent (object): The claiming agent.
+
+        Returns:
+            bool: True if the agent owns the task now, False if it is gone or owned by another agent.
+        """
+        with self._task_lock:
+            if location not in self._task_locations or self.task_owners.get(location, agent) is not agent:
+                return False
+            self.task_owners[location] = agent
+            return True
+
+
+    def release_task(self, location, agent):
+        """Give up an agent's claim on a task so other agents can take it."""
+        with self._task_lock:
+            if self.task_owners.get(location) is agent:
+                del self.task_owners[location]
+
+
+    def complete_task(self, location, agent=None):
+        """
+        Remove a task reached by an agent.
+
+        When two agents reach tasks at the same time, exactly one of them
+        completes each task; a claimed task can only be completed by its owner.
+
+        Args:
+            location (tuple): The (x, y) location the agent reached.
+            agent (object): The agent reaching the location.
+
+        Returns:
+            int: The task number, or None if there is no task the agent may complete.
+        """
+        with self._task_lock:
+            if location not in self._task_locations or self.task_owners.get(location, agent) is not agent:
+                return None
+            self.task_owners.pop(location, None)
+            self.task_index.remove(location)
+            return self._task_locations.pop(location)
+
+
+    @property
+    def barrier_locations(self):
+        """Set-like view of the barrier locations backed by the occupancy grid."""
+        return self._barrier_view
+
+
+    @barrier_locations.setter
+    def barrier_locations(self, locations):
+        occupancy = np.zeros_like(self.occupancy)
+        xs, ys = self._coordinates(locations)
+        occupancy[xs, ys] = 1  # Mark the new barriers
+        changed = np.argwhere(occupancy != self.occupancy)
+        if len(changed):  # Restoring the same map keeps its version
+            self.occupancy[...] = occupancy
+            self._barriers_changed(changed)
+
+
+    def subscribe(self, callback):
+        """
+        Register a callback for barrier changes.
+
+        The callback is called as callback(environment, changed) with the list of
+        (x, y) cells whose barrier state changed. Bound methods are held weakly,
+        so a planner does not have to unsubscribe before it is discarded.
+
+        Args:
+            callback (callable): The function or bound method to call.
+        """
+        reference = weakref.WeakMethod(callback) if hasattr(callback, "__self__") else (lambda: callback)
+        self._subscribers.append(reference)
+
+
+    def unsubscribe(self, callback):
+        """Remove a callback registered with subscribe."""
+        self._subscribers = [reference for reference in self._subscribers if reference() != callback]
+
+
+    def _barriers_changed(self, changed):
+        """Bump the map version and notify the subscribers about the (x, y) cells whose barrier or cost changed."""
+        self.version = next(_map_versions)
+        changed = [tuple(location) for location in np.asarray(changed).tolist()]
+        self._subscribers = [reference for reference in self._subscribers if reference() is not None]  # Drop collected ones
+        for reference in list(self._subscribers):
+            callback = reference()
+            if callback is not None:
+                callback(self, changed)
+
+
+    def set_terrain(self, terrain):
+        """
+        Replace the traversal costs of all cells and notify the subscribed planners.
+
+        Entering a cell costs its traversal cost. Only the weighted planners
+        (UCS and A*) choose paths by it; the others plan unit-cost paths whose
+        cost is then measured with path_cost.
+
+        Args:
+            terrain (numpy.ndarray): Integer costs of shape (columns, rows), indexed [x, y], from 1 to 255.
+
+        Raises:
+            ValueError: If the shape is wrong or a cost is outside 1 to 255.
+        """
+        terrain = _checked_costs(terrain, self.terrain.shape)
+        changed = np.argwhere(terrain != self.terrain)
+        if len(changed):  # The same costs keep the version
+            self.terrain[...] = terrain
+            self.max_cost = int(self.terrain.max(initial=1))
+            self._barriers_changed(changed)
+
+
+    def set_cost(self, x, y, cost):
+        """
+        Change the traversal cost of one cell and notify the subscribed planners.
+
+        Args:
+            x (int): The x-coordinate (column index) of the cell.
+            y (int): The y-coordinate (row index) of the cell.
+            cost (int): The new cost, from 1 to 255.
+
+        Returns:
+            bool: True if the cell changed, False if it was outside the grid or already had that cost.
+
+        Raises:
+            ValueError: If the cost is outside 1 to 255.
+        """
+        if not 1 <= cost <= 255:
+            raise ValueError(f"traversal cost {cost} is outside 1 to 255")
+        if not self.is_within_bounds(x, y) or self.terrain[x, y] == cost:
+            return False
+        self.terrain[x, y] = cost
+        self.max_cost = int(self.terrain.max(initial=1))
+        self._barriers_changed([(x, y)])
+        return True
+
+
+    def cell_cost(self, x, y):
+        """Return the traversal cost of entering the cell at (x, y)."""
+        return self.costs[self.cell_id(x, y)]
+
+
+    def path_cost(self, path):
+        """
+        Return the cost of following a path.
+
+        Args:
+            path (iterable): The (x, y) positions entered, excluding the start.
+
+        Returns:
+            int: The sum of their traversal costs, the path length on a map without terrain.
+        """
+        if self.max_cost == 1:
+            return len(path)
+        costs, cell_id = self.costs, self.cell_id
+        return sum(costs[cell_id(x, y)] for x, y in path)
+
+
+    def add_barrier(self, x, y):
+        """
+        Place a barrier at runtime and notify the subscribed planners.
+
+        Args:
+            x (int): The x-coordinate (column index) of the cell.
+            y (int): The y-coordinate (row index) of the cell.
+
+        Returns:
+            bool: True if the cell changed, False if it was outside the grid or already a barrier.
+        """
+        if not self.is_within_bounds(x, y) or self.is_barrier(x, y):
+            return False
+        self.grid[self.cell_id(x, y)] = 1
+        self._barriers_changed([(x, y)])
+        return True
+
+
+    def remove_barrier(self, x, y):
+        """
+        Remove a barrier at runtime and notify the subscribed planners.
+
+        Args:
+            x (int): The x-coordinate (column index) of the cell.
+            y (int): The y-coordinate (row index) of the cell.
+
+        Returns:
+            bool: True if the cell changed, False if it held no barrier.
+        """
+        if not self.is_barrier(x, y):
+            return False
+        self.grid[self.cell_id(x, y)] = 0
+        self._barriers_changed([(x, y)])
+        return True
+
+
+    def cell_id(self, x, y):
+        """Return the id of the grid cell at (x, y)."""
+        return (x + 1) * self.stride + y + 1
+
+
+    def cell_position(self, cell):
+        """Return the (x, y) grid location of a cell id."""
+        x, y = divmod(cell, self.stride)
+        return x - 1, y - 1
+
+
+    def grid_for(self, barriers):
+        """
+        Return a padded occupancy grid for the given barriers.
+
+        Args:
+            barriers (iterable): Barrier locations; the environment's own barrier view reuses its grid.
+
+        Returns:
+            bytearray: A grid laid out like Environment.grid.
+        """
+        if barriers is self._barrier_view:
+            return self.grid
+        grid = bytearray(self.grid)
+        padded_grid = np.frombuffer(grid, dtype=np.uint8).reshape(self.padded_grid.shape)
+        padded_grid[1:-1, 1:-1] = 0
+        xs, ys = self._coordinates(barriers)
+        padded_grid[xs + 1, ys + 1] = 1
+        return grid
+
+
+    def _coordinates(self, locations):
+        """Split an iterable of (x, y) locations into NumPy coordinate arrays, dropping those outside the grid."""
+        coordinates = np.array(list(locations), dtype=np.int64).reshape(-1, 2)
+        xs, ys = coordinates[:, 0], coordinates[:, 1]
+        inside = (xs >= 0) & (xs < self.columns) & (ys >= 0) & (ys < self.rows)
+        return xs[inside], ys[inside]
+
+
+    def _sample_cells(self, count, exclude=()):
+        """
+        Sample distinct free cells without replacement.
+
+        Args:
+            count (int): The number of cells to sample.
+            exclude (iterable): Locations that must not be sampled.
+
+        Returns:
+            tuple: NumPy arrays with the x and y coordinates of the sampled cells.
+        """
+        if count == 0:  # Nothing to sample: skip the full-grid scan, which dominates loading large maps
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty
+        available = self.occupancy == 0  # Free cells
+        xs, ys = self._coordinates(exclude)
+        available[xs, ys] = False  # Drop the excluded locations
+        free = np.flatnonzero(available)
+        if count > free.size:
+            raise ValueError(f"cannot place {count} locations on {free.size} free cells")
+        generator = np.random.default_rng(self.rng.getrandbits(64))  # Seeded from the environment's generator
+        chosen = generator.choice(free, size=count, replace=False)
+        return np.divmod(chosen, self.rows)
 
 
     def generate_tasks(self, num_tasks):
@@ -40,15 +486,8 @@ class Environment:
         Returns:
             dict: A dictionary with task locations as keys and task numbers as values.
         """
-        tasks = {}  # Dictionary to store task locations and their task numbers
-        for task_number in range(1, num_tasks + 1):  # Assign task numbers starting from 1
-            while True:
-                # Randomly select a grid location
-                location = (random.randint(0, self.columns - 1), random.randint(0, self.rows - 1))
-                if location not in tasks:  # Ensure the location is unique
-                    tasks[location] = task_number  # Map the location to the task number
-                    break  # Exit the loop after finding a valid location
-        return tasks
+        xs, ys = self._sample_cells(num_tasks)  # Sample distinct free cells
+        return {location: task_number for task_number, location in enumerate(zip(xs.tolist(), ys.tolist()), start=1)}
 
 
     def generate_random_locations(self, count, exclude=set()):
@@ -64,13 +503,22 @@ class Environment:
         Returns:
             set: A set of unique random locations.
         """
-        locations = set()  # Create an empty set to store unique locations
-        while len(locations) < count:  # Repeat until the desired number of locations is generated
-            # Generate a random grid location
-            location = (random.randint(0, self.columns - 1), random.randint(0, self.rows - 1))
-            if location not in exclude:  # Ensure the location is not in the exclude set
-                locations.add(location)  # Add the valid location to the set
-        return locations
+        xs, ys = self._sample_cells(count, exclude)  # Sample distinct free cells
+        return set(zip(xs.tolist(), ys.tolist()))
+
+
+    def place_barriers(self, count, exclude=()):
+        """
+        Place barriers on randomly chosen free cells.
+
+
+        Args:
+            count (int): The number of barriers to place.
+            exclude (iterable): Locations to keep free of barriers.
+        """
+        xs, ys = self._sample_cells(count, exclude)  # Sample distinct free cells
+        self.occupancy[xs, ys] = 1  # Mark them as barriers in one vectorized write
+        self._barriers_changed(np.stack([xs, ys], axis=1))  # The barriers changed
 
 
     def is_within_bounds(self, x, y):
@@ -102,7 +550,7 @@ class Environment:
         Returns:
             bool: True if the location corresponds to a barrier, False otherwise.
         """
-        return (x, y) in self.barrier_locations
+        return self.is_within_bounds(x, y) and self.grid[self.cell_id(x, y)] == 1
 
 
     def reset_environment(self, num_tasks, num_barriers):
@@ -114,9 +562,17 @@ class Environment:
             num_tasks (int): The number of tasks to generate.
             num_barriers (int): The number of barriers to generate.
         """
+        self.barrier_locations = set()  # Clear the old barriers
+        self.set_terrain(np.ones_like(self.terrain))  # Clear the terrain costs
         self.task_locations = self.generate_tasks(num_tasks)  # Regenerate task locations
-        exclude_set = set(self.task_locations.keys())  # Exclude task locations
-        self.barrier_locations = self.generate_random_locations(num_barriers, exclude_set)  # Regenerate barriers
-
+        self.place_barriers(num_barriers, self.task_locations.keys())  # Regenerate barriers
 
 
+def _checked_costs(terrain, shape):
+    """Return terrain costs as a uint8 array of the given shape, rejecting costs outside 1 to 255."""
+    terrain = np.asarray(terrain)
+    if terrain.shape != shape:
+        raise ValueError(f"terrain of shape {terrain.shape} does not match the grid {shape}")
+    if terrain.size and (terrain.min() < 1 or terrain.max() > 255):
+        raise ValueError("traversal costs must be from 1 to 255")
+    return terrain.astype(np.uint8, copy=False)  # uint8 costs, e.g. read from a map file, are not copied
@@ -0,0 +1,375 @@
+# fleet.py
+"""
+Cooperative planning for many agents on one Environment.
+
+Idle agents get tasks in one batch: every idle agent and every unclaimed task
+are scored by Manhattan distance at once with NumPy, and the closest pairs are
+assigned greedily. Each assigned agent then plans with cooperative A* in
+space-time: the search state is (cell, time), waiting in place is a move, and
+the cells and moves reserved by the agents planned before it are avoided. The
+obstacle distance to the task (a breadth-first distance field that stops once
+it reaches the agent, with a lower bound beyond) serves as the heuristic. A planned path is reserved in a shared table, and the
+agent stays reserved at its last cell until it plans again, so agents never
+share a cell or swap places.
+
+Example:
+    python fleet.py --size 100x100 --density 0.1 --agents 500 --tasks 1000 --seed 0
+"""
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")  # Never open a window when run from the command line
+
+import argparse  # Parse the command line options
+from collections import deque  # Planned paths are popped from the front
+import heapq  # Binary heap used as the priority queue
+import time  # Measure planning throughput
+import numpy as np  # Batched distance scoring for task assignment
+from agent import Agent  # Fleet members are ordinary agents
+from search import new_stats, record_search  # Shared search counters
+from tour import UNREACHABLE, DistanceField  # Exact obstacle distances used as the heuristic
+
+
+class ReservationTable:
+    """Space-time reservations of the cells and moves of planned agents."""
+
+    def __init__(self):
+        """Create an empty table."""
+        self.cells = {}  # (cell, time) -> agent occupying the cell at that time
+        self.moves = {}  # (from_cell, to_cell, time) -> agent making that move between time and time + 1
+        self.parked = {}  # cell -> (agent, time) of an agent staying there from that time on
+        self.latest = {}  # cell -> last time the cell was reserved by a path (kept after releases, so it is conservative)
+        self.owned = {}  # agent -> keys of its reservations, so they can be released
+
+
+    def reserve(self, agent, cells, start_time):
+        """
+        Reserve a path and park the agent at its last cell.
+
+        Args:
+            agent (object): The agent the reservations belong to.
+            cells (list): Cell ids occupied at start_time, start_time + 1, ...
+            start_time (int): The time of the first cell.
+        """
+        self.release(agent)
+        keys = []
+        for offset, cell in enumerate(cells):
+            now = start_time + offset
+            self.cells[(cell, now)] = agent
+            keys.append((cell, now))
+            self.latest[cell] = max(self.latest.get(cell, now), now)
+            if offset:
+                self.moves[(cells[offset - 1], cell, now - 1)] = agent
+                keys.append((cells[offset - 1], cell, now - 1))
+        self.parked[cells[-1]] = (agent, start_time + len(cells) - 1)
+        self.owned[agent] = (keys, cells[-1])
+
+
+    def release(self, agent):
+        """Remove every reservation of an agent."""
+        keys, parked_cell = self.owned.pop(agent, ((), None))
+        for key in keys:
+            table = self.cells if len(key) == 2 else self.moves
+            if table.get(key) is agent:
+                del table[key]
+        if parked_cell is not None and self.parked.get(parked_cell, (None,))[0] is agent:
+            del self.parked[parked_cell]
+
+
+    def is_free(self, agent, cell, now):
+        """Return True if no other agent occupies the cell at that time."""
+        occupant = self.cells.get((cell, now), agent)
+        if occupant is not agent:
+            return False
+        parked = self.parked.get(cell)
+        return parked is None or parked[0] is agent or parked[1] > now
+
+
+    def can_move(self, agent, from_cell, to_cell, now):
+        """Return True if the agent may move between the cells from time now to now + 1."""
+        if not self.is_free(agent, to_cell, now + 1):
+            return False
+        swapping = self.moves.get((to_cell, from_cell, now), agent)  # Another agent coming the other way
+        return swapping is agent
+
+
+    def can_park(self, agent, cell, now):
+        """Return True if the agent may stay at the cell from time now on."""
+        parked = self.parked.get(cell)
+        if parked is not None and parked[0] is not agent:
+            return False
+        return self.latest.get(cell, -1) < now or all(
+            self.cells.get((cell, later), agent) is agent for later in range(now, self.latest[cell] + 1))
+
+
+def cooperative_a_star(environment, reservations, agent, start, field, start_time, max_delay, stats=None):
+    """
+    Plan a collision-free path in space-time to the source of a distance field.
+
+    Args:
+        environment (Environment): The environment providing the grid.
+        reservations (ReservationTable): The reservations of the agents planned before.
+        agent (object): The planning agent; its own reservations are ignored.
+        start (tuple): The (x, y) start position at start_time.
+        field (DistanceField): Distance field of the target, used as the heuristic.
+        start_time (int): The time the agent leaves the start.
+        max_delay (int): The most time steps the path may take beyond the obstacle distance.
+        stats (dict): Optional counters from search.new_stats, updated with record_search.
+
+    Returns:
+        tuple: The path as a list of (x, y) positions, one per time step and excluding
+        the start, and its cost; an empty path if none was found within the delay.
+    """
+    grid, distances, stride = environment.grid, field.distances, environment.stride
+    tx, ty = divmod(environment.cell_id(*field.source), stride)
+
+
+    def heuristic(cell):
+        """Exact distance to the target where the field reaches, a lower bound beyond its radius."""
+        distance = distances[cell]
+        if distance != UNREACHABLE or field.complete:
+            return distance
+        x, y = divmod(cell, stride)
+        return max(field.radius, abs(x - tx) + abs(y - ty))
+
+
+    moves = (0,) + environment.neighbor_offsets  # Waiting is a move
+    source = environment.cell_id(*start)
+    h_start = heuristic(source)
+    if h_start == UNREACHABLE:
+        return [], 0  # No path found
+    horizon = h_start + max_delay  # Longest path considered, waits included
+    queue = [(h_start, h_start, 0, source)]  # Entries are (f, h, g, cell_id)
+    parents = {(source, 0): None}  # (cell, g) -> previous cell
+    expanded, pushes, frontier = 0, 1, 1
+
+
+    found = None
+    while queue:
+        _, h, g, cell = heapq.heappop(queue)
+        expanded += 1
+        if h == 0 and reservations.can_park(agent, cell, start_time + g):
+            found = (cell, g)
+            break
+        if g >= horizon:
+            continue
+        for move in moves:
+            neighbor = cell + move
+            if grid[neighbor] or (neighbor, g + 1) in parents:
+                continue
+            if not reservations.can_move(agent, cell, neighbor, start_time + g):
+                continue
+            h_next = heuristic(neighbor)
+            if h_next == UNREACHABLE:
+                continue  # Cannot reach the target from there
+            parents[(neighbor, g + 1)] = cell
+            heapq.heappush(queue, (g + 1 + h_next, h_next, g + 1, neighbor))
+            pushes += 1
+        if len(queue) > frontier:
+            frontier = len(queue)
+
+
+    if stats is not None:
+        record_search(stats, expanded, pushes, frontier=frontier)
+    if found is None:
+        return [], 0  # No path found within the delay
+    path = []
+    cell, g = found
+    while g > 0:
+        path.append(environment.cell_position(cell))
+        cell, g = parents[(cell, g)], g - 1
+    path.reverse()
+    return path, found[1]
+
+
+class Fleet:
+    """Many agents completing the tasks of one Environment without colliding."""
+
+    def __init__(self, environment, num_agents, grid_size=None, max_delay=None):
+        """
+        Place the agents on distinct free cells.
+
+        Args:
+            environment (Environment): The environment whose tasks are completed.
+            num_agents (int): The number of agents.
+            grid_size (int): Size of the agents' sprites; defaults to the environment's grid size.
+            max_delay (int): The most time steps a planned path may spend waiting or detouring around
+                other agents; defaults to the grid's width plus height.
+        """
+        self.environment = environment  # The shared environment
+        self.max_delay = max_delay or environment.columns + environment.rows  # Bounds the space-time searches
+        self.reservations = ReservationTable()  # Shared space-time reservations
+        self.time = 0  # Current time step
+        self.fields = {}  # Cached distance field of each task location
+        self._map_version = environment.version  # Environment version the fields were built on
+        self.assignments = {}  # Agent -> the task it claimed
+        self.search_stats = new_stats()  # Work done by the space-time searches
+        self.agents_planned = 0  # Number of agent plans made
+        self.planning_time = 0.0  # Wall time spent assigning and planning
+
+
+        grid_size = grid_size or environment.grid_size
+        starts = sorted(environment.generate_random_locations(num_agents, environment.task_locations.keys()))
+        self.agents = []  # The fleet's agents
+        for x, y in starts:
+            agent = Agent(environment, grid_size)
+            agent.position = [x, y]
+            agent.rect.topleft = (x * grid_size, y * grid_size)
+            self.reservations.reserve(agent, [environment.cell_id(x, y)], 0)  # Park at the start
+            self.agents.append(agent)
+
+
+    def field(self, task, start):
+        """
+        Return a distance field of a task that reaches the start.
+
+        The breadth-first search stops once it labelled the start, so only the
+        part of the grid the path is likely to use is searched. Fields are
+        cached per task and dropped when the barriers change.
+        """
+        if self._map_version != self.environment.version:
+            self.fields.clear()
+            self._map_version = self.environment.version
+        field = self.fields.get(task)
+        if field is None or field.distance(self.environment.cell_id(*start)) is None:
+            field = DistanceField(self.environment, task, {self.environment.cell_id(*start): 0}, 1, self.search_stats)
+            self.fields[task] = field
+        return field
+
+
+    def assign_tasks(self):
+        """
+        Assign the unclaimed tasks to the idle agents in one batch.
+
+        All idle agent/task distances are computed at once, and pairs are taken
+        from the closest up, each agent and each task at most once.
+
+        Returns:
+            list: The agents that got a task.
+        """
+        environment = self.environment
+        idle = [agent for agent in self.agents if not agent.path and agent not in self.assignments]
+        tasks = [task for task in environment.task_locations if task not in environment.task_owners]
+        if not idle or not tasks:
+            return []
+        positions = np.array([agent.position for agent in idle])
+        targets = np.array(tasks)
+        distances = np.abs(positions[:, None, :] - targets[None, :, :]).sum(axis=2)  # Manhattan distance of every pair
+
+
+        assigned = []
+        taken = set()
+        for index in np.argsort(distances, axis=None, kind="stable").tolist():
+            agent_index, task_index = divmod(index, len(tasks))
+            agent, task = idle[agent_index], tasks[task_index]
+            if agent in self.assignments or task_index in taken:
+                continue
+            if environment.claim_task(task, agent):
+                self.assignments[agent] = task
+                assigned.append(agent)
+            taken.add(task_index)
+            if len(assigned) == len(idle) or len(taken) == len(tasks):
+                break
+        return assigned
+
+
+    def plan(self, agent):
+        """Plan and reserve the path of an agent to its assigned task."""
+        task = self.assignments[agent]
+        start = tuple(agent.position)
+        path, cost = cooperative_a_star(self.environment, self.reservations, agent, start, self.field(task, start),
+                                        self.time, self.max_delay, self.search_stats)
+        self.agents_planned += 1
+        if not path:  # Unreachable or blocked by the others for now: let another agent try the task
+            self.environment.release_task(task, agent)
+            del self.assignments[agent]
+            return
+        cells = [self.environment.cell_id(*start)] + [self.environment.cell_id(*position) for position in path]
+        self.reservations.reserve(agent, cells, self.time)
+        agent.path = deque(path)
+        agent.total_path_cost += cost
+        agent.moving = True
+
+
+    def step(self):
+        """
+        Assign and plan for the idle agents, then move every agent one step.
+
+        Returns:
+            int: The number of agents that moved.
+        """
+        start_time = time.perf_counter()
+        for agent in [agent for agent in self.assignments if not agent.path]:  # Arrived: the task is completed
+            self.environment.release_task(self.assignments.pop(agent), agent)
+        for agent in self.assign_tasks():
+            self.plan(agent)
+        self.planning_time += time.perf_counter() - start_time
+
+
+        moved = 0
+        for agent in self.agents:
+            if agent.path:
+                agent.move()
+                moved += 1
+            else:
+                agent.moving = False
+        self.time += 1
+        return moved
+
+
+    def run(self, max_steps=None):
+        """
+        Step until every task is completed or nothing moves anymore.
+
+        Args:
+            max_steps (int): Optional limit on the number of steps.
+
+        Returns:
+            dict: Summary of the run, see stats.
+        """
+        while self.environment.task_locations and (max_steps is None or self.time < max_steps):
+            if not self.step() and not any(agent.path for agent in self.agents):
+                break  # No agent can reach any of the remaining tasks
+        return self.stats()
+
+
+    def stats(self):
+        """Return the fleet's counters, including planning throughput in agents planned per second."""
+        return {
+            "agents": len(self.agents),
+            "steps": self.time,
+            "tasks_completed": sum(agent.task_completed for agent in self.agents),
+            "tasks_left": len(self.environment.task_locations),
+            "path_cost": sum(agent.total_path_cost for agent in self.agents),
+            "agents_planned": self.agents_planned,
+            "planning_time": self.planning_time,
+            "agents_per_second": self.agents_planned / self.planning_time if self.planning_time else 0.0,
+            "nodes_expanded": self.search_stats["nodes_expanded"],
+            "heap_pushes": self.search_stats["heap_pushes"],
+            "stale_pops": self.search_stats["stale_pops"],
+            "peak_frontier": self.search_stats["peak_frontier"],
+        }
+
+
+def main(argv=None):
+    """Run a headless fleet from the command line and report planning throughput."""
+    from benchmark import build_environment, parse_size  # Seeded maps measured in cells
+    parser = argparse.ArgumentParser(description="Headless cooperative multi-agent run")
+    parser.add_argument("--size", type=parse_size, default=(100, 100), help="grid size as COLUMNSxROWS")
+    parser.add_argument("--density", type=float, default=0.1, help="barrier density between 0 and 1")
+    parser.add_argument("--agents", type=int, default=100, help="number of agents")
+    parser.add_argument("--tasks", type=int, default=200, help="number of tasks")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--max-steps", type=int, help="stop after this many steps")
+    args = parser.parse_args(argv)
+
+
+    columns, rows = args.size
+    environment = build_environment(columns, rows, args.density, args.tasks, args.seed)
+    fleet = Fleet(environment, args.agents)
+    stats = fleet.run(args.max_steps)
+    for name, value in stats.items():
+        print(f"{name}: {value:.3f}" if isinstance(value, float) else f"{name}: {value}")
+    return stats
+
+
+if __name__ == "__main__":
+    main()  # Run the fleet
@@ -0,0 +1,348 @@
+# hpa.py
+"""
+Hierarchical pathfinding (HPA*) for very large maps.
+
+The grid is partitioned into square clusters. Along every border between two
+clusters, each run of cells that is open on both sides gets one entrance in
+its middle, or two at its ends when it is long; the two cells of an entrance
+are abstract nodes joined by an edge of cost 1. Inside a cluster, the nodes
+are joined by their breadth-first distances within the cluster. A query
+connects the start and the goal to the nodes of their clusters, runs A* on
+this abstract graph and refines only the chosen segments into cells.
+
+Clusters and borders are built on first use and cached, so the work done per
+map is proportional to the area the queries touch. When barriers change, only
+the clusters and borders containing the changed cells are rebuilt. Paths are
+near-optimal: they are optimal on the abstract graph, which can be slightly
+longer than the shortest cell path.
+"""
+import heapq  # Binary heap used as the priority queue
+import itertools  # Chain the edge lists of an abstract node
+from array import array  # Compact per-cluster distance arrays
+from collections import deque  # FIFO queue for the breadth-first searches
+from search import new_stats, record_search  # Shared search counters
+
+
+CLUSTER_SIZE = 16  # Default cluster width and height in cells
+LONG_ENTRANCE = 6  # Open runs at least this long get an entrance at each end instead of one in the middle
+
+
+class Cluster:
+    """One cluster: its bounds, a padded copy of its occupancy and its intra-cluster edges."""
+
+    def __init__(self, environment, x0, y0, x1, y1, nodes):
+        """
+        Copy the cluster's occupancy and connect its nodes.
+
+        Args:
+            environment (Environment): The environment the cluster belongs to.
+            x0, y0 (int): The first column and row of the cluster.
+            x1, y1 (int): One past the last column and row of the cluster.
+            nodes (iterable): Cell ids of the abstract nodes inside the cluster.
+        """
+        self.environment = environment  # The environment the cluster belongs to
+        self.x0, self.y0, self.x1, self.y1 = x0, y0, x1, y1  # Bounds in cells, end exclusive
+        self.stride = y1 - y0 + 2  # Local id distance between horizontally adjacent cells
+        local = environment.padded_grid[x0:x1 + 2, y0:y1 + 2].copy()  # Cluster plus a one-cell border
+        local[[0, -1], :] = 1  # Close the border, so searches stay inside the cluster
+        local[:, [0, -1]] = 1
+        self.grid = bytearray(local.tobytes())  # Padded occupancy laid out like Environment.grid
+        self.offsets = (-self.stride, -1, 1, self.stride)  # Neighbor offsets in (x, y) order
+        self.nodes = sorted(set(nodes))  # Abstract nodes, as environment cell ids
+        self.edges = {}  # node -> {other node: distance inside the cluster}
+        self.segments = {}  # (node, node) -> refined cells between two nodes, filled by queries
+        for node in self.nodes:
+            distances = self.distances(node)
+            self.edges[node] = {other: distances[self.local(other)] for other in self.nodes
+                                if other != node and distances[self.local(other)] >= 0}
+
+
+    def local(self, cell):
+        """Convert an environment cell id to a local id."""
+        x, y = self.environment.cell_position(cell)
+        return (x - self.x0 + 1) * self.stride + y - self.y0 + 1
+
+
+    def cell(self, local):
+        """Convert a local id to an environment cell id."""
+        x, y = divmod(local, self.stride)
+        return self.environment.cell_id(x - 1 + self.x0, y - 1 + self.y0)
+
+
+    def distances(self, source, stats=None):
+        """
+        Breadth-first distances inside the cluster from a cell.
+
+        A blocked source is left through its open neighbors, like the agent leaving a barrier.
+
+        Returns:
+            array: Distance per local id, -1 where unreachable.
+        """
+        grid, offsets = self.grid, self.offsets
+        distances = array("i", [-1]) * len(grid)
+        origin = self.local(source)
+        distances[origin] = 0
+        queue = deque([origin])
+        expanded = frontier = 0
+        while queue:
+            if len(queue) > frontier:
+                frontier = len(queue)
+            current = queue.popleft()
+            expanded += 1
+            distance = distances[current] + 1  # Every move costs 1
+            for offset in offsets:
+                neighbor = current + offset
+                if not grid[neighbor] and distances[neighbor] < 0:
+                    distances[neighbor] = distance
+                    queue.append(neighbor)
+        if stats is not None:
+            record_search(stats, expanded, 0, frontier=frontier)
+        return distances
+
+
+    def path(self, start, goal, stats=None):
+        """Return the cells of a shortest path inside the cluster from start to goal, excluding the start."""
+        key = (start, goal)
+        if key in self.segments:  # Paths between two nodes are reused by later queries
+            return list(self.segments[key])
+        distances = self.distances(start, stats)  # Measured from the start, which may be a blocked cell
+        current = self.local(goal)
+        path = []
+        while distances[current] > 0:  # Walk back from the goal, neighbors in (x, y) order
+            path.append(self.cell(current))
+            for offset in self.offsets:
+                if distances[current + offset] == distances[current] - 1:
+                    current += offset
+                    break
+        path.reverse()
+        if start in self.edges and goal in self.edges:
+            self.segments[key] = tuple(path)
+        return path
+
+
+class HierarchicalPlanner:
+    """HPA* planner for one Environment, rebuilt incrementally when its barriers change."""
+
+    def __init__(self, environment, cluster_size=CLUSTER_SIZE):
+        """
+        Create the planner; clusters are built on first use.
+
+        Args:
+            environment (Environment): The environment to plan in.
+            cluster_size (int): Width and height of the clusters in cells.
+        """
+        self.environment = environment  # The environment to plan in
+        self.cluster_size = cluster_size  # Width and height of the clusters in cells
+        self.clusters = {}  # (cx, cy) -> Cluster, built on first use
+        self.borders = {}  # (cluster, neighbor cluster) -> list of (cell, cell) entrances
+        self.partners = {}  # Entrance cell -> set of the cells it is joined to across a border
+        self.adjacency = {}  # Entrance cell of a built cluster -> {node: cost} of its intra-cluster and border edges
+        self.dirty = set()  # Changed (x, y) cells not yet processed
+        environment.subscribe(self.on_map_change)
+
+
+    def on_map_change(self, environment, changed):
+        """Remember the changed cells; the affected clusters are rebuilt before the next query."""
+        self.dirty.update(changed)
+
+
+    def _refresh(self):
+        """Drop the clusters and borders that contain changed cells."""
+        if not self.dirty:
+            return
+        size = self.cluster_size
+        borders, clusters = set(), set()
+        for x, y in self.dirty:
+            cluster = (x // size, y // size)
+            clusters.add(cluster)
+            cx, cy = cluster
+            if x % size == 0:
+                borders.add(((cx - 1, cy), cluster))
+            if x % size == size - 1:
+                borders.add((cluster, (cx + 1, cy)))
+            if y % size == 0:
+                borders.add(((cx, cy - 1), cluster))
+            if y % size == size - 1:
+                borders.add((cluster, (cx, cy + 1)))
+        self.dirty.clear()
+        for border in borders:
+            clusters.update(border)  # The entrances of both clusters change
+            for a, b in self.borders.pop(border, ()):
+                self.partners[a].discard(b)
+                self.partners[b].discard(a)
+        for cluster in clusters:
+            for node in getattr(self.clusters.pop(cluster, None), "nodes", ()):
+                del self.adjacency[node]
+
+
+    def cluster_of(self, cell):
+        """Return the (cx, cy) cluster containing a cell id."""
+        x, y = self.environment.cell_position(cell)
+        return x // self.cluster_size, y // self.cluster_size
+
+
+    def border(self, key):
+        """
+        Return the entrances on the border between two adjacent clusters, finding them on first use.
+
+        Args:
+            key (tuple): The two clusters, the left or upper one first.
+
+        Returns:
+            list: (cell, cell) pairs of entrance cells, the first inside the first cluster.
+        """
+        entrances = self.borders.get(key)
+        if entrances is not None:
+            return entrances
+        environment, size = self.environment, self.cluster_size
+        (cx, cy), (nx, ny) = key
+        if nx > cx:  # Vertical border: columns x and x + 1 along the cluster's rows
+            x = nx * size
+            span = range(cy * size, min((cy + 1) * size, environment.rows))
+            pair = lambda offset: (environment.cell_id(x - 1, offset), environment.cell_id(x, offset))
+            open_cells = (environment.occupancy[x - 1, span.start:span.stop] == 0) & (environment.occupancy[x, span.start:span.stop] == 0)
+        else:  # Horizontal border: rows y and y + 1 along the cluster's columns
+            y = ny * size
+            span = range(cx * size, min((cx + 1) * size, environment.columns))
+            pair = lambda offset: (environment.cell_id(offset, y - 1), environment.cell_id(offset, y))
+            open_cells = (environment.occupancy[span.start:span.stop, y - 1] == 0) & (environment.occupancy[span.start:span.stop, y] == 0)
+
+
+        entrances = []
+        run_start = None
+        for index, is_open in enumerate(open_cells.tolist() + [False]):  # The sentinel closes the last run
+            if is_open and run_start is None:
+                run_start = index
+            elif not is_open and run_start is not None:
+                length = index - run_start
+                if length >= LONG_ENTRANCE:
+                    entrances += [pair(span.start + run_start), pair(span.start + index - 1)]
+                else:
+                    entrances.append(pair(span.start + run_start + length // 2))
+                run_start = None
+        for a, b in entrances:
+            self.partners.setdefault(a, set()).add(b)
+            self.partners.setdefault(b, set()).add(a)
+        self.borders[key] = entrances
+        return entrances
+
+
+    def cluster(self, key):
+        """Return a cluster, building it and its borders on first use."""
+        cluster = self.clusters.get(key)
+        if cluster is not None:
+            return cluster
+        environment, size = self.environment, self.cluster_size
+        cx, cy = key
+        x0, y0 = cx * size, cy * size
+        x1, y1 = min(x0 + size, environment.columns), min(y0 + size, environment.rows)
+        nodes = []
+        for neighbor in ((cx - 1, cy), (cx + 1, cy), (cx, cy - 1), (cx, cy + 1)):
+            nx, ny = neighbor
+            if 0 <= nx and nx * size < environment.columns and 0 <= ny and ny * size < environment.rows:
+                border = (neighbor, key) if neighbor < key else (key, neighbor)
+                for a, b in self.border(border):
+                    nodes.append(a if border[0] == key else b)
+        cluster = self.clusters[key] = Cluster(environment, x0, y0, x1, y1, nodes)
+        for node in cluster.nodes:  # One lookup gives every edge of a node during the abstract search
+            self.adjacency[node] = {**cluster.edges[node], **dict.fromkeys(self.partners[node], 1)}
+        return cluster
+
+
+    def plan(self, start, goal, stats=None):
+        """
+        Plan a path from start to goal on the abstract graph and refine it into cells.
+
+        Args:
+            start (tuple): The (x, y) start position.
+            goal (tuple): The (x, y) goal position.
+            stats (dict): Optional counters from search.new_stats, updated with record_search.
+
+        Returns:
+            tuple: The path as a list of (x, y) positions excluding the start, and its cost.
+        """
+        self._refresh()
+        environment = self.environment
+        source, target = environment.cell_id(*start), environment.cell_id(*goal)
+        if source == target:
+            return [], 0
+        counters = stats if stats is not None else new_stats()
+
+
+        # Connect the start and the goal to the nodes of their clusters. The agent may stand on a barrier;
+        # then the search starts from its open neighbors, which can lie in other clusters.
+        grid = environment.grid
+        seeds = [source] if not grid[source] else [source + offset for offset in environment.neighbor_offsets
+                                                   if not grid[source + offset]]
+        start_edges = {}  # Seed -> {node or target: distance inside the seed's cluster}
+        goal_cluster = self.cluster(self.cluster_of(target))
+        for seed in seeds:
+            cluster = self.cluster(self.cluster_of(seed))
+            distances = cluster.distances(seed, counters)
+            start_edges[seed] = {node: distances[cluster.local(node)] for node in cluster.nodes
+                                 if node != seed and distances[cluster.local(node)] >= 0}
+            if cluster is goal_cluster and distances[cluster.local(target)] >= 0:
+                start_edges[seed][target] = distances[cluster.local(target)]
+        distances = goal_cluster.distances(target, counters)
+        goal_edges = {node: distances[goal_cluster.local(node)] for node in goal_cluster.nodes
+                      if distances[goal_cluster.local(node)] >= 0}  # Distances are symmetric on open cells
+
+
+        # A* on the abstract graph
+        stride = environment.stride
+        gx, gy = divmod(target, stride)
+        first = 0 if seeds == [source] else 1  # Cost of stepping off a blocked start
+        g_costs = {seed: first for seed in seeds}
+        parents = {seed: source if first else None for seed in seeds}
+        parents.setdefault(source, None)
+        queue = [(first, seed) for seed in seeds]
+        closed = set()
+        pushes = len(queue)
+        expanded = stale = frontier = 0
+        while queue:
+            _, node = heapq.heappop(queue)
+            if node in closed:
+                stale += 1
+                continue
+            if node == target:
+                break
+            closed.add(node)
+            expanded += 1
+            g = g_costs[node]
+            adjacency = self.adjacency.get(node)
+            if adjacency is None and node in self.partners:  # An entrance whose cluster is not built yet
+                self.cluster(self.cluster_of(node))
+                adjacency = self.adjacency.get(node)
+            edges = itertools.chain(
+                start_edges.get(node, {}).items(),
+                adjacency.items() if adjacency else (),
+                ((target, goal_edges[node]),) if node in goal_edges else ())
+            for neighbor, cost in edges:
+                g_next = g + cost
+                if neighbor not in g_costs or g_next < g_costs[neighbor]:
+                    g_costs[neighbor] = g_next
+                    parents[neighbor] = node
+                    x, y = divmod(neighbor, stride)
+                    heapq.heappush(queue, (g_next + abs(x - gx) + abs(y - gy), neighbor))
+                    pushes += 1
+            if len(queue) > frontier:
+                frontier = len(queue)
+        record_search(counters, expanded, pushes, stale, frontier)
+        if target not in parents:
+            return [], 0  # No path found
+
+
+        # Refine the abstract path segment by segment
+        nodes = []
+        node = target
+        while node is not None:
+            nodes.append(node)
+            node = parents[node]
+        nodes.reverse()
+        path = []
+        for a, b in zip(nodes, nodes[1:]):
+            if (b in self.partners.get(a, ()) and self.cluster_of(a) != self.cluster_of(b)) or a == source and first:
+                path.append(b)  # Crossing a border or stepping off a blocked start
+            else:
+                path += self.cluster(self.cluster_of(a)).path(a, b, counters)
+        return [environment.cell_position(cell) for cell in path], g_costs[target]
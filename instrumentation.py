@@ -0,0 +1,228 @@
+# instrumentation.py
+"""
+Opt-in instrumentation of the path planners.
+
+An Agent created with an Instrumentation reports every Agent.plan_path call to
+it: nodes expanded, heap pushes, stale pops skipped, peak frontier size, peak
+memory and wall time. The calls are summed into per-algorithm counters and
+latency histograms, which can be exported as JSON or in the Prometheus text
+format. Without an Instrumentation the agent only pays one None check per call.
+
+Peak memory is measured with tracemalloc and is off by default, because
+tracing slows every allocation down.
+"""
+import bisect  # Find the histogram bucket of a latency
+import json  # Export as JSON
+import time  # Measure wall time
+import tracemalloc  # Measure peak memory per call
+from search import SEARCH_COUNTERS  # Counters reported by every planner
+
+
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # Seconds
+METRIC_PREFIX = "pathfinding"  # Prefix of the exported Prometheus metric names
+
+
+class Histogram:
+    """Latency histogram with fixed bucket bounds, exported like a Prometheus histogram."""
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        """
+        Create an empty histogram.
+
+        Args:
+            bounds (tuple): Increasing upper bounds of the buckets; values above the last go to an overflow bucket.
+        """
+        self.bounds = tuple(bounds)  # Upper bounds (inclusive) of the buckets
+        self.counts = [0] * (len(self.bounds) + 1)  # Observations per bucket, the last one is the overflow
+        self.count = 0  # Number of observations
+        self.sum = 0.0  # Sum of the observed values
+
+
+    def observe(self, value):
+        """Add one observation."""
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+    def quantile(self, q):
+        """
+        Estimate a quantile as the upper bound of the bucket that contains it.
+
+        Args:
+            q (float): The quantile between 0 and 1.
+
+        Returns:
+            float: The bucket bound, infinity if the quantile lies in the overflow bucket, 0 without observations.
+        """
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+    def to_dict(self):
+        """Return the histogram as plain data."""
+        return {"bounds": list(self.bounds), "counts": list(self.counts), "count": self.count, "sum": self.sum}
+
+
+class AlgorithmMetrics:
+    """Counters and latency histogram of one algorithm."""
+
+    def __init__(self):
+        """Create zeroed metrics."""
+        self.calls = 0  # Planner calls
+        self.failures = 0  # Calls that found no path
+        self.counters = dict.fromkeys(SEARCH_COUNTERS, 0)  # Summed search work; peak_frontier keeps the maximum
+        self.peak_memory = 0  # Largest memory peak of one call in bytes
+        self.wall_time = 0.0  # Total wall time in seconds
+        self.latency = Histogram()  # Wall time per call
+
+
+    def record(self, stats, wall_time, peak_memory=0, found=True):
+        """Add one planner call."""
+        self.calls += 1
+        self.failures += not found
+        counters = self.counters
+        counters["nodes_expanded"] += stats["nodes_expanded"]
+        counters["heap_pushes"] += stats["heap_pushes"]
+        counters["stale_pops"] += stats["stale_pops"]
+        counters["peak_frontier"] = max(counters["peak_frontier"], stats["peak_frontier"])
+        self.peak_memory = max(self.peak_memory, peak_memory)
+        self.wall_time += wall_time
+        self.latency.observe(wall_time)
+
+
+    def to_dict(self):
+        """Return the metrics as plain data."""
+        return {"calls": self.calls, "failures": self.failures, **self.counters, "peak_memory": self.peak_memory,
+                "wall_time": self.wall_time, "latency": self.latency.to_dict()}
+
+
+class Instrumentation:
+    """Collects the work and latency of planner calls per algorithm."""
+
+    def __init__(self, trace_memory=False):
+        """
+        Create an empty collector.
+
+        Args:
+            trace_memory (bool): Whether to measure the peak memory of every call with tracemalloc.
+        """
+        self.trace_memory = trace_memory  # Measure peak memory per call
+        self.metrics = {}  # Algorithm name -> AlgorithmMetrics
+
+
+    def begin(self):
+        """
+        Start measuring one planner call.
+
+        Returns:
+            tuple: The token to pass to end.
+        """
+        memory = 0
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            memory = tracemalloc.get_traced_memory()[0]
+        return time.perf_counter(), memory
+
+
+    def end(self, token, algorithm, stats, found=True):
+        """
+        Finish measuring a planner call started with begin.
+
+        Args:
+            token (tuple): The token returned by begin.
+            algorithm (str): The algorithm of the call.
+            stats (dict): The search counters of this call alone, see search.new_stats.
+            found (bool): Whether the call found a path.
+        """
+        start_time, memory = token
+        wall_time = time.perf_counter() - start_time
+        peak_memory = tracemalloc.get_traced_memory()[1] - memory if self.trace_memory else 0
+        self.record(algorithm, stats, wall_time, peak_memory, found)
+
+
+    def record(self, algorithm, stats, wall_time, peak_memory=0, found=True):
+        """Add one measured planner call to the metrics of its algorithm."""
+        metrics = self.metrics.get(algorithm)
+        if metrics is None:
+            metrics = self.metrics[algorithm] = AlgorithmMetrics()
+        metrics.record(stats, wall_time, peak_memory, found)
+
+
+    def reset(self):
+        """Forget every recorded call."""
+        self.metrics.clear()
+
+
+    def text(self, algorithm):
+        """Return a short status line for one algorithm."""
+        metrics = self.metrics.get(algorithm)
+        if metrics is None:
+            return f"{algorithm}: no plans yet"
+        return (f"{algorithm}: {metrics.counters['nodes_expanded']} exp, {metrics.counters['peak_frontier']} frontier, "
+                f"p95 {1000 * metrics.latency.quantile(0.95):.2f} ms")
+
+
+    def to_dict(self):
+        """Return all metrics as plain data, keyed by algorithm."""
+        return {algorithm: metrics.to_dict() for algorithm, metrics in self.metrics.items()}
+
+
+    def to_json(self):
+        """Return all metrics as a JSON document."""
+        return json.dumps(self.to_dict(), indent=2)
+
+
+    def to_prometheus(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        lines = []
+
+
+        def family(name, kind, help_text, values):
+            """Append one metric family with a sample per algorithm."""
+            lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+            for algorithm, value in values:
+                lines.append(f"{METRIC_PREFIX}_{name}{{algorithm=\"{_escape(algorithm)}\"}} {value}")
+
+
+        items = sorted(self.metrics.items())
+        family("plans_total", "counter", "Planner calls.", [(a, m.calls) for a, m in items])
+        family("failed_plans_total", "counter", "Planner calls that found no path.", [(a, m.failures) for a, m in items])
+        family("nodes_expanded_total", "counter", "Nodes expanded.", [(a, m.counters["nodes_expanded"]) for a, m in items])
+        family("heap_pushes_total", "counter", "Open-list entries pushed.", [(a, m.counters["heap_pushes"]) for a, m in items])
+        family("stale_pops_total", "counter", "Stale open-list entries skipped.", [(a, m.counters["stale_pops"]) for a, m in items])
+        family("peak_frontier", "gauge", "Largest open list of one call.", [(a, m.counters["peak_frontier"]) for a, m in items])
+        family("peak_memory_bytes", "gauge", "Largest traced memory peak of one call.", [(a, m.peak_memory) for a, m in items])
+        name = f"{METRIC_PREFIX}_plan_seconds"
+        lines.append(f"# HELP {name} Wall time per planner call.")
+        lines.append(f"# TYPE {name} histogram")
+        for algorithm, metrics in items:
+            label = f"algorithm=\"{_escape(algorithm)}\""
+            histogram, cumulative = metrics.latency, 0
+            for bound, count in zip(histogram.bounds + (float("inf"),), histogram.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{{{label},le=\"{le}\"}} {cumulative}")
+            lines.append(f"{name}_sum{{{label}}} {histogram.sum}")
+            lines.append(f"{name}_count{{{label}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+    def save(self, path):
+        """Write the metrics to a file: Prometheus text for a .prom file, JSON otherwise."""
+        with open(path, "w") as handle:
+            handle.write(self.to_prometheus() if path.endswith(".prom") else self.to_json())
+
+
+def _escape(value):
+    """Escape a Prometheus label value."""
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
@@ -0,0 +1,248 @@
+# landmarks.py
+"""
+Landmark (ALT) heuristics for A*.
+
+A few landmark cells are chosen by farthest-point selection, so they end up
+at the far ends of the map, and the distance from each landmark to every cell
+is computed once. By the triangle inequality, the difference between the
+distances of two cells to a landmark is a lower bound of the distance between
+them. Around barrier walls this bound is much tighter than the Manhattan
+distance, so A* expands far fewer cells. The bound is admissible and
+consistent, and so is its maximum with the Manhattan distance, which is used
+for the cells the landmarks do not cover.
+
+Moves pay the traversal cost of the cell entered, so the distance from a cell
+to a landmark is not the distance back. Reversing a path swaps which end's
+cost is paid, which gives d(v, L) = d(L, v) - cost(v) + cost(L). One
+table per landmark therefore bounds both directions.
+
+The tables store one distance per cell id as uint16, or as uint32 when a
+distance does not fit; unreachable cells hold the largest value. A table is
+valid for the map version it was built on. Environment.landmark_table caches
+it and rebuilds it after the barriers or terrain change.
+"""
+import time  # Measure the build time
+from array import array  # Compact per-cell distance tables
+from collections import deque  # FIFO queue for the unit-cost breadth-first search
+import numpy as np  # Pick the farthest cells and narrow the tables
+from search import make_queue  # Bucket queue for the weighted distance fields
+
+
+DEFAULT_LANDMARKS = 8  # Landmarks per table
+ACTIVE_LANDMARKS = 4  # Landmarks consulted per query: those with the best bound at the start
+ORIGIN_ATTEMPTS = 32  # Regions searched for one holding most free cells before the largest one found is used
+UNREACHED = -1  # Distance of unreached cells while a field is built
+
+
+class LandmarkTable:
+    """Distances from a few landmark cells to every cell, used as an A* heuristic."""
+
+    def __init__(self, environment, count=DEFAULT_LANDMARKS, origin=None):
+        """
+        Choose the landmarks and compute their distance tables.
+
+        Args:
+            environment (Environment): The environment to build the tables for.
+            count (int): The number of landmarks.
+            origin (tuple): A free (x, y) cell in the part of the map the queries use; the landmarks are
+                chosen among the cells reachable from it. By default the region holding most free cells is used.
+        """
+        started = time.perf_counter()
+        self.environment = environment  # The environment the tables belong to
+        self.version = environment.version  # Map version the tables are valid for
+        self.requested = count  # Landmarks asked for; small maps may have fewer
+        self.weighted = environment.max_cost > 1  # Whether the reversed distances need the cost correction
+        self.expanded = 0  # Cells expanded while building, the preprocessing work
+        nearest = self._region(origin)  # Distances from the origin, -1 outside its region
+
+
+        # Farthest-point selection: every landmark is the reachable cell farthest from the ones chosen so far
+        fields = []
+        if nearest is not None:  # The first landmark is farthest from the origin
+            for _ in range(count):
+                landmark = int(np.argmax(nearest))
+                if nearest[landmark] <= 0:
+                    break  # Every reachable cell is a landmark already
+                field = self._field(landmark)
+                fields.append((landmark, field))
+                distances = np.frombuffer(field, dtype=np.int32)
+                nearest = distances.copy() if len(fields) == 1 else np.minimum(nearest, distances)
+
+
+        # Store the fields in the narrowest type that holds every distance
+        largest = max((int(np.frombuffer(field, dtype=np.int32).max()) for _, field in fields), default=0)
+        self.typecode = "H" if largest < 0xFFFF else "I"  # uint16 or uint32
+        self.unreachable = 0xFFFF if self.typecode == "H" else 0xFFFFFFFF  # Stored for unreachable cells
+        dtype = np.uint16 if self.typecode == "H" else np.uint32
+        self.landmarks = []  # Landmark cell ids
+        self.tables = []  # Distance from each landmark to every cell id
+        for landmark, field in fields:
+            distances = np.frombuffer(field, dtype=np.int32)
+            table = array(self.typecode)
+            table.frombytes(np.where(distances < 0, self.unreachable, distances).astype(dtype).tobytes())
+            self.landmarks.append(landmark)
+            self.tables.append(table)
+        self.build_time = time.perf_counter() - started  # Seconds spent building
+
+
+    @property
+    def count(self):
+        """Number of landmarks."""
+        return len(self.landmarks)
+
+
+    @property
+    def nbytes(self):
+        """Memory used by the distance tables in bytes."""
+        return sum(len(table) * table.itemsize for table in self.tables)
+
+
+    def _region(self, origin):
+        """
+        Return the distances from the origin the landmark selection starts at.
+
+        Without an origin, regions are searched from the first free cell not
+        yet reached until one holds at least half of the free cells, so small
+        pockets walled in by barriers do not take the landmarks.
+
+        Returns:
+            numpy.ndarray: int32 distances by cell id, -1 where unreachable; None on a map without free cells.
+        """
+        environment = self.environment
+        if origin is not None and not environment.is_barrier(*origin):
+            return np.frombuffer(self._field(environment.cell_id(*origin)), dtype=np.int32)
+        unreached = np.frombuffer(environment.grid, dtype=np.uint8) == 0  # Free cells of no region searched yet
+        half, best = np.count_nonzero(unreached) / 2, None
+        for _ in range(ORIGIN_ATTEMPTS):
+            if not unreached.any():
+                break
+            distances = np.frombuffer(self._field(int(np.argmax(unreached))), dtype=np.int32)
+            reached = distances >= 0
+            if best is None or np.count_nonzero(reached) > np.count_nonzero(best >= 0):
+                best = distances
+            if np.count_nonzero(reached) >= half:
+                break
+            unreached &= ~reached
+        return best
+
+
+    def _field(self, source):
+        """Return the distances from a source cell id to every cell id, UNREACHED where there is no path."""
+        environment = self.environment
+        grid, offsets = environment.grid, environment.neighbor_offsets
+        distances = array("i", [UNREACHED]) * len(grid)
+        distances[source] = 0
+        expanded = 0
+        if not self.weighted:  # Every move costs 1: breadth-first search
+            queue = deque([source])
+            while queue:
+                current = queue.popleft()
+                expanded += 1
+                distance = distances[current] + 1
+                for offset in offsets:
+                    neighbor = current + offset
+                    if not grid[neighbor] and distances[neighbor] == UNREACHED:
+                        distances[neighbor] = distance
+                        queue.append(neighbor)
+        else:  # Dijkstra over the terrain costs
+            costs = environment.costs
+            queue = make_queue(environment.max_cost)
+            queue.push((0, 0, source))
+            while queue:
+                distance, _, current = queue.pop()
+                if distance != distances[current]:
+                    continue  # Stale entry of a cell reached more cheaply
+                expanded += 1
+                for offset in offsets:
+                    neighbor = current + offset
+                    if grid[neighbor]:
+                        continue
+                    candidate = distance + costs[neighbor]
+                    if distances[neighbor] == UNREACHED or candidate < distances[neighbor]:
+                        distances[neighbor] = candidate
+                        queue.push((candidate, 0, neighbor))
+        self.expanded += expanded
+        return distances
+
+
+    def heuristic(self, goals, start=None, active=ACTIVE_LANDMARKS):
+        """
+        Return an A* heuristic for the goals.
+
+        Args:
+            goals (iterable): The (x, y) goal positions; the estimate is to the closest one.
+            start (tuple): The (x, y) start of the query; when given, only the active landmarks with the
+                best bounds at the start are consulted, which keeps each estimate cheap.
+            active (int): The number of landmarks to consult with a start.
+
+        Returns:
+            callable: h(cell_id), the maximum of the landmark bounds and the Manhattan distance to the goals.
+        """
+        environment = self.environment
+        stride, costs, unreachable = environment.stride, environment.costs, self.unreachable
+        weighted = self.weighted
+        goal_cells = [environment.cell_id(*goal) for goal in goals]
+        padded_goals = [divmod(goal, stride) for goal in goal_cells]
+        terms = []  # Per goal: (table, distance of the goal, cost of the goal) of every landmark that reaches it
+        for goal in goal_cells:
+            terms.append([(table, table[goal], costs[goal] if weighted else 0) for table in self.tables
+                          if table[goal] != unreachable])
+
+
+        if start is not None and len(terms) == 1 and len(terms[0]) > active:
+            source = environment.cell_id(*start)
+            source_cost = costs[source] if weighted else 0
+
+
+            def bound(term):
+                """Bound of one landmark at the start."""
+                table, goal_distance, goal_cost = term
+                distance = table[source]
+                if distance == unreachable:
+                    return -1
+                return max(goal_distance - distance, distance - goal_distance + goal_cost - source_cost)
+
+
+            terms[0] = sorted(terms[0], key=bound, reverse=True)[:active]
+
+
+        estimates = [_estimate(stride, costs if weighted else None, unreachable, goal, goal_terms)
+                     for goal, goal_terms in zip(padded_goals, terms)]
+        if len(estimates) == 1:
+            return estimates[0]
+        if not estimates:
+            return lambda cell: 0
+        return lambda cell: min(estimate(cell) for estimate in estimates)  # The closest goal
+
+
+def _estimate(stride, costs, unreachable, goal, terms):
+    """
+    Return the heuristic for one goal.
+
+    Args:
+        stride (int): The Environment's stride.
+        costs (bytearray): The padded traversal costs, or None when every move costs 1.
+        unreachable (int): The table value of unreachable cells.
+        goal (tuple): The goal in padded (x, y) coordinates.
+        terms (list): (table, distance of the goal, cost of the goal) of the landmarks to consult.
+    """
+    gx, gy = goal
+
+
+    def estimate(cell):
+        """Lower bound of the cost from a cell to the goal."""
+        x, y = divmod(cell, stride)
+        h = abs(x - gx) + abs(y - gy)  # Every move costs at least 1
+        cell_cost = costs[cell] if costs is not None else 0
+        for table, goal_distance, goal_cost in terms:
+            distance = table[cell]
+            if distance == unreachable:
+                continue
+            if goal_distance - distance > h:  # d(L, goal) <= d(L, cell) + d(cell, goal)
+                h = goal_distance - distance
+            if distance - goal_distance + goal_cost - cell_cost > h:  # d(cell, L) <= d(cell, goal) + d(goal, L)
+                h = distance - goal_distance + goal_cost - cell_cost
+        return h
+
+
+    return estimate
@@ -0,0 +1,165 @@
+# mapio.py
+"""
+Saving and loading maps.
+
+Maps are stored in a small versioned binary format: a fixed header, the
+barrier grid packed to one bit per cell, a task table and, for maps with
+terrain costs, a terrain layer of one byte per cell. Loading memory-maps
+the file and unpacks the bitmap block by block straight into the
+Environment's padded grid with NumPy, and copies the terrain layer straight
+from the mapping into its cost grid. No per-cell Python objects and no
+full-size temporary arrays are built. Loading still takes time linear in
+the cells, since the Environment keeps its own grid and cost layer.
+
+MovingAI benchmark maps (``.map``) and scenarios (``.scen``) can be imported
+too, so results can be compared with published numbers. MovingAI's optimal
+lengths are for 8-connected movement with diagonal cost sqrt(2); the agent
+moves 4-connected, so its path costs are never shorter.
+
+File layout (little endian):
+    header   magic "GMAP", format version (u16), flags (u16), columns (u32),
+             rows (u32), number of tasks (u32), bitmap bytes (u64), padding (u32)
+    bitmap   occupancy[x, y] in x-major order, packed with numpy.packbits
+    padding  to a multiple of 8 bytes
+    tasks    (x, y, task number) as three u32 per task
+    padding  to a multiple of 8 bytes
+    terrain  only if flags has FLAG_TERRAIN: terrain[x, y] in x-major order, one u8 cost per cell
+"""
+import mmap  # Map the file instead of reading it into memory
+import struct  # Pack the header
+from collections import namedtuple  # Lightweight scenario records
+import numpy as np  # Pack and unpack the bitmap
+from environment import Environment  # Import the Environment class from the environment module
+
+
+MAGIC = b"GMAP"  # File signature
+FORMAT_VERSION = 2  # Incremented whenever the layout changes; version 2 added the terrain layer
+FLAG_TERRAIN = 1  # Header flag: a terrain layer follows the task table
+HEADER = struct.Struct("<4sHHIIIQ4x")  # magic, version, flags, columns, rows, tasks, bitmap bytes
+TASK_DTYPE = np.dtype([("x", "<u4"), ("y", "<u4"), ("number", "<u4")])  # One row of the task table
+PASSABLE = b".GS"  # MovingAI terrain the agent can enter: ground and swamp
+
+Scenario = namedtuple("Scenario", "bucket map width height start goal optimal_length")  # One line of a .scen file
+
+
+def _aligned(size):
+    """Round a byte count up to a multiple of 8."""
+    return (size + 7) // 8 * 8
+
+
+def save(environment, path):
+    """
+    Save the barriers and tasks of an environment.
+
+    Args:
+        environment (Environment): The environment to save.
+        path (str): The file to write.
+    """
+    bitmap = np.packbits(environment.occupancy, axis=None)  # One bit per cell, x-major
+    tasks = np.array([(x, y, number) for (x, y), number in environment.task_locations.items()], dtype=TASK_DTYPE)
+    flags = FLAG_TERRAIN if environment.max_cost > 1 else 0  # Maps without terrain costs skip the layer
+    with open(path, "wb") as handle:
+        handle.write(HEADER.pack(MAGIC, FORMAT_VERSION, flags, environment.columns, environment.rows, len(tasks), bitmap.nbytes))
+        handle.write(bitmap.tobytes())
+        handle.write(bytes(_aligned(bitmap.nbytes) - bitmap.nbytes))
+        handle.write(tasks.tobytes())
+        if flags & FLAG_TERRAIN:
+            handle.write(bytes(_aligned(tasks.nbytes) - tasks.nbytes))
+            handle.write(np.ascontiguousarray(environment.terrain).tobytes())
+
+
+def load(path, grid_size=1):
+    """
+    Load an environment saved with save.
+
+    Args:
+        path (str): The file to read.
+        grid_size (int): The size of each grid cell in pixels.
+
+    Returns:
+        Environment: The loaded environment.
+
+    Raises:
+        ValueError: If the file is not a map file or was written by a newer format version.
+    """
+    with open(path, "rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if len(data) < HEADER.size:
+            raise ValueError(f"{path} is not a map file")
+        magic, version, flags, columns, rows, num_tasks, bitmap_bytes = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a map file")
+        if version > FORMAT_VERSION:
+            raise ValueError(f"{path} uses map format version {version}, newer than {FORMAT_VERSION}")
+        bitmap = np.frombuffer(data, dtype=np.uint8, count=bitmap_bytes, offset=HEADER.size)
+        tasks_offset = HEADER.size + _aligned(bitmap_bytes)
+        tasks = np.frombuffer(data, dtype=TASK_DTYPE, count=num_tasks, offset=tasks_offset)
+        task_locations = {(x, y): number for x, y, number in tasks.tolist()}
+        terrain = None
+        if flags & FLAG_TERRAIN:
+            terrain = np.frombuffer(data, dtype=np.uint8, count=columns * rows,
+                                    offset=tasks_offset + _aligned(tasks.nbytes)).reshape(columns, rows)
+        environment = Environment.from_bitmap(bitmap, columns, rows, task_locations, grid_size, terrain=terrain)
+        del bitmap, tasks, terrain  # Release the views before the map is closed
+    return environment
+
+
+def read_movingai_map(path):
+    """
+    Read a MovingAI .map file.
+
+    Returns:
+        numpy.ndarray: The occupancy grid indexed [x, y], 1 where the agent cannot go.
+    """
+    with open(path, "rb") as handle:
+        header = {}
+        for line in handle:
+            line = line.strip()
+            if line == b"map":
+                break
+            key, _, value = line.partition(b" ")
+            header[key.decode()] = value.decode()
+        height, width = int(header["height"]), int(header["width"])
+        cells = np.frombuffer(b"".join(line.rstrip(b"\r\n") for line in handle), dtype=np.uint8)
+    if cells.size != width * height:
+        raise ValueError(f"{path}: expected {width}x{height} cells, found {cells.size}")
+    passable = np.isin(cells, np.frombuffer(PASSABLE, dtype=np.uint8))
+    return (~passable).astype(np.uint8).reshape(height, width).T  # Rows are y, characters are x
+
+
+def read_movingai_scenarios(path):
+    """
+    Read a MovingAI .scen file.
+
+    Returns:
+        list: The Scenario records in file order.
+    """
+    scenarios = []
+    with open(path) as handle:
+        for line in handle:
+            fields = line.split()
+            if len(fields) != 9:
+                continue  # The "version" line
+            bucket, name, width, height, start_x, start_y, goal_x, goal_y, length = fields
+            scenarios.append(Scenario(int(bucket), name, int(width), int(height), (int(start_x), int(start_y)),
+                                      (int(goal_x), int(goal_y)), float(length)))
+    return scenarios
+
+
+def import_movingai(map_path, scen_path=None, num_tasks=None, grid_size=1):
+    """
+    Build an environment from a MovingAI map, with the scenario goals as tasks.
+
+    Args:
+        map_path (str): The .map file.
+        scen_path (str): Optional .scen file whose distinct goals become the tasks.
+        num_tasks (int): Optional limit on the number of tasks, taken in file order.
+        grid_size (int): The size of each grid cell in pixels.
+
+    Returns:
+        tuple: The Environment and the list of Scenario records (empty without scen_path).
+    """
+    occupancy = read_movingai_map(map_path)
+    scenarios = read_movingai_scenarios(scen_path) if scen_path else []
+    goals = list(dict.fromkeys(scenario.goal for scenario in scenarios))[:num_tasks]
+    task_locations = {goal: number for number, goal in enumerate(goals, start=1)}
+    return Environment.from_grid(occupancy, task_locations, grid_size), scenarios
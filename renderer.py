@@ -0,0 +1,282 @@
+# renderer.py
+"""
+Rendering layer for run.py that scales to large grids.
+
+The static layer (background, grid lines and barriers) is built once with
+NumPy and kept as a surface; barrier changes reported by the Environment only
+repaint the changed cells. Text is rendered once per distinct string and kept
+in a glyph cache. Each frame only the cells that changed (moved sprites,
+added or completed tasks, changed barriers) and the status panel, if its
+content changed, are redrawn and passed to pygame.display.update.
+"""
+import time  # Measure frame times
+from collections import deque  # Sliding window of frame times
+import numpy as np  # Build the static layer in one vectorized pass
+import pygame  # Import Pygame for surfaces and drawing
+
+
+BACKGROUND_COLOR = (255, 255, 255)  # White background
+GRID_COLOR = (200, 200, 200)  # Light grey grid lines
+BARRIER_COLOR = (0, 0, 0)  # Black barriers
+TASK_COLOR = (255, 0, 0)  # Red tasks
+TERRAIN_COLOR = (150, 110, 60)  # Brown shade of the most expensive terrain
+TERRAIN_LEVELS = 8  # Costs from 1 to 1 + TERRAIN_LEVELS are shaded from the background to TERRAIN_COLOR
+TEXT_COLOR = (0, 0, 0)  # Black text
+LINE_HEIGHT = 30  # Vertical distance between status lines
+MAX_GLYPHS = 4096  # Glyph cache size; the cache is emptied when it grows beyond
+
+
+def terrain_color(cost):
+    """Return the fill color of a free cell with the given traversal cost; works on NumPy arrays of costs too."""
+    shade = np.minimum(np.asarray(cost, dtype=np.float64) - 1, TERRAIN_LEVELS) / TERRAIN_LEVELS
+    color = np.array(BACKGROUND_COLOR) + shade * (np.array(TERRAIN_COLOR) - np.array(BACKGROUND_COLOR))
+    return tuple(color.astype(int).tolist()) if color.ndim == 1 else color.astype(np.uint8)
+
+
+class FrameTimer:
+    """Frame-time counter over a sliding window of recent frames."""
+
+    REFRESH = 0.5  # Seconds between updates of the status line
+
+    def __init__(self, window=120):
+        """
+        Create the counter.
+
+        Args:
+            window (int): The number of recent frames averaged.
+        """
+        self.times = deque(maxlen=window)  # Durations of the recent frames in seconds
+        self.last = None  # perf_counter at the previous tick
+        self._text = self._format()  # Status line, refreshed every REFRESH seconds
+        self._text_time = 0.0  # perf_counter when the status line was refreshed
+
+
+    def tick(self):
+        """Record the end of a frame."""
+        now = time.perf_counter()
+        if self.last is not None:
+            self.times.append(now - self.last)
+        self.last = now
+
+
+    @property
+    def frame_time(self):
+        """Average frame time in milliseconds."""
+        return 1000 * sum(self.times) / len(self.times) if self.times else 0.0
+
+
+    @property
+    def worst_frame_time(self):
+        """Longest recent frame time in milliseconds."""
+        return 1000 * max(self.times) if self.times else 0.0
+
+
+    @property
+    def fps(self):
+        """Average frames per second."""
+        return 1000 / self.frame_time if self.times and self.frame_time else 0.0
+
+
+    def text(self):
+        """Return a short status line; it is refreshed only every REFRESH seconds so the panel stays clean."""
+        if self.last is not None and self.last - self._text_time >= self.REFRESH:
+            self._text = self._format()
+            self._text_time = self.last
+        return self._text
+
+
+    def _format(self):
+        """Format the current averages as a status line."""
+        return f"Frame: {self.frame_time:.1f} ms avg, {self.worst_frame_time:.1f} ms max ({self.fps:.0f} FPS)"
+
+
+class Renderer:
+    """Draws the environment, sprites and status panel, redrawing only what changed."""
+
+    def __init__(self, screen, environment, grid_size, font, map_size, panel_rect):
+        """
+        Create the renderer and build the static layer.
+
+        Args:
+            screen (pygame.Surface): The display surface.
+            environment (Environment): The environment to draw.
+            grid_size (int): The size of each grid cell in pixels.
+            font (pygame.font.Font): The font for task numbers and status text.
+            map_size (tuple): Width and height of the map area in pixels.
+            panel_rect (pygame.Rect): The area of the status panel.
+        """
+        self.screen = screen  # The display surface
+        self.environment = environment  # The environment to draw
+        self.grid_size = grid_size  # The size of each grid cell in pixels
+        self.font = font  # The font for all text
+        self.map_size = map_size  # Width and height of the map area
+        self.panel_rect = pygame.Rect(panel_rect)  # The area of the status panel
+        self.glyphs = {}  # Rendered text surfaces keyed by (text, color)
+        self.static = pygame.Surface(map_size)  # Background, grid lines and barriers
+        self.drawn_tasks = {}  # Tasks as shown on the screen
+        self.drawn_sprites = {}  # Sprite -> rect as shown on the screen
+        self.drawn_panel = None  # Panel content as shown on the screen
+        self.changed_cells = set()  # Cells whose barrier changed since the last frame
+        self.full_redraw = True  # Redraw everything on the next frame
+        self.timer = FrameTimer()  # Frame-time counter
+        self.build_static()
+        environment.subscribe(self.on_map_change)
+
+
+    def glyph(self, text, color=TEXT_COLOR):
+        """Return the rendered surface of a text, rendering it only the first time."""
+        key = (text, color)
+        surface = self.glyphs.get(key)
+        if surface is None:
+            if len(self.glyphs) >= MAX_GLYPHS:
+                self.glyphs.clear()  # Changing status lines would otherwise grow the cache forever
+            surface = self.glyphs[key] = self.font.render(text, True, color)
+        return surface
+
+
+    def build_static(self):
+        """Render background, grid lines, terrain and barriers of the whole map into the static layer."""
+        width, height = self.map_size
+        grid_size, environment = self.grid_size, self.environment
+        xs, ys = np.arange(width), np.arange(height)
+        columns, rows = xs // grid_size, ys // grid_size
+        edge_x = (xs % grid_size == 0) | (xs % grid_size == grid_size - 1)  # Cell outlines like pygame.draw.rect(..., 1)
+        edge_y = (ys % grid_size == 0) | (ys % grid_size == grid_size - 1)
+        inside_x, inside_y = columns < environment.columns, rows < environment.rows  # Partial cells at the border are never blocked
+        blocked = environment.occupancy[np.minimum(columns, environment.columns - 1)][:, np.minimum(rows, environment.rows - 1)]
+        blocked = blocked.astype(bool) & inside_x[:, None] & inside_y[None, :]
+        pixels = np.where((edge_x[:, None] | edge_y[None, :])[..., None], GRID_COLOR, BACKGROUND_COLOR).astype(np.uint8)
+        if environment.max_cost > 1:  # Shade the inside of the cells by their traversal cost
+            costs = environment.terrain[np.minimum(columns, environment.columns - 1)][:, np.minimum(rows, environment.rows - 1)]
+            shaded = (costs > 1) & ~(edge_x[:, None] | edge_y[None, :]) & inside_x[:, None] & inside_y[None, :]
+            pixels[shaded] = terrain_color(costs[shaded, None])
+        pixels[blocked] = BARRIER_COLOR
+        pygame.surfarray.blit_array(self.static, pixels)
+        self.changed_cells.clear()
+        self.full_redraw = True
+
+
+    def on_map_change(self, environment, changed):
+        """Remember the cells whose barriers changed; large changes rebuild the whole layer."""
+        if len(changed) > environment.columns * environment.rows // 16:
+            self.build_static()
+        else:
+            self.changed_cells.update(changed)
+
+
+    def cell_rect(self, x, y):
+        """Return the screen rectangle of a grid cell."""
+        return pygame.Rect(x * self.grid_size, y * self.grid_size, self.grid_size, self.grid_size)
+
+
+    def draw_static_cell(self, x, y):
+        """Repaint one cell of the static layer after its barrier changed."""
+        rect = self.cell_rect(x, y)
+        if self.environment.is_barrier(x, y):
+            pygame.draw.rect(self.static, BARRIER_COLOR, rect)
+        else:
+            pygame.draw.rect(self.static, terrain_color(self.environment.terrain[x, y]), rect)
+            pygame.draw.rect(self.static, GRID_COLOR, rect, 1)
+
+
+    def draw_task(self, location, task_number):
+        """Draw a task square with its number."""
+        x, y = location
+        rect = self.cell_rect(x, y)
+        pygame.draw.rect(self.screen, TASK_COLOR, rect)
+        self.screen.set_clip(rect)  # Keep the number inside the cell, so restoring the cell erases it
+        self.screen.blit(self.glyph(str(task_number)), (rect.x + self.grid_size // 4, rect.y + self.grid_size // 4))
+        self.screen.set_clip(None)
+
+
+    def restore_cell(self, x, y):
+        """Redraw a cell without sprites: the static layer and the task on it, if any."""
+        rect = self.cell_rect(x, y)
+        self.screen.blit(self.static, rect, rect)
+        task_number = self.environment.task_locations.get((x, y))
+        if task_number is not None:
+            self.draw_task((x, y), task_number)
+        return rect
+
+
+    def draw_panel(self, lines, buttons, footer):
+        """
+        Redraw the status panel.
+
+        Args:
+            lines (list): Status lines drawn from the top of the panel.
+            buttons (list): (rect, color, label, label_color) tuples of the buttons.
+            footer (str): Line drawn at the bottom of the panel.
+        """
+        self.screen.fill(BACKGROUND_COLOR, self.panel_rect)
+        for rect, color, label, label_color in buttons:
+            pygame.draw.rect(self.screen, color, rect)
+            text = self.glyph(label, label_color)
+            self.screen.blit(text, (rect.x + (rect.width - text.get_width()) // 2, rect.y + (rect.height - text.get_height()) // 2))
+        line_y = self.panel_rect.y + 10  # Starting Y position for text
+        for line in lines:
+            self.screen.blit(self.glyph(line), (self.panel_rect.x + 10, line_y))
+            line_y += LINE_HEIGHT
+        footer_text = self.glyph(footer)
+        self.screen.blit(footer_text, (self.panel_rect.x + 10, self.panel_rect.bottom - 10 - footer_text.get_height()))
+
+
+    def draw(self, sprites, lines, buttons):
+        """
+        Draw one frame and update only the changed parts of the display.
+
+        Args:
+            sprites (iterable): The sprites to draw on the map.
+            lines (list): Status lines of the panel; the frame time is shown below them at the bottom.
+            buttons (list): (rect, color, label, label_color) tuples of the panel buttons.
+
+        Returns:
+            list: The rectangles that were updated.
+        """
+        tasks = self.environment.task_locations
+        sprites = list(sprites)
+        dirty = []
+        if self.full_redraw:
+            self.screen.blit(self.static, (0, 0))
+            for location, task_number in tasks.items():
+                self.draw_task(location, task_number)
+            for sprite in sprites:
+                self.screen.blit(sprite.image, sprite.rect)
+            dirty.append(pygame.Rect((0, 0), self.map_size))
+            self.drawn_panel = None
+        else:
+            cells = set()  # Cells to restore before the sprites are drawn again
+            for x, y in self.changed_cells:
+                self.draw_static_cell(x, y)
+                cells.add((x, y))
+            for location in tasks.keys() ^ self.drawn_tasks.keys():  # Added or completed tasks
+                cells.add(location)
+            moved = [sprite for sprite in sprites if self.drawn_sprites.get(sprite) != sprite.rect]
+            for sprite in moved:
+                old = self.drawn_sprites.get(sprite)
+                if old is not None:
+                    cells.add((old.x // self.grid_size, old.y // self.grid_size))
+            for x, y in cells:
+                dirty.append(self.restore_cell(x, y))
+            for sprite in sprites:  # Moved sprites and those standing on a restored cell
+                if sprite in moved or (sprite.rect.x // self.grid_size, sprite.rect.y // self.grid_size) in cells:
+                    self.screen.blit(sprite.image, sprite.rect)
+                    dirty.append(sprite.rect.copy())
+        self.changed_cells.clear()
+        self.drawn_tasks = dict(tasks)
+        self.drawn_sprites = {sprite: sprite.rect.copy() for sprite in sprites}
+
+
+        panel = (tuple(lines), tuple((tuple(rect), color, label, label_color) for rect, color, label, label_color in buttons),
+                 self.timer.text())
+        if panel != self.drawn_panel:
+            self.draw_panel(lines, buttons, panel[2])
+            self.drawn_panel = panel
+            dirty.append(self.panel_rect)
+        if self.full_redraw:
+            pygame.display.flip()
+            self.full_redraw = False
+        elif dirty:
+            pygame.display.update(dirty)
+        self.timer.tick()
+        return dirty
@@ -5,39 +5,43 @@ import pygame  # Import Pygame for graphics and game logic
 import sys  # Import sys for system-specific parameters and functions
 from agent import Agent  # Import the Agent class from the agent module
 from environment import Environment  # Import the Environment class from the environment module
+from cache import PathCache  # Import the PathCache class so replanning on an unchanged map is skipped
+from renderer import Renderer  # Import the Renderer that redraws only the changed parts of the screen
+from simulation import Simulation  # Import the Simulation that steps the agent on its own fixed timestep
+from instrumentation import Instrumentation  # Import the collector of per-call search metrics
+from background import BackgroundPlanner  # Import the planner that searches on a worker thread
 
 
 # Constants for screen and grid settings
 WINDOW_WIDTH, WINDOW_HEIGHT = 800, 600  # Dimensions of the main window
 GRID_SIZE = 40  # Size of each cell in the grid
 STATUS_WIDTH = 300  # Width of the status panel on the side
+METRICS_FILES = ("metrics.json", "metrics.prom")  # Files written when E is pressed
+ALGORITHMS = ("UCS", "A*", "ARA*")  # Algorithms the Toggle button cycles through
+IMPROVE_BUDGET = 0.004  # Seconds per frame spent improving an ARA* path, well inside a 60 FPS frame
 
 
-# Color constants for various elements
-BACKGROUND_COLOR = (255, 255, 255)  # White background
-BARRIER_COLOR = (0, 0, 0)  # Black barriers
-TASK_COLOR = (255, 0, 0)  # Red tasks
-TEXT_COLOR = (0, 0, 0)  # Black text
+# Color constants for the buttons; the map colors are defined in renderer.py
 BUTTON_COLOR = (0, 200, 0)  # Green buttons
 BUTTON_HOVER_COLOR = (0, 255, 0)  # Brighter green for hover effect
 BUTTON_TEXT_COLOR = (255, 255, 255)  # White text for buttons
-MOVEMENT_DELAY = 100  # Delay in milliseconds for agent movement 200
+MOVEMENT_DELAY = 100  # Delay in milliseconds for agent movement 200 (the simulation's fixed timestep)
 AGENT_COLOR = (128, 0, 128)  # blue color
 
 
-def draw_grid(screen, width, height, grid_size):
-    """
-    Draw a grid on the screen to help visualize the environment.
+def next_algorithm(algorithm):
+    """Return the algorithm the Toggle button switches to."""
+    return ALGORITHMS[(ALGORITHMS.index(algorithm) + 1) % len(ALGORITHMS)]
 
 
-    :param screen: Pygame screen to draw on
-    :param width: Width of the screen
-    :param height: Height of the screen
-    :param grid_size: Size of each grid cell
-    """
-    for x in range(0, width, grid_size):  # Draw vertical grid lines
-        for y in range(0, height, grid_size):  # Draw horizontal grid lines
-            pygame.draw.rect(screen, (200, 200, 200), (x, y, grid_size, grid_size), 1)
+def planner_text(planner, agent):
+    """Return the status line of the background planner."""
+    if planner.busy:
+        return "Planner: searching..."
+    search = agent.anytime_search
+    if search is not None and agent.algorithm == "ARA*":
+        return f"Planner: ARA* path within {search.bound:.2f}x of optimal"
+    return "Planner: idle"
 
 
 def main():
@@ -53,14 +57,21 @@ def main():
     environment = Environment(WINDOW_WIDTH, WINDOW_HEIGHT, GRID_SIZE, num_tasks=5, num_barriers=15)  # Create the environment 5
     initial_task_locations = environment.task_locations.copy()  # this method Save initial task locations for resets
     initial_barrier_locations = environment.barrier_locations.copy()  # Save initial barrier locations for resets
-    agent = Agent(environment, GRID_SIZE)  # Create the agent
+    path_cache = PathCache()  # Cache of planned paths, shared across resets of the same map
+    instrumentation = Instrumentation()  # Search work and latency of every planner call, per algorithm
+    agent = Agent(environment, GRID_SIZE, path_cache, instrumentation)  # Create the agent
     all_sprites = pygame.sprite.Group()  # Group to manage all sprites for visulaize object
     all_sprites.add(agent)  # Add the agent to the sprite group
+    renderer = Renderer(screen, environment, GRID_SIZE, font, (WINDOW_WIDTH, WINDOW_HEIGHT),
+                        (WINDOW_WIDTH, 0, STATUS_WIDTH, WINDOW_HEIGHT))  # Cached layers and dirty-rect updates
 
 
     algorithm = "UCS"  # Default algorithm to UCS (Uniform Cost Search)
+    planner = BackgroundPlanner(agent)  # Plans the legs on a worker thread so the window never freezes
+    simulation = Simulation(agent, algorithm, MOVEMENT_DELAY / 1000, planner=planner,
+                            improve_budget=IMPROVE_BUDGET)  # Steps the agent independently of the frame rate
     simulation_started = False  # Flag to track if the simulation has started
-    efficiency_metrics = {"UCS": {"total_cost": 0}, "A*": {"total_cost": 0}}  # Store efficiency metrics for both algorithms
+    efficiency_metrics = {name: {"total_cost": 0} for name in ALGORITHMS}  # Store efficiency metrics for every algorithm
 
 
     # Button dimensions and positions
@@ -72,86 +83,52 @@ def main():
     toggle_button_rect = pygame.Rect(start_button_x, toggle_button_y, button_width, button_height)  # Rect for Toggle button
 
 
-    last_move_time = pygame.time.get_ticks()  # Track the time of the last movement
+    frame_time = 0  # Milliseconds since the previous frame
 
 
     while True:  # Main game loop
         # Handle events
         for event in pygame.event.get():
             if event.type == pygame.QUIT:  # Handle window close event
+                planner.shutdown()  # Drop the pending search
                 pygame.quit()  # Quit Pygame
                 sys.exit()  # Exit the program
             elif event.type == pygame.MOUSEBUTTONDOWN:  # Handle mouse clicks
                 if start_button_rect.collidepoint(event.pos):  # If Start button is clicked
                     simulation_started = True  # Start the simulation
                 elif toggle_button_rect.collidepoint(event.pos):  # If Toggle button is clicked
-                    algorithm = "A*" if algorithm == "UCS" else "UCS"  # Switch between UCS and A*
+                    algorithm = next_algorithm(algorithm)  # Switch to the next of UCS, A* and ARA*
+                    simulation.reset()  # Cancel the background search and forget pending steps and timings
                     agent.reset_agent()  # Reset the agent's state
+                    simulation.algorithm = algorithm  # Plan with the new algorithm
                     environment.task_locations = initial_task_locations.copy()  # Reset tasks
                     environment.barrier_locations = initial_barrier_locations.copy()  # Reset barriers
                     simulation_started = False  # Stop the simulation
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_t:  # Press T to toggle turbo mode
+                simulation.turbo = not simulation.turbo  # Run many steps per frame, or one step per MOVEMENT_DELAY
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_e:  # Press E to export the search metrics
+                for path in METRICS_FILES:
+                    instrumentation.save(path)  # JSON and Prometheus text
 
 
-        # Draw background and grid
-        screen.fill(BACKGROUND_COLOR)  # Fill the screen with the background color
-        draw_grid(screen, WINDOW_WIDTH, WINDOW_HEIGHT, GRID_SIZE)  # Draw the grid
-
-
-        # Draw tasks
-        for (x, y), task_number in environment.task_locations.items():
-            pygame.draw.rect(screen, TASK_COLOR, (x * GRID_SIZE, y * GRID_SIZE, GRID_SIZE, GRID_SIZE))  # Draw task as red square
-            text = font.render(str(task_number), True, TEXT_COLOR)  # Render task number as text
-            screen.blit(text, (x * GRID_SIZE + GRID_SIZE // 4, y * GRID_SIZE + GRID_SIZE // 4))  # Draw task number
-
-
-        # Draw barriers
-        for x, y in environment.barrier_locations:
-            pygame.draw.rect(screen, BARRIER_COLOR, (x * GRID_SIZE, y * GRID_SIZE, GRID_SIZE, GRID_SIZE))  # Draw barriers as black squares
-
-
-        # Simulate agent movement
+        # Simulate agent movement on the fixed timestep, as many steps as fit into the time since the last frame
         if simulation_started and not agent.is_done():  # If simulation is running and agent has not done it task
-            current_time = pygame.time.get_ticks()  # Get current time
-            if current_time - last_move_time > MOVEMENT_DELAY:  # If enough time has passed since the last move
-                if not agent.moving:  # If the agent is not currently moving
-                    agent.plan_tasks(algorithm)  # Plan tasks using the selected algorithm
-                    efficiency_metrics[algorithm]["total_cost"] = agent.total_path_cost  # Update efficiency metrics
-                else:
-                    agent.move()  # Move the agent
-                last_move_time = current_time  # Update last move time
+            simulation.advance(frame_time / 1000)  # Plan or move the agent for every elapsed timestep
+            efficiency_metrics[algorithm]["total_cost"] = agent.total_path_cost  # Update efficiency metrics
 
 
-        # Update and draw sprites
+        # Update the sprites and choose the button colors
         all_sprites.update()  # Update all sprites
-        all_sprites.draw(screen)  # Draw all sprites
-
-
-        # Handle button hover effects and draw buttons
-        if start_button_rect.collidepoint(pygame.mouse.get_pos()):  # Check if mouse is over Start button
-            pygame.draw.rect(screen, BUTTON_HOVER_COLOR, start_button_rect)  # Highlight button
-        else:
-            pygame.draw.rect(screen, BUTTON_COLOR, start_button_rect)  # Draw normal button
-
-
-        if toggle_button_rect.collidepoint(pygame.mouse.get_pos()):  # Check if mouse is over Toggle button
-            pygame.draw.rect(screen, (0, 0, 255), toggle_button_rect)  # Highlight Toggle button in blue
-        else:
-            pygame.draw.rect(screen, (0, 0, 255), toggle_button_rect)  # Draw normal Toggle button
-
-
-        # Render and position button texts
-        start_text = font.render("Start", True, BUTTON_TEXT_COLOR)  # Render "Start" text
-        screen.blit(start_text, (start_button_x + (button_width - start_text.get_width()) // 2,
-                                 start_button_y + (button_height - start_text.get_height()) // 2))  # Center "Start" text on button
-
-
-        toggle_text = font.render(f"Switch to {'A*' if algorithm == 'UCS' else 'UCS'}", True, BUTTON_TEXT_COLOR)  # Render toggle text
-        screen.blit(toggle_text, (start_button_x + (button_width - toggle_text.get_width()) // 2,
-                                  toggle_button_y + (button_height - toggle_text.get_height()) // 2))  # Center toggle text on button
+        mouse_position = pygame.mouse.get_pos()  # Check where the mouse is for the hover effect
+        start_color = BUTTON_HOVER_COLOR if start_button_rect.collidepoint(mouse_position) else BUTTON_COLOR  # Highlight Start button
+        toggle_color = (0, 0, 255)  # The Toggle button stays blue
+        buttons = [
+            (start_button_rect, start_color, "Start", BUTTON_TEXT_COLOR),
+            (toggle_button_rect, toggle_color, f"Switch to {next_algorithm(algorithm)}", BUTTON_TEXT_COLOR),
+        ]
 
 
         # Display status panel
-        efficient_algorithm = "UCS" if efficiency_metrics["UCS"]["total_cost"] < efficiency_metrics["A*"]["total_cost"] else "A*"  # Determine more efficient algorithm
         status_text = [
             f"1. Algorithm: {algorithm}",  # Display current algorithm
             f"2. Tasks Completed: {len(agent.completed_tasks)}",  # Number of completed tasks
@@ -163,22 +140,17 @@ def main():
         completed_tasks_str = ", ".join([f"{task} (Cost: {cost})" for task, cost in agent.completed_tasks])
         status_text.append(completed_tasks_str)
         status_text += [
-            f"Path Cost (UCS): {efficiency_metrics['UCS']['total_cost']}",  # Display UCS path cost
-            f"Path Cost (A*): {efficiency_metrics['A*']['total_cost']}",  # Display A* path cost
-            f"Efficient Algorithm: {efficient_algorithm}"  # Display the more efficient algorithm
+            "Path Cost: " + ", ".join(f"{name} {efficiency_metrics[name]['total_cost']}" for name in ALGORITHMS),  # Display the path cost of every algorithm
+            planner_text(planner, agent),  # Show when a search runs in the background and how good an ARA* path is
+            instrumentation.text(algorithm),  # Display the search work and p95 latency of the current algorithm
+            f"Path Cache: {path_cache.hits} hits, {path_cache.misses} misses",  # Display how much replanning the cache saved
+            simulation.text(),  # Display the simulation mode and the time per step (press T for turbo)
         ]
 
 
-        # Render and display status text line by line
-        line_y = 10  # Starting Y position for text
-        for line in status_text:
-            text = font.render(line, True, TEXT_COLOR)  # Render each line
-            screen.blit(text, (WINDOW_WIDTH + 10, line_y))  # Draw line on status panel
-            line_y += 30  # Increment Y position for next line
-
-
-        pygame.display.flip()  # Update the screen
-        clock.tick(60)  # Limit the frame rate to 60 FPS
+        # Draw only what changed since the last frame; the renderer adds the frame time to the status panel
+        renderer.draw(all_sprites, status_text, buttons)
+        frame_time = clock.tick(60)  # Limit the frame rate to 60 FPS
 
 
     pygame.quit()  # Quit Pygame
@@ -0,0 +1,429 @@
+# search.py
+"""
+Shared best-first search core used by the Agent's path planning algorithms.
+
+Cells are identified by the Environment's padded cell ids, which order cells
+exactly like their ``(x, y)`` tuples. The search reads the padded occupancy
+grid directly, keeps g-costs and parent pointers in flat lists indexed by cell
+id, pushes only ``(priority, tiebreak, cell_id)`` tuples and rebuilds the path
+once when a goal is reached.
+
+Moves cost 1, or with ``weighted`` the Environment's traversal cost of the
+cell entered. The open list is chosen by the cost range: while the costs are
+small integers a bucket queue (Dial's algorithm) pushes and pops in O(1),
+otherwise a binary heap is used. Both pop entries in the same order, so the
+choice never changes a path.
+"""
+import functools  # Bind the heap functions to a queue
+import heapq  # Binary heap used as the priority queue
+from collections import deque  # FIFO buckets of the bucket queue
+
+
+BUCKET_QUEUE_MAX_COST = 64  # Largest move cost served by a bucket queue; wider cost ranges use the heap
+# A* needs its f-buckets ordered by position, so each bucket is a small heap. In CPython that measured
+# 10-20% slower than one heap on unit and weighted grids, so A* uses bucket queues only when enabled.
+BUCKET_QUEUE_WITH_HEURISTIC = False
+SEARCH_COUNTERS = ("nodes_expanded", "heap_pushes", "stale_pops", "peak_frontier")  # Work reported by every planner
+
+
+def new_stats():
+    """Return a dictionary of zeroed search counters."""
+    return dict.fromkeys(SEARCH_COUNTERS, 0)
+
+
+def record_search(stats, expanded, pushes, stale_pops=0, frontier=0):
+    """
+    Add the work of one search to a counter dictionary.
+
+    Args:
+        stats (dict): Counters created by new_stats.
+        expanded (int): Cells (or nodes) expanded.
+        pushes (int): Entries added to the open list.
+        stale_pops (int): Outdated open-list entries popped and skipped.
+        frontier (int): Largest size of the open list; peak_frontier keeps the maximum.
+    """
+    stats["nodes_expanded"] += expanded
+    stats["heap_pushes"] += pushes
+    stats["stale_pops"] += stale_pops
+    if frontier > stats["peak_frontier"]:
+        stats["peak_frontier"] = frontier
+
+
+def merge_stats(total, stats):
+    """Add the counters of stats to total, keeping the larger peak_frontier."""
+    record_search(total, stats["nodes_expanded"], stats["heap_pushes"], stats["stale_pops"], stats["peak_frontier"])
+
+
+class SearchSpace:
+    """
+    Per-cell arrays reused by every search on one grid.
+
+    Instead of clearing the arrays before each search, every search gets a new
+    generation number and a cell's entries are only valid when its stamp equals
+    the current generation.
+    """
+
+    def __init__(self, size):
+        """
+        Allocate the arrays for a grid with the given number of cells.
+
+        Args:
+            size (int): The number of cells in the grid.
+        """
+        self.size = size  # Number of cells covered by the arrays
+        self.g_costs = [0] * size  # Cost from the start to each cell
+        self.parents = [0] * size  # Predecessor of each cell on its best known path
+        self.stamps = [0] * size  # Generation in which g_costs/parents were written
+        self.closed = [0] * size  # Generation in which the cell was expanded
+        self.generation = 0  # Number of the current search
+
+    def begin(self):
+        """Start a new search and return its generation number."""
+        self.generation += 1
+        return self.generation
+
+
+class HeapQueue(list):
+    """
+    Open list kept as a binary heap of (priority, tiebreak, cell_id) entries.
+
+    push and pop are bound heapq functions, so the search pays no extra Python
+    call per queue operation.
+    """
+
+    def __init__(self):
+        """Create an empty queue."""
+        super().__init__()
+        self.push = functools.partial(heapq.heappush, self)  # Add an entry
+        self.pop = functools.partial(heapq.heappop, self)  # Remove and return the smallest entry
+
+    def peek(self):
+        """Return the smallest entry without removing it."""
+        return self[0]
+
+
+class BucketQueue:
+    """
+    Open list for integer priorities that never decrease: a circular array of buckets (Dial's algorithm).
+
+    Priorities must never drop below the last popped one. This holds for
+    Dijkstra with non-negative integer move costs and for A* with a consistent
+    integer heuristic. span should exceed the largest step from the last
+    popped priority to a pushed one; a larger step widens the circle.
+
+    A bucket holds the entries of one priority, so finding the smallest entry
+    only steps over empty buckets. With fifo the entries of a bucket come out
+    in push order, which matches a heap whose tiebreak grows with every push;
+    otherwise each bucket is a small heap ordered by the tiebreak.
+    """
+
+    def __init__(self, span, fifo=True, start=0):
+        """
+        Create an empty queue.
+
+        Args:
+            span (int): Number of buckets, larger than the biggest priority step of a push.
+            fifo (bool): Whether the tiebreaks grow with every push, so buckets can be plain FIFO queues.
+            start (int): The smallest priority that will be pushed.
+        """
+        self.span = span  # Number of buckets
+        self.buckets = [deque() if fifo else [] for _ in range(span)]  # Entries by priority modulo span
+        self.current = start  # Smallest priority that may still be in the queue
+        self.count = 0  # Number of entries
+        if not fifo:
+            self.push, self.pop = self._push_ordered, self._pop_ordered
+
+    def __len__(self):
+        return self.count
+
+    def push(self, entry):
+        """Add a (priority, tiebreak, cell_id) entry."""
+        if entry[0] - self.current >= self.span:
+            self._grow(entry[0])
+        self.buckets[entry[0] % self.span].append(entry)
+        self.count += 1
+
+    def pop(self):
+        """Remove and return the smallest entry."""
+        buckets, span = self.buckets, self.span
+        bucket = buckets[self.current % span]
+        while not bucket:  # Step over the empty buckets to the smallest priority
+            self.current += 1
+            bucket = buckets[self.current % span]
+        self.count -= 1
+        return bucket.popleft()
+
+    def _push_ordered(self, entry):
+        """push for buckets kept as heaps."""
+        if entry[0] - self.current >= self.span:
+            self._grow(entry[0])
+        heapq.heappush(self.buckets[entry[0] % self.span], entry)
+        self.count += 1
+
+    def _pop_ordered(self):
+        """pop for buckets kept as heaps."""
+        buckets, span = self.buckets, self.span
+        bucket = buckets[self.current % span]
+        while not bucket:
+            self.current += 1
+            bucket = buckets[self.current % span]
+        self.count -= 1
+        return heapq.heappop(bucket)
+
+    def _grow(self, priority):
+        """Widen the circle of buckets so it reaches a priority; every bucket keeps its entries and their order."""
+        kind = type(self.buckets[0])  # deque or list
+        span = max(2 * self.span, priority - self.current + 1)
+        buckets = [kind() for _ in range(span)]
+        for old in range(self.current, self.current + self.span):  # Each old bucket holds one priority of the window
+            buckets[old % span] = self.buckets[old % self.span]
+        self.buckets, self.span = buckets, span
+
+    def peek(self):
+        """Return the smallest entry without removing it."""
+        buckets, span, priority = self.buckets, self.span, self.current
+        while not buckets[priority % span]:  # Lower priorities may still be pushed, so current stays
+            priority += 1
+        return buckets[priority % span][0]
+
+
+def make_queue(max_cost=1, heuristic=False, start=0):
+    """
+    Return the open list for a search: a bucket queue for small integer move costs, else a heap.
+
+    Searches with a heuristic get the heap unless BUCKET_QUEUE_WITH_HEURISTIC is set.
+
+    Args:
+        max_cost (int): The largest move cost of the search.
+        heuristic (bool): Whether priorities include a consistent integer heuristic that changes by at
+            most the move cost per move (A*); ties then break by position instead of push order.
+        start (int): The priority of the first entry, the smallest one ever pushed.
+
+    Returns:
+        BucketQueue or HeapQueue: An empty queue of (priority, tiebreak, cell_id) entries.
+    """
+    if max_cost > BUCKET_QUEUE_MAX_COST or (heuristic and not BUCKET_QUEUE_WITH_HEURISTIC):
+        return HeapQueue()
+    if heuristic:
+        return BucketQueue(2 * max_cost + 1, fifo=False, start=start)  # f grows by the move cost plus the heuristic change
+    return BucketQueue(max_cost + 1, start=start)
+
+
+def best_first_search(environment, space, start, goals, grid, heuristic=None, stats=None, weighted=False):
+    """
+    Find the cheapest path from start to the nearest of the goals.
+
+    Without a heuristic this is Uniform Cost Search; with one it is A*. Ties are
+    broken the same way as the original path-list implementations: UCS prefers
+    the lexicographically smallest path and, among goals of equal cost, the
+    smallest goal position; A* prefers the smallest position on equal f-cost.
+
+    Args:
+        environment (Environment): The environment providing the cell layout.
+        space (SearchSpace): Reusable per-cell arrays for this grid.
+        start (tuple): The (x, y) start position.
+        goals (iterable): The (x, y) goal positions.
+        grid (bytearray): Padded occupancy grid, see Environment.grid_for.
+        heuristic (callable): Optional consistent integer estimate h(cell_id) of the remaining cost.
+        stats (dict): Optional counters from new_stats, updated with record_search.
+        weighted (bool): Whether moves cost the Environment's traversal cost of the cell entered instead of 1.
+
+    Returns:
+        tuple: The path as a list of (x, y) positions excluding the start, and its cost.
+    """
+    left, up, down, right = environment.neighbor_offsets
+    costs = environment.costs if weighted else None  # Padded traversal cost of entering each cell
+    generation = space.begin()
+    g_costs, parents, stamps, closed = space.g_costs, space.parents, space.stamps, space.closed
+    goal_cells = {environment.cell_id(*goal) for goal in goals}  # Goal ids for O(1) membership tests
+
+
+    source = environment.cell_id(*start)
+    g_costs[source] = 0
+    parents[source] = -1
+    stamps[source] = generation
+    priority = heuristic(source) if heuristic else 0
+    queue = make_queue(environment.max_cost if weighted else 1, heuristic is not None, priority)
+    push, pop = queue.push, queue.pop
+    push((priority, 0, source))  # Entries are (priority, tiebreak, cell_id)
+    pushes = 1  # Number of entries pushed, also the FIFO tiebreak for UCS
+    expanded = stale = frontier = 0  # Cells expanded, stale entries skipped, largest queue
+
+
+    found = -1
+    while queue:
+        priority, _, current = pop()
+        if closed[current] == generation:  # Skip stale entries of already expanded cells
+            stale += 1
+            continue
+        if current in goal_cells:
+            found = current
+            if heuristic is None:
+                # UCS pops equal-cost cells in path order; the original returned the goal with the
+                # smallest position among all goals at this cost, so look at the rest of this cost level.
+                while queue and queue.peek()[0] == priority:
+                    _, _, other = pop()
+                    if other in goal_cells and other < found and closed[other] != generation:
+                        found = other
+            break
+        closed[current] = generation
+        expanded += 1
+
+
+        # Generate the neighbors in (x, y) order; the padded border makes bounds checks unnecessary
+        g_current = g_costs[current]
+        g_next = g_current + 1  # Every move costs 1 unless weighted
+        for neighbor in (current + left, current + up, current + down, current + right):
+            if grid[neighbor]:  # Skip barriers and the border
+                continue
+            if costs is not None:
+                g_next = g_current + costs[neighbor]  # Entering a cell costs its traversal cost
+            if stamps[neighbor] == generation and g_costs[neighbor] <= g_next:  # Keep the first, cheapest parent
+                continue
+            g_costs[neighbor] = g_next
+            parents[neighbor] = current
+            stamps[neighbor] = generation
+            if heuristic is None:
+                push((g_next, pushes, neighbor))  # FIFO among equal costs keeps the path order
+            else:
+                push((g_next + heuristic(neighbor), neighbor, neighbor))  # Position order among equal f
+            pushes += 1
+        if len(queue) > frontier:
+            frontier = len(queue)
+
+
+    if stats is not None:
+        record_search(stats, expanded, pushes - 1, stale, frontier)
+    if found < 0:
+        return [], 0  # No path found
+
+
+    path = []  # Rebuild the path once by following the parent pointers back to the start
+    cell = found
+    while cell != source:
+        path.append(environment.cell_position(cell))
+        cell = parents[cell]
+    path.reverse()
+    return path, g_costs[found]
+
+
+def bidirectional_search(environment, forward_space, backward_space, start, goals, grid, use_heuristic=False, stats=None):
+    """
+    Find the cheapest path from start to the nearest of the goals searching from both ends.
+
+    A forward search from the start and a backward search from all goals take
+    turns; the side with the smaller top key is expanded. Without a heuristic this
+    is bidirectional UCS. With use_heuristic both sides use the average of the
+    Manhattan estimates to the goals and to the start, which keeps the reduced
+    costs non-negative, so the usual stopping rule stays correct: stop when the
+    two top keys add up to the best meeting cost found. Path costs are identical
+    to the unidirectional searches; among equally cheap paths a different one may
+    be chosen.
+
+    Args:
+        environment (Environment): The environment providing the cell layout.
+        forward_space (SearchSpace): Reusable per-cell arrays for the forward search.
+        backward_space (SearchSpace): Reusable per-cell arrays for the backward search.
+        start (tuple): The (x, y) start position.
+        goals (iterable): The (x, y) goal positions.
+        grid (bytearray): Padded occupancy grid, see Environment.grid_for.
+        use_heuristic (bool): Whether to run bidirectional A* instead of bidirectional UCS.
+        stats (dict): Optional counters from new_stats, updated with record_search.
+
+    Returns:
+        tuple: The path as a list of (x, y) positions excluding the start, and its cost.
+    """
+    stride = environment.stride
+    offsets = environment.neighbor_offsets
+    source = environment.cell_id(*start)
+    goal_cells = {environment.cell_id(*goal) for goal in goals}
+    if source in goal_cells:
+        return [], 0
+    if not goal_cells:
+        return [], 0  # No path found
+    sx, sy = divmod(source, stride)
+    padded_goals = [divmod(goal, stride) for goal in goal_cells]
+
+
+    def potential(cell):
+        """Twice the forward potential: estimate to the goals minus estimate to the start."""
+        if not use_heuristic:
+            return 0
+        x, y = divmod(cell, stride)
+        return min(abs(x - gx) + abs(y - gy) for gx, gy in padded_goals) - abs(x - sx) - abs(y - sy)
+
+
+    # Keys are doubled so the averaged potentials stay integers: 2 * d + potential (forward), 2 * d - potential (backward)
+    sides = []
+    for space, sign, roots in ((forward_space, 1, [source]), (backward_space, -1, sorted(goal_cells))):
+        generation = space.begin()
+        queue = []
+        for root in roots:
+            space.g_costs[root] = 0
+            space.parents[root] = -1
+            space.stamps[root] = generation
+            queue.append((sign * potential(root), root, root))
+        heapq.heapify(queue)
+        sides.append((space, generation, sign, queue))
+    (forward, forward_generation, _, forward_queue), (backward, backward_generation, _, backward_queue) = sides
+
+
+    best, meeting = float("inf"), -1  # Cheapest start-to-goal cost found so far and the cell where the searches met
+    expanded = stale = frontier = 0
+    pushes = len(goal_cells) + 1
+    while True:
+        for space, generation, _, queue in sides:  # Drop stale entries so the top keys are real
+            while queue and space.closed[queue[0][2]] == generation:
+                heapq.heappop(queue)
+                stale += 1
+        if len(forward_queue) + len(backward_queue) > frontier:
+            frontier = len(forward_queue) + len(backward_queue)
+        if not forward_queue or not backward_queue:
+            break  # One side ran out; nothing cheaper can be found
+        if forward_queue[0][0] + backward_queue[0][0] >= 2 * best:
+            break  # No unexplored path can beat the best meeting cost
+
+
+        side = sides[0] if forward_queue[0][0] <= backward_queue[0][0] else sides[1]
+        space, generation, sign, queue = side
+        other, other_generation = (backward, backward_generation) if sign > 0 else (forward, forward_generation)
+        _, _, current = heapq.heappop(queue)
+        space.closed[current] = generation
+        expanded += 1
+        if sign < 0 and grid[current]:
+            continue  # The backward search may label a blocked start, but nothing can be entered through it
+
+
+        g_next = space.g_costs[current] + 1  # Every move costs 1
+        for offset in offsets:
+            neighbor = current + offset
+            if grid[neighbor] and not (sign < 0 and neighbor == source):  # Backward, the blocked start may be left
+                continue
+            if space.stamps[neighbor] == generation and space.g_costs[neighbor] <= g_next:
+                continue
+            space.g_costs[neighbor] = g_next
+            space.parents[neighbor] = current
+            space.stamps[neighbor] = generation
+            heapq.heappush(queue, (2 * g_next + sign * potential(neighbor), neighbor, neighbor))
+            pushes += 1
+            if other.stamps[neighbor] == other_generation and g_next + other.g_costs[neighbor] < best:
+                best, meeting = g_next + other.g_costs[neighbor], neighbor  # The two searches met
+
+
+    if stats is not None:
+        record_search(stats, expanded, pushes, stale, frontier)
+    if meeting < 0:
+        return [], 0  # No path found
+
+
+    path = []  # Forward parents from the meeting cell back to the start ...
+    cell = meeting
+    while cell != source:
+        path.append(environment.cell_position(cell))
+        cell = forward.parents[cell]
+    path.reverse()
+    cell = backward.parents[meeting]  # ... then backward parents from the meeting cell to a goal
+    while cell >= 0:
+        path.append(environment.cell_position(cell))
+        cell = backward.parents[cell]
+    return path, best
@@ -0,0 +1,211 @@
+# simulation.py
+"""
+Simulation clock decoupled from rendering.
+
+One logical step either plans the agent's next leg or moves it one cell. The
+window advances the simulation by the real time between frames with a fixed
+timestep, so the agent moves at the same speed at any frame rate; turbo mode
+runs many steps per rendered frame; and run_until_done steps headlessly as
+fast as the CPU allows. The compute time of every step is recorded.
+
+With a BackgroundPlanner, legs are planned on a worker thread and the
+simulation waits for them without blocking the window. With an improvement
+budget, every frame also spends that much time improving an ARA* leg.
+
+Example:
+    python simulation.py --size 200x200 --density 0.2 --tasks 20 --algorithm A* --seed 0
+"""
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")  # Never open a window when run from the command line
+
+import argparse  # Parse the command line options
+import time  # Measure the compute time of each step
+from collections import deque  # Sliding window of recent step times
+
+
+STEP_TIME = 0.1  # Logical seconds per step, the agent's movement delay
+TURBO_SPEED = 100  # Speed multiplier of turbo mode
+MAX_STEPS_PER_FRAME = 10000  # Most steps run for one frame, so a slow frame cannot stall the window
+
+
+class Simulation:
+    """Fixed-timestep simulation of one agent completing the tasks of its environment."""
+
+    def __init__(self, agent, algorithm="UCS", step_time=STEP_TIME, speed=1.0, window=1000, planner=None,
+                 improve_budget=None):
+        """
+        Create the simulation.
+
+        Args:
+            agent (Agent): The simulated agent.
+            algorithm (str): The algorithm passed to Agent.plan_tasks.
+            step_time (float): Logical seconds per step.
+            speed (float): Logical seconds simulated per real second.
+            window (int): The number of recent step times kept for the averages.
+            planner (BackgroundPlanner): Optional planner that plans the legs on a worker thread.
+            improve_budget (float): Optional seconds per frame spent improving an ARA* leg.
+        """
+        self.agent = agent  # The simulated agent
+        self.algorithm = algorithm  # Algorithm used for planning
+        self.step_time = step_time  # Logical seconds per step
+        self.speed = speed  # Logical seconds per real second
+        self.accumulator = 0.0  # Logical time not yet simulated
+        self.steps = 0  # Steps simulated since the last reset
+        self.compute_time = 0.0  # Total compute time of those steps in seconds
+        self.max_step_time = 0.0  # Longest step in seconds
+        self.step_times = deque(maxlen=window)  # Compute time of the recent steps in seconds
+        self.planner = planner  # Plans legs in the background, None plans in step
+        self.improve_budget = improve_budget  # Seconds per frame for improving ARA* legs
+
+
+    def reset(self):
+        """
+        Forget the pending time, the background request and the step timings, e.g. before the agent is reset.
+
+        A search already running on the planner's worker is waited for, so
+        it cannot change the agent or read the map after the reset.
+        """
+        if self.planner is not None:
+            self.planner.cancel(wait_running=True)
+        self.accumulator = 0.0
+        self.steps = 0
+        self.compute_time = 0.0
+        self.max_step_time = 0.0
+        self.step_times.clear()
+
+
+    @property
+    def turbo(self):
+        """Whether turbo mode is on."""
+        return self.speed >= TURBO_SPEED
+
+
+    @turbo.setter
+    def turbo(self, enabled):
+        self.speed = TURBO_SPEED if enabled else 1.0
+
+
+    def step(self):
+        """
+        Simulate one step: plan the next leg if the agent is idle, otherwise move it one cell.
+
+        Returns:
+            bool: False if there was nothing to do: every task is completed or the next leg is still planned in the background.
+        """
+        agent = self.agent
+        if agent.is_done():
+            return False
+        start_time = time.perf_counter()
+        if not agent.moving and self.planner is not None:  # The leg is planned on the worker thread
+            if not self.planner.poll(self.algorithm):
+                return False  # Not planned yet; try again next frame
+        elif not agent.moving:  # If the agent is not currently moving
+            agent.plan_tasks(self.algorithm)  # Plan tasks using the selected algorithm
+        else:
+            agent.move()  # Move the agent
+        elapsed = time.perf_counter() - start_time
+        self.steps += 1
+        self.compute_time += elapsed
+        self.max_step_time = max(self.max_step_time, elapsed)
+        self.step_times.append(elapsed)
+        return True
+
+
+    def advance(self, elapsed):
+        """
+        Simulate the steps that fall into a span of real time.
+
+        Args:
+            elapsed (float): Real seconds since the last call.
+
+        Returns:
+            int: The number of steps simulated.
+        """
+        self.accumulator += elapsed * self.speed
+        steps = 0
+        while self.accumulator >= self.step_time and steps < MAX_STEPS_PER_FRAME:
+            self.accumulator -= self.step_time
+            if not self.step():
+                self.accumulator = 0.0  # Nothing left to simulate
+                break
+            steps += 1
+        if steps == MAX_STEPS_PER_FRAME:
+            self.accumulator = min(self.accumulator, self.step_time)  # Drop the backlog instead of falling further behind
+        if self.improve_budget:
+            self.agent.improve_path(self.improve_budget)  # Spend the frame's budget on a better ARA* path
+        return steps
+
+
+    def run_until_done(self, max_steps=None):
+        """
+        Step headlessly until every task is completed.
+
+        Stops early if the remaining tasks cannot be reached.
+
+        Args:
+            max_steps (int): Optional limit on the number of steps.
+
+        Returns:
+            dict: The step statistics, see stats.
+        """
+        while max_steps is None or self.steps < max_steps:
+            planning = not self.agent.moving  # This step plans the next leg
+            if not self.step():
+                if self.planner is not None and self.planner.busy:
+                    self.planner.wait()  # Headless runs simply wait for the worker
+                    continue
+                break
+            if planning and not self.agent.path:
+                break  # Planning found no path to the remaining tasks
+        return self.stats()
+
+
+    def stats(self):
+        """Return the step counters and timings."""
+        recent = self.step_times
+        return {
+            "steps": self.steps,
+            "simulated_time": self.steps * self.step_time,
+            "compute_time": self.compute_time,
+            "mean_step_time": self.compute_time / self.steps if self.steps else 0.0,
+            "recent_step_time": sum(recent) / len(recent) if recent else 0.0,
+            "max_step_time": self.max_step_time,
+            "tasks_completed": self.agent.task_completed,
+            "path_cost": self.agent.total_path_cost,
+        }
+
+
+    def text(self):
+        """Return a short status line with the recent step timing."""
+        mode = "turbo" if self.turbo else "real time"
+        return (f"Sim: {mode}, {self.steps} steps, {1000 * self.stats()['recent_step_time']:.2f} ms/step "
+                f"({1000 * self.max_step_time:.2f} max)")
+
+
+def main(argv=None):
+    """Run one scenario headlessly and report the step timings."""
+    from agent import Agent  # Import the Agent class from the agent module
+    from benchmark import ALGORITHMS, build_environment, parse_size  # Seeded maps measured in cells
+    parser = argparse.ArgumentParser(description="Headless run of one scenario to completion")
+    parser.add_argument("--size", type=parse_size, default=(20, 15), help="grid size as COLUMNSxROWS")
+    parser.add_argument("--density", type=float, default=0.05, help="barrier density between 0 and 1")
+    parser.add_argument("--tasks", type=int, default=5, help="number of tasks")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--algorithm", default="UCS", choices=ALGORITHMS, help="planning algorithm")
+    parser.add_argument("--max-steps", type=int, help="stop after this many steps")
+    args = parser.parse_args(argv)
+
+
+    columns, rows = args.size
+    environment = build_environment(columns, rows, args.density, args.tasks, args.seed)
+    simulation = Simulation(Agent(environment, environment.grid_size), args.algorithm)
+    start_time = time.perf_counter()
+    stats = simulation.run_until_done(args.max_steps)
+    stats["wall_time"] = time.perf_counter() - start_time
+    for name, value in stats.items():
+        print(f"{name}: {value:.6f}" if isinstance(value, float) else f"{name}: {value}")
+    return stats
+
+
+if __name__ == "__main__":
+    main()  # Run the scenario
@@ -0,0 +1,158 @@
+# sweep.py
+"""
+Parallel experiment sweeps over a process pool.
+
+Every (algorithm, grid size, density, task count, seed) configuration is an
+independent run: the map is rebuilt from its own seeded Environment, so the
+results do not depend on which worker runs a configuration or in which order.
+Configurations are sent to a ProcessPoolExecutor in chunks, and the result rows
+are appended to a JSON Lines file as soon as each chunk finishes. Restarting
+the same sweep with --resume skips the configurations already in the file.
+
+Example:
+    python sweep.py --sizes 100x100 200x200 --densities 0.1 0.3 --seeds $(seq 0 99) --workers 32 --output sweep.jsonl
+"""
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")  # Workers never open a window
+
+import argparse  # Parse the command line options
+import itertools  # Build the configuration grid
+import json  # Read and write the JSON Lines results
+import sys  # Write progress to stderr
+from concurrent.futures import ProcessPoolExecutor, as_completed  # Run the chunks in parallel
+from benchmark import ALGORITHMS, parse_size, print_summary, run_case  # Reuse the single-map benchmark
+
+
+CONFIG_FIELDS = ("algorithm", "columns", "rows", "density", "num_tasks", "seed")  # Fields identifying one configuration
+
+
+def config_key(row):
+    """Return the configuration a result row or configuration dictionary belongs to."""
+    return tuple(row[field] for field in CONFIG_FIELDS)
+
+
+def build_configs(algorithms, sizes, densities, tasks, seeds):
+    """
+    List every configuration of the sweep.
+
+    Returns:
+        list: One dictionary with the CONFIG_FIELDS per configuration.
+    """
+    return [
+        dict(algorithm=algorithm, columns=columns, rows=rows, density=density, num_tasks=num_tasks, seed=seed)
+        for (columns, rows), density, num_tasks, seed, algorithm in itertools.product(sizes, densities, tasks, seeds, algorithms)
+    ]
+
+
+def run_chunk(configs, options):
+    """
+    Run a chunk of configurations in a worker process.
+
+    Args:
+        configs (list): The configuration dictionaries to run.
+        options (dict): Keyword arguments passed on to benchmark.run_case.
+
+    Returns:
+        list: The result rows of every configuration in the chunk.
+    """
+    results = []
+    for config in configs:
+        results += run_case(config["columns"], config["rows"], config["density"], config["num_tasks"], config["seed"],
+                            (config["algorithm"],), **options)
+    return results
+
+
+def load_results(path):
+    """
+    Read the result rows of an earlier, possibly interrupted, sweep.
+
+    A line cut off by an interruption is ignored, so its configuration runs again.
+
+    Returns:
+        list: The complete result rows found in the file.
+    """
+    results = []
+    if not os.path.exists(path):
+        return results
+    with open(path) as handle:
+        for line in handle:
+            try:
+                results.append(json.loads(line))
+            except ValueError:
+                continue  # Incomplete last line
+    return results
+
+
+def run_sweep(configs, output, workers=None, chunk_size=None, resume=False, options=None, stream=sys.stderr):
+    """
+    Run the configurations in parallel and stream the results to a JSON Lines file.
+
+    Args:
+        configs (list): The configurations to run, see build_configs.
+        output (str): Path of the JSON Lines file the result rows are appended to.
+        workers (int): Number of worker processes; None uses every CPU.
+        chunk_size (int): Configurations sent to a worker at once; None picks about four chunks per worker.
+        resume (bool): Whether to keep the rows already in output and skip their configurations.
+        options (dict): Keyword arguments passed on to benchmark.run_case.
+        stream (file): Where progress is reported.
+
+    Returns:
+        list: The result rows of the whole sweep, including resumed ones.
+    """
+    results = load_results(output) if resume else []
+    done = {config_key(row) for row in results}
+    pending = [config for config in configs if config_key(config) not in done]
+    workers = workers or os.cpu_count() or 1
+    chunk_size = chunk_size or max(1, len(pending) // (workers * 4))  # Small enough to balance, large enough to amortize
+    chunks = [pending[index:index + chunk_size] for index in range(0, len(pending), chunk_size)]
+    print(f"{len(pending)} of {len(configs)} configurations to run in {len(chunks)} chunks on {workers} workers", file=stream)
+
+
+    cut_off = False  # Whether an interruption left the last line without its newline
+    if resume and os.path.exists(output) and os.path.getsize(output):
+        with open(output, "rb") as handle:
+            handle.seek(-1, os.SEEK_END)
+            cut_off = handle.read(1) != b"\n"
+    with open(output, "a" if resume else "w") as handle:
+        if cut_off:
+            handle.write("\n")  # Start the new rows on a line of their own
+        completed = 0
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(run_chunk, chunk, options or {}): len(chunk) for chunk in chunks}
+            for future in as_completed(futures):
+                rows = future.result()
+                for row in rows:
+                    handle.write(json.dumps(row) + "\n")
+                handle.flush()  # Finished chunks survive an interruption
+                results += rows
+                completed += futures[future]
+                print(f"{completed}/{len(pending)} configurations done", file=stream)
+    return results
+
+
+def main(argv=None):
+    """Run a parallel sweep from the command line."""
+    parser = argparse.ArgumentParser(description="Parallel benchmark sweep over a process pool")
+    parser.add_argument("--sizes", nargs="+", type=parse_size, default=[(20, 15)], help="grid sizes as COLUMNSxROWS")
+    parser.add_argument("--densities", nargs="+", type=float, default=[0.05], help="barrier densities between 0 and 1")
+    parser.add_argument("--tasks", nargs="+", type=int, default=[5], help="task counts")
+    parser.add_argument("--seeds", nargs="+", type=int, default=[0], help="random seeds")
+    parser.add_argument("--algorithms", nargs="+", default=list(ALGORITHMS), choices=ALGORITHMS, help="algorithms to compare")
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced run that measures peak memory")
+    parser.add_argument("--barrier-changes", type=int, default=0, help="barriers added and removed halfway through every leg")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--chunk-size", type=int, help="configurations per task sent to a worker")
+    parser.add_argument("--output", default="sweep.jsonl", help="JSON Lines file the results are streamed to")
+    parser.add_argument("--resume", action="store_true", help="keep the results in --output and skip their configurations")
+    args = parser.parse_args(argv)
+
+
+    configs = build_configs(args.algorithms, args.sizes, args.densities, args.tasks, args.seeds)
+    options = {"trace_memory": not args.no_memory, "barrier_changes": args.barrier_changes}
+    results = run_sweep(configs, args.output, args.workers, args.chunk_size, args.resume, options)
+    print_summary(results)
+    return results
+
+
+if __name__ == "__main__":
+    main()  # Run the sweep
@@ -0,0 +1,186 @@
+# taskindex.py
+"""
+Spatial index of the open tasks.
+
+Tasks are kept in a bucket grid of square buckets. Nearest-task queries scan
+the buckets ring by ring around the query position and stop as soon as no
+unscanned ring can hold a closer task, so a query touches only the buckets
+near the answer instead of every task. Buckets are sized for about one task
+each and the grid is rebuilt coarser as tasks are completed, so queries stay
+cheap as the tasks thin out.
+
+Distances are Manhattan distances, a lower bound of the obstacle-aware
+distance on the 4-connected grid; nearest_by uses that bound to rank tasks by
+a true distance, e.g. a path length, while reading as few distances as
+possible. Ties are broken by insertion order, like min() over the task
+dictionary.
+"""
+import heapq  # Merge the scanned buckets in distance order
+import math  # Size the buckets
+
+
+TASKS_PER_BUCKET = 1  # Target average number of tasks per bucket
+REBUILD_FRACTION = 4  # Rebuild coarser buckets once the tasks dropped to 1 / REBUILD_FRACTION of the last build
+
+
+class TaskIndex:
+    """Bucket grid over task locations with deletion and nearest / k-nearest queries."""
+
+    def __init__(self, columns, rows, locations=()):
+        """
+        Build the index.
+
+        Args:
+            columns (int): Number of grid columns.
+            rows (int): Number of grid rows.
+            locations (iterable): The (x, y) task locations, in the order used to break ties.
+        """
+        self.columns = columns  # Number of grid columns
+        self.rows = rows  # Number of grid rows
+        self.order = {}  # Location -> insertion number, used to break distance ties
+        self.next_order = 0  # Insertion number of the next location
+        for location in locations:
+            self.order[location] = self.next_order
+            self.next_order += 1
+        self._build()
+
+
+    def _build(self):
+        """Choose the bucket size for the current number of tasks and sort the tasks into buckets."""
+        count = len(self.order)
+        area = max(1, self.columns * self.rows)
+        self.bucket_size = max(1, int(math.sqrt(area * TASKS_PER_BUCKET / max(1, count))))  # Side of a bucket in cells
+        self.buckets = {}  # (bucket x, bucket y) -> set of locations
+        for location in self.order:
+            self.buckets.setdefault(self._bucket(location), set()).add(location)
+        self.built_count = count  # Number of tasks at the last build
+
+
+    def _bucket(self, location):
+        """Return the bucket coordinates of a location."""
+        return location[0] // self.bucket_size, location[1] // self.bucket_size
+
+
+    def __len__(self):
+        return len(self.order)
+
+
+    def __contains__(self, location):
+        return location in self.order
+
+
+    def add(self, location):
+        """Add a task location; adding an indexed location does nothing."""
+        if location in self.order:
+            return
+        self.order[location] = self.next_order
+        self.next_order += 1
+        self.buckets.setdefault(self._bucket(location), set()).add(location)
+        if len(self.order) > REBUILD_FRACTION * max(1, self.built_count):
+            self._build()  # Many tasks were added: use finer buckets
+
+
+    def remove(self, location):
+        """Remove a task location; removing a missing location does nothing."""
+        if self.order.pop(location, None) is None:
+            return
+        key = self._bucket(location)
+        bucket = self.buckets[key]
+        bucket.discard(location)
+        if not bucket:
+            del self.buckets[key]
+        if len(self.order) * REBUILD_FRACTION < self.built_count:
+            self._build()  # Most tasks are gone: use coarser buckets so the rings stay short
+
+
+    def iter_nearest(self, position):
+        """
+        Yield the task locations in increasing Manhattan distance from a position.
+
+        Args:
+            position (tuple): The (x, y) query position.
+
+        Yields:
+            tuple: (distance, location) pairs; equal distances come in insertion order.
+        """
+        if not self.order:
+            return
+        px, py = position
+        size = self.bucket_size
+        bx, by = px // size, py // size
+        max_ring = max(bx, by, (self.columns - 1) // size - bx, (self.rows - 1) // size - by, 0)  # Last ring inside the grid
+        buckets, order = self.buckets, self.order
+        candidates = []  # Heap of (distance, insertion number, location) of the scanned buckets
+        ring = 0
+        while ring <= max_ring or candidates:
+            # Every location in ring r differs from the position by more than (r - 1) * size cells on some axis
+            bound = (ring - 1) * size + 1 if ring <= max_ring else math.inf
+            while candidates and candidates[0][0] < bound:  # Strictly closer, so ties still come in insertion order
+                distance, _, location = heapq.heappop(candidates)
+                yield distance, location
+            if ring > max_ring:
+                break
+            for key in _ring(bx, by, ring):
+                for location in buckets.get(key, ()):
+                    heapq.heappush(candidates, (abs(location[0] - px) + abs(location[1] - py), order[location], location))
+            ring += 1
+
+
+    def nearest(self, position, k=1):
+        """
+        Return the k task locations closest to a position by Manhattan distance.
+
+        Returns:
+            list: Up to k locations, closest first.
+        """
+        result = []
+        for _, location in self.iter_nearest(position):
+            if len(result) == k:
+                break
+            result.append(location)
+        return result
+
+
+    def nearest_by(self, position, distance, k=1):
+        """
+        Return the k task locations closest to a position by an obstacle-aware distance.
+
+        Tasks are visited in Manhattan order, which never exceeds the true
+        distance on the 4-connected grid, and the scan stops once the
+        Manhattan distance exceeds the k-th best true distance found.
+
+        Args:
+            position (tuple): The (x, y) query position.
+            distance (callable): True distance distance(location) of an (x, y) task location from the
+                position, never below the Manhattan distance, or None where the task is unreachable.
+            k (int): The number of locations to return.
+
+        Returns:
+            list: Up to k reachable locations, closest first.
+        """
+        best = []  # Sorted (true distance, insertion number, location) of the k best so far
+        for lower, location in self.iter_nearest(position):
+            if len(best) == k and lower > best[-1][0]:
+                break  # No remaining task can be closer
+            true = distance(location)
+            if true is None:
+                continue
+            entry = (true, self.order[location], location)
+            if len(best) < k or entry < best[-1]:
+                best.append(entry)
+                best.sort()
+                del best[k:]
+        return [location for _, _, location in best]
+
+
+def _ring(bx, by, ring):
+    """Yield the bucket coordinates at Chebyshev distance ring from (bx, by)."""
+    if ring == 0:
+        yield bx, by
+        return
+    for x in range(bx - ring, bx + ring + 1):
+        yield x, by - ring
+        yield x, by + ring
+    for y in range(by - ring + 1, by + ring):
+        yield bx - ring, y
+        yield bx + ring, y
@@ -0,0 +1,12 @@
+# conftest.py
+"""
+Shared setup of the test suite.
+
+The modules live in the repository root and the agents are pygame sprites,
+so the root is put on the import path and pygame is kept headless.
+"""
+import os
+import sys
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")  # Never open a window
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Import the modules from the repository root
@@ -0,0 +1,46 @@
+# test_background.py
+"""
+Background planning: the worker's results and counters reach the agent only
+through poll, and a reset leaves nothing of the old request behind.
+"""
+import pytest
+from agent import Agent
+from background import BackgroundPlanner
+from environment import Environment
+from instrumentation import Instrumentation
+from simulation import Simulation
+
+
+@pytest.mark.parametrize("algorithm", ["UCS", "A*", "Tour", "D* Lite", "ARA*"])
+def test_background_run_matches_a_synchronous_run(algorithm):
+    runs = []
+    for background in (False, True):
+        environment = Environment(40, 30, 1, 8, 250, 11)
+        agent = Agent(environment, 1, instrumentation=Instrumentation())
+        planner = BackgroundPlanner(agent) if background else None
+        counters = agent.search_stats
+        Simulation(agent, algorithm, planner=planner).run_until_done()
+        if planner is not None:
+            planner.shutdown()
+        assert agent.search_stats is counters  # Merged into, never swapped
+        runs.append((agent.task_completed, agent.total_path_cost, agent.search_stats))
+    assert runs[0] == runs[1]
+
+
+@pytest.mark.parametrize("algorithm", ["UCS", "ARA*", "Tour"])
+def test_reset_fences_off_the_running_request(algorithm):
+    environment = Environment(300, 300, 1, 1, 20000, 3)
+    agent = Agent(environment, 1, instrumentation=Instrumentation())
+    agent.search_stats["nodes_expanded"] = 12345  # Work of earlier legs
+    planner = BackgroundPlanner(agent)
+    simulation = Simulation(agent, algorithm, planner=planner)
+    planner.poll(algorithm)  # Submits the first leg
+    future = planner.future
+    simulation.reset()
+    assert future.done()  # Cancelled before it started, or waited for
+    agent.reset_agent()
+    assert agent.search_stats["nodes_expanded"] == 0
+    assert agent.anytime_search is None and not agent.tour and not planner.busy
+    simulation.run_until_done()  # The next request plans from scratch
+    assert agent.is_done()
+    planner.shutdown()
@@ -0,0 +1,69 @@
+# test_dstar.py
+"""
+D* Lite against a fresh A* search after barrier changes and start moves.
+
+A planner is kept across many calls, as the agent keeps it, so every repair
+must give the cost a search from scratch finds on the current map.
+"""
+import random
+import pytest
+from agent import Agent
+from dstar import DStarLite
+from environment import Environment
+
+
+def toggle_barrier(environment, rng, keep):
+    """Add or remove the barrier of a random cell other than keep."""
+    x, y = rng.randrange(environment.columns), rng.randrange(environment.rows)
+    if (x, y) == keep:
+        return
+    if environment.is_barrier(x, y):
+        environment.remove_barrier(x, y)
+    else:
+        environment.add_barrier(x, y)
+
+
+@pytest.mark.parametrize("seed", range(150))
+def test_repairs_match_a_fresh_search(seed):
+    rng = random.Random(seed)
+    columns, rows = rng.randint(5, 40), rng.randint(5, 30)
+    environment = Environment(columns, rows, 1, 1, int(columns * rows * rng.choice([0, 0.1, 0.3, 0.45])), seed)
+    agent = Agent(environment, 1)
+    target = next(iter(environment.task_locations))
+    planner = DStarLite(environment, [target])
+    for query in range(12):
+        if query % 3 == 2:  # Some plans follow barrier changes, the others only move the start
+            for _ in range(rng.randint(1, 5)):
+                toggle_barrier(environment, rng, target)
+        start = (rng.randrange(columns), rng.randrange(rows))
+        path, cost = planner.plan(start)
+        reference_path, reference_cost = agent.a_star_search(start, [target], environment.barrier_locations)
+        assert bool(path) == bool(reference_path)
+        assert cost == reference_cost
+        if path:
+            assert path[-1] == target
+            assert all(not environment.is_barrier(x, y) for x, y in path)
+    planner.close()
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_agent_replans_around_new_barriers(seed):
+    rng = random.Random(seed)
+    environment = Environment(30, 20, 1, 5, 90, seed)
+    agent = Agent(environment, 1)
+    moves = 0
+    while not agent.is_done():
+        agent.plan_tasks("D* Lite")
+        if not agent.path:
+            break  # The remaining tasks were walled in
+        while agent.moving:
+            if len(agent.path) > 2 and rng.random() < 0.2:  # Block the path ahead of the agent
+                x, y = agent.path[1]
+                if (x, y) not in environment.task_locations:
+                    environment.add_barrier(x, y)
+            before = tuple(agent.position)
+            agent.move()
+            if tuple(agent.position) != before:
+                moves += 1
+                assert not environment.is_barrier(*agent.position)
+    assert agent.total_path_cost == moves  # Replanning replaced the cost of every abandoned remainder
@@ -0,0 +1,82 @@
+# test_mapio.py
+"""
+Saving and loading maps: round trips of both format versions, empty maps,
+rejected files and the MovingAI import.
+"""
+import numpy as np
+import pytest
+import environment as environment_module
+import mapio
+from environment import Environment
+
+
+def assert_same_map(loaded, saved):
+    """Check that two environments hold the same grid, terrain and tasks."""
+    assert (loaded.columns, loaded.rows) == (saved.columns, saved.rows)
+    assert bytes(loaded.grid) == bytes(saved.grid)  # Barriers and the padded border
+    assert bytes(loaded.costs) == bytes(saved.costs)
+    assert loaded.max_cost == saved.max_cost
+    assert loaded.task_locations == saved.task_locations
+
+
+@pytest.mark.parametrize("columns, rows", [(37, 13), (9, 1), (1, 9), (64, 64), (300, 301)])
+@pytest.mark.parametrize("terrain", [False, True])
+def test_round_trip(tmp_path, columns, rows, terrain):
+    saved = Environment(columns, rows, 1, 3, columns * rows // 4, 7)
+    if terrain:
+        saved.set_terrain(np.random.default_rng(1).integers(1, 9, size=(columns, rows)))
+    path = str(tmp_path / "map.gmap")
+    mapio.save(saved, path)
+    assert_same_map(mapio.load(path), saved)
+
+
+@pytest.mark.parametrize("block", [8, 16, 1 << 20])
+def test_round_trip_in_small_unpack_blocks(tmp_path, monkeypatch, block):
+    monkeypatch.setattr(environment_module, "UNPACK_BLOCK_CELLS", block)  # Several blocks, some not filling a byte row
+    saved = Environment(45, 7, 1, 4, 100, 3)
+    path = str(tmp_path / "map.gmap")
+    mapio.save(saved, path)
+    assert_same_map(mapio.load(path), saved)
+
+
+def test_version_1_files_load(tmp_path):
+    saved = Environment(20, 11, 1, 3, 60, 5)
+    path = tmp_path / "map.gmap"
+    mapio.save(saved, str(path))
+    data = bytearray(path.read_bytes())
+    header = list(mapio.HEADER.unpack_from(data))
+    header[1] = 1  # Version 1 files had no terrain layer and no flags set, so the rest is identical
+    mapio.HEADER.pack_into(data, 0, *header)
+    path.write_bytes(bytes(data))
+    assert_same_map(mapio.load(str(path)), saved)
+
+
+@pytest.mark.parametrize("columns, rows", [(0, 0), (0, 5), (5, 0), (4, 4)])
+def test_empty_maps(tmp_path, columns, rows):
+    saved = Environment(columns, rows, 1, 0, 0, 0)
+    path = str(tmp_path / "map.gmap")
+    mapio.save(saved, path)
+    loaded = mapio.load(path)
+    assert_same_map(loaded, saved)
+    assert not loaded.task_locations and not loaded.barrier_locations
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "map.gmap"
+    path.write_bytes(b"not a map")
+    with pytest.raises(ValueError):
+        mapio.load(str(path))
+    path.write_bytes(mapio.HEADER.pack(mapio.MAGIC, mapio.FORMAT_VERSION + 1, 0, 1, 1, 0, 1) + bytes(8))
+    with pytest.raises(ValueError, match="newer"):
+        mapio.load(str(path))
+
+
+def test_movingai_import(tmp_path):
+    map_path = tmp_path / "tiny.map"
+    map_path.write_text("type octile\nheight 3\nwidth 4\nmap\n.@..\n.T.S\n..G.\n")
+    scen_path = tmp_path / "tiny.scen"
+    scen_path.write_text("version 1\n0\ttiny.map\t4\t3\t0\t0\t3\t0\t4.41421356\n0\ttiny.map\t4\t3\t3\t2\t3\t0\t2\n")
+    environment, scenarios = mapio.import_movingai(str(map_path), str(scen_path))
+    assert sorted(environment.barrier_locations) == [(1, 0), (1, 1)]  # "@" and "T"; "S" and "G" are passable
+    assert [scenario.start for scenario in scenarios] == [(0, 0), (3, 2)]
+    assert environment.task_locations == {(3, 0): 1}  # Distinct goals become the tasks
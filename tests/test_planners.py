@@ -0,0 +1,113 @@
+# test_planners.py
+"""
+Path costs of the planners on random maps.
+
+The exact planners must agree on the cost of every query, on unit-cost maps
+and, for the weighted ones, on terrain costs; the approximate ones must never
+beat them and must still return walkable paths.
+"""
+import random
+import numpy as np
+import pytest
+from agent import Agent
+from environment import Environment
+
+
+UNIT_COST_PLANNERS = ("UCS", "A*", "ALT", "Bi-UCS", "Bi-A*", "JPS", "Tour", "D* Lite")  # Optimal when every move costs 1
+WEIGHTED_PLANNERS = ("UCS", "A*", "ALT")  # Optimal on terrain costs
+
+
+def random_environment(seed, terrain=False):
+    """Return a small seeded map with barriers, optionally with random terrain costs, and a generator for queries."""
+    rng = random.Random(seed)
+    columns, rows = rng.randint(3, 40), rng.randint(3, 30)
+    density = rng.choice([0, 0.1, 0.3, 0.45])
+    environment = Environment(columns, rows, 1, rng.randint(1, 4), int(columns * rows * density), seed)
+    if terrain:
+        environment.set_terrain(np.random.default_rng(seed).integers(1, 6, size=(columns, rows)))
+    return environment, rng
+
+
+def random_queries(environment, rng, count=3):
+    """Return (start, target) pairs from random cells, barriers included, to the tasks."""
+    tasks = list(environment.task_locations)
+    return [((rng.randrange(environment.columns), rng.randrange(environment.rows)), rng.choice(tasks))
+            for _ in range(count)]
+
+
+def assert_walkable(environment, start, target, path, cost):
+    """Check that a path steps between free neighbors from the start to the target and costs what is reported."""
+    previous = start
+    for x, y in path:
+        assert abs(x - previous[0]) + abs(y - previous[1]) == 1, f"{previous} -> {(x, y)} is not a move"
+        assert not environment.is_barrier(x, y), f"{(x, y)} is a barrier"
+        previous = (x, y)
+    assert previous == target
+    assert cost == environment.path_cost(path)
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_unit_cost_planners_agree(seed):
+    environment, rng = random_environment(seed)
+    agent = Agent(environment, 1)
+    for start, target in random_queries(environment, rng):
+        results = {algorithm: agent.plan_path(algorithm, start, target) for algorithm in UNIT_COST_PLANNERS}
+        reference_path, reference_cost = results["UCS"]
+        for algorithm, (path, cost) in results.items():
+            assert bool(path) == bool(reference_path), algorithm
+            if path:
+                assert cost == reference_cost, algorithm
+                assert_walkable(environment, start, target, path, cost)
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_weighted_planners_agree(seed):
+    environment, rng = random_environment(seed, terrain=True)
+    agent = Agent(environment, 1)
+    for start, target in random_queries(environment, rng):
+        results = {algorithm: agent.plan_path(algorithm, start, target) for algorithm in WEIGHTED_PLANNERS}
+        reference_path, reference_cost = results["UCS"]
+        for algorithm, (path, cost) in results.items():
+            assert bool(path) == bool(reference_path), algorithm
+            if path:
+                assert cost == reference_cost, algorithm
+                assert_walkable(environment, start, target, path, cost)
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_approximate_planners_are_walkable_and_never_shorter(seed):
+    environment, rng = random_environment(seed)
+    agent = Agent(environment, 1)
+    for start, target in random_queries(environment, rng):
+        optimal_path, optimal_cost = agent.plan_path("UCS", start, target)
+        for algorithm in ("HPA*", "ARA*"):
+            path, cost = agent.plan_path(algorithm, start, target)
+            assert bool(path) == bool(optimal_path), algorithm
+            if path:
+                assert cost >= optimal_cost, algorithm
+                assert_walkable(environment, start, target, path, cost)
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_ara_star_converges_to_the_optimum(seed):
+    environment, rng = random_environment(seed)
+    agent = Agent(environment, 1)
+    for start, target in random_queries(environment, rng):
+        optimal_path, optimal_cost = agent.plan_path("UCS", start, target)
+        path, _ = agent.plan_path("ARA*", start, target)
+        if not path:
+            continue
+        search = agent.anytime_search
+        while not search.done:
+            search.improve()
+        assert search.cost == optimal_cost
+        assert_walkable(environment, start, target, search.path, search.cost)
+
+
+def test_unreachable_task_gives_no_path():
+    environment = Environment(9, 9, 1, 0, 0, 0)
+    environment.barrier_locations = {(4, y) for y in range(9)}  # A wall splits the map in two
+    environment.task_locations = {(8, 8): 1}
+    agent = Agent(environment, 1)
+    for algorithm in UNIT_COST_PLANNERS + ("HPA*", "ARA*"):
+        assert agent.plan_path(algorithm, (0, 0), (8, 8)) == ([], 0), algorithm
@@ -0,0 +1,50 @@
+# test_search.py
+"""
+The open lists of the shared search core against a binary heap.
+
+A BucketQueue must pop exactly the entries a heap would, for any sequence
+that keeps priorities at or above the last popped one, including pushes far
+past its span and peeks between pushes.
+"""
+import heapq
+import random
+import pytest
+from search import BucketQueue, HeapQueue, make_queue
+
+
+@pytest.mark.parametrize("seed", range(40))
+@pytest.mark.parametrize("fifo", [True, False])
+def test_bucket_queue_pops_like_a_heap(seed, fifo):
+    rng = random.Random(seed)
+    span = rng.randint(1, 6)
+    queue, heap = BucketQueue(span, fifo=fifo), []
+    floor = 0  # Last popped priority; nothing lower may be pushed
+    for tiebreak in range(500):
+        if rng.random() < 0.6 or not heap:
+            entry = (floor + rng.randint(0, 3 * span), tiebreak, rng.randrange(1000))  # Steps past the span widen the circle
+            queue.push(entry)
+            heapq.heappush(heap, entry)
+        else:
+            assert queue.peek() == heap[0]
+            popped = queue.pop()
+            assert popped == heapq.heappop(heap)
+            floor = popped[0]
+        assert len(queue) == len(heap)
+    while heap:
+        assert queue.pop() == heapq.heappop(heap)
+
+
+def test_peek_does_not_skip_a_lower_push():
+    queue = BucketQueue(4)
+    queue.push((3, 0, 1))
+    assert queue.peek() == (3, 0, 1)
+    queue.push((1, 1, 2))  # Still at or above the last popped priority
+    assert queue.pop() == (1, 1, 2)
+    assert queue.pop() == (3, 0, 1)
+
+
+@pytest.mark.parametrize("max_cost, heuristic, expected", [
+    (1, False, BucketQueue), (9, False, BucketQueue), (1000, False, HeapQueue), (1, True, HeapQueue),
+])
+def test_make_queue_choice(max_cost, heuristic, expected):
+    assert isinstance(make_queue(max_cost, heuristic), expected)
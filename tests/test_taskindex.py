@@ -0,0 +1,77 @@
+# test_taskindex.py
+"""
+TaskIndex against brute-force scans over the task dictionary, through
+additions, removals and the bucket rebuilds they trigger.
+"""
+import random
+import pytest
+from taskindex import TaskIndex
+
+
+def manhattan(a, b):
+    """Manhattan distance between two (x, y) cells."""
+    return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+
+def brute_force(tasks, position, k, distance):
+    """The k reachable tasks closest by distance, ties in insertion order, like min() over the task dictionary."""
+    ranked = sorted((distance(location), order, location) for order, location in enumerate(tasks)
+                    if distance(location) is not None)
+    return [location for _, _, location in ranked[:k]]
+
+
+def random_tasks(rng, columns, rows, count):
+    """Distinct random task locations in random insertion order."""
+    cells = [(x, y) for x in range(columns) for y in range(rows)]
+    return rng.sample(cells, min(count, len(cells)))
+
+
+@pytest.mark.parametrize("seed", range(60))
+def test_nearest_matches_brute_force(seed):
+    rng = random.Random(seed)
+    columns, rows = rng.randint(1, 60), rng.randint(1, 60)
+    tasks = random_tasks(rng, columns, rows, rng.randint(1, 200))
+    index = TaskIndex(columns, rows, tasks)
+    remaining = list(tasks)
+    while remaining:
+        position = (rng.randrange(columns), rng.randrange(rows))
+        k = rng.choice([1, 1, 3, 10])
+        assert index.nearest(position, k) == brute_force(remaining, position, k, lambda task: manhattan(task, position))
+        removed = rng.choice(remaining)  # Tasks are completed one by one; the index rebuilds coarser buckets
+        remaining.remove(removed)
+        index.remove(removed)
+    assert index.nearest((0, 0)) == []
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_additions_keep_insertion_order_ties(seed):
+    rng = random.Random(seed)
+    columns, rows = rng.randint(1, 40), rng.randint(1, 40)
+    cells = random_tasks(rng, columns, rows, columns * rows)
+    index = TaskIndex(columns, rows, cells[:2])
+    for added in range(2, len(cells)):
+        index.add(cells[added])  # Many additions rebuild finer buckets
+        if added % 7 == 0:
+            position = (rng.randrange(columns), rng.randrange(rows))
+            expected = brute_force(cells[:added + 1], position, 4, lambda task: manhattan(task, position))
+            assert index.nearest(position, 4) == expected
+
+
+@pytest.mark.parametrize("seed", range(60))
+def test_nearest_by_matches_brute_force(seed):
+    rng = random.Random(seed)
+    columns, rows = rng.randint(1, 50), rng.randint(1, 50)
+    tasks = random_tasks(rng, columns, rows, rng.randint(1, 150))
+    detour = {task: rng.choice([None, 0, 0, 2, 7, 30]) for task in tasks}  # None marks an unreachable task
+    index = TaskIndex(columns, rows, tasks)
+    for _ in range(10):
+        position = (rng.randrange(columns), rng.randrange(rows))
+
+
+        def distance(task):
+            """A true distance never below the Manhattan distance, as a path length would be."""
+            return None if detour[task] is None else manhattan(task, position) + detour[task]
+
+
+        k = rng.choice([1, 2, 5])
+        assert index.nearest_by(position, distance, k) == brute_force(tasks, position, k, distance)
@@ -0,0 +1,356 @@
+# tour.py
+"""
+Multi-goal tour planning for the Agent.
+
+A distance field is computed once per task with a breadth-first search from the
+task, which gives the obstacle-aware distance from the surrounding cells to that
+task. The fields are cached and combined into a distance matrix between the
+agent and all tasks, the visiting order is optimized with nearest neighbour,
+2-opt and Or-opt, and each leg of the route is read off the target's field
+without a new search.
+"""
+from array import array  # Compact per-cell distance fields
+from collections import deque  # FIFO queue for the breadth-first search
+from search import SearchSpace, best_first_search, record_search  # A* for legs outside the cached fields
+
+
+UNREACHABLE = -1  # Distance stored for cells that cannot reach the source
+
+
+class DistanceField:
+    """
+    Distances from every cell to one source cell, computed with a breadth-first search.
+
+    The search can stop early once enough target cells are labelled. Every cell
+    closer to the source than ``radius`` is labelled by then, so the path from any
+    labelled cell can still be read off the partial field.
+    """
+
+    def __init__(self, environment, source, targets=None, limit=None, stats=None):
+        """
+        Run the breadth-first search from the source.
+
+        Args:
+            environment (Environment): The environment providing the grid.
+            source (tuple): The (x, y) location the distances are measured to.
+            targets (dict): Optional map of cell id to a key; the search stops once cells with
+                ``limit`` distinct keys are labelled.
+            limit (int): The number of distinct target keys to label before stopping; by default every
+                target key, or the whole reachable grid without targets.
+            stats (dict): Optional counters from search.new_stats, updated with record_search.
+        """
+        self.environment = environment  # The environment the field belongs to
+        self.source = source  # The (x, y) location the distances are measured to
+        grid, offsets = environment.grid, environment.neighbor_offsets
+        distances = array("i", [UNREACHABLE]) * len(grid)
+        origin = environment.cell_id(*source)
+        distances[origin] = 0
+        targets = targets or {}
+        found = {targets[origin]} if origin in targets else set()  # Target keys labelled so far
+        if limit is None and targets:
+            limit = len(set(targets.values()))
+        queue = deque([origin])
+        expanded = pushes = distance = frontier = 0  # Cells expanded and queued, last distance labelled, largest queue
+        while queue and (limit is None or len(found) < limit):
+            if len(queue) > frontier:
+                frontier = len(queue)
+            current = queue.popleft()
+            expanded += 1
+            distance = distances[current] + 1  # Every move costs 1
+            for offset in offsets:
+                neighbor = current + offset
+                if not grid[neighbor] and distances[neighbor] == UNREACHABLE:
+                    distances[neighbor] = distance
+                    queue.append(neighbor)
+                    pushes += 1
+                    if neighbor in targets:
+                        found.add(targets[neighbor])
+        if stats is not None:
+            record_search(stats, expanded, pushes, frontier=frontier)
+        self.distances = distances  # Distance of each cell id, UNREACHABLE where unknown
+        self.complete = not queue  # True if every reachable cell is labelled
+        self.radius = distance  # Unlabelled cells are at least this far away
+
+
+    def distance(self, cell):
+        """
+        Return the distance from a cell to the source.
+
+        The agent may stand on a barrier (the start is not kept free), which the
+        search never labels, so such a cell is measured through its neighbors.
+
+        Returns:
+            int: The distance, UNREACHABLE if there is no path, or None if the
+            partial field does not cover the cell.
+        """
+        grid, distances = self.environment.grid, self.distances
+        if grid[cell]:
+            labelled = [distances[cell + offset] for offset in self.environment.neighbor_offsets
+                        if not grid[cell + offset] and distances[cell + offset] != UNREACHABLE]
+            distance = min(labelled) + 1 if labelled else UNREACHABLE
+        else:
+            distance = distances[cell]
+        if distance == UNREACHABLE and not self.complete:
+            return None
+        return distance
+
+
+def route_cost(matrix, route):
+    """Return the cost of visiting the matrix indices in route order."""
+    return sum(matrix[a][b] for a, b in zip(route, route[1:]))
+
+
+def nearest_neighbour_route(matrix):
+    """
+    Build an open route from index 0 by always visiting the closest unvisited index.
+
+    Args:
+        matrix (list): Square matrix of distances between the route indices.
+
+    Returns:
+        list: The route as matrix indices, starting with 0.
+    """
+    unvisited = set(range(1, len(matrix)))
+    route = [0]
+    while unvisited:
+        row = matrix[route[-1]]
+        nearest = min(unvisited, key=lambda index: (row[index], index))
+        unvisited.remove(nearest)
+        route.append(nearest)
+    return route
+
+
+def two_opt(matrix, route):
+    """
+    Improve an open route by reversing segments until no reversal shortens it.
+
+    The first index stays fixed because it is the agent's position.
+
+    Args:
+        matrix (list): Square matrix of distances between the route indices.
+        route (list): The route to improve in place.
+
+    Returns:
+        list: The improved route.
+    """
+    last = len(route) - 1
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, last):
+            for j in range(i + 1, last + 1):
+                a, b, c = route[i - 1], route[i], route[j]
+                before = matrix[a][b]  # Edges removed by reversing route[i..j]
+                after = matrix[a][c]  # Edges added by reversing route[i..j]
+                if j < last:
+                    d = route[j + 1]
+                    before += matrix[c][d]
+                    after += matrix[b][d]
+                if after < before:
+                    route[i:j + 1] = route[i:j + 1][::-1]
+                    improved = True
+    return route
+
+
+def or_opt(matrix, route, max_segment=3):
+    """
+    Improve an open route by moving short segments, possibly reversed, to a cheaper position.
+
+    Args:
+        matrix (list): Square matrix of distances between the route indices.
+        route (list): The route to improve in place.
+        max_segment (int): The longest segment that is moved.
+
+    Returns:
+        list: The improved route.
+    """
+    improved = True
+    while improved:
+        improved = False
+        for length in range(1, max_segment + 1):
+            for i in range(1, len(route) - length + 1):
+                segment = route[i:i + length]
+                before, after = route[i - 1], route[i + length] if i + length < len(route) else None
+                saved = matrix[before][segment[0]]  # Cost saved by cutting the segment out
+                if after is not None:
+                    saved += matrix[segment[-1]][after] - matrix[before][after]
+                rest = route[:i] + route[i + length:]
+                for j in range(1, len(rest) + 1):
+                    if j == i:
+                        continue  # The segment's current position
+                    a, b = rest[j - 1], rest[j] if j < len(rest) else None
+                    for candidate in (segment, segment[::-1]):
+                        added = matrix[a][candidate[0]]  # Cost added by inserting between a and b
+                        if b is not None:
+                            added += matrix[candidate[-1]][b] - matrix[a][b]
+                        if added < saved:
+                            route[:] = rest[:j] + candidate + rest[j:]
+                            improved = True
+                            break
+                    if improved:
+                        break
+                if improved:
+                    break
+            if improved:
+                break
+    return route
+
+
+class TourPlanner:
+    """Plans the order in which the agent visits all tasks and the path of each leg."""
+
+    def __init__(self, environment, neighbours=3):
+        """
+        Create a tour planner for an environment.
+
+        Args:
+            environment (Environment): The environment whose tasks are toured.
+            neighbours (int): How many of the closest other points each task's search must reach
+                before it stops; None searches every pair exactly.
+        """
+        self.environment = environment  # The environment to plan in
+        self.neighbours = neighbours  # Exact distances per task; farther pairs use a lower bound
+        self.fields = {}  # Cached distance field of each task location
+        self.matrices = {}  # Cached distance matrices keyed by (start, tasks)
+        self.search_space = SearchSpace(len(environment.grid))  # Arrays for legs outside the cached fields
+        self._map_version = None  # Environment version the caches were built on
+
+
+    def _check_cache(self):
+        """Drop the cached fields and matrices if the barriers changed."""
+        if self._map_version != self.environment.version:
+            self.fields.clear()
+            self.matrices.clear()
+            self._map_version = self.environment.version
+
+
+    def distance_matrix(self, start, tasks, stats=None):
+        """
+        Return the obstacle-aware distance matrix between the start and the tasks.
+
+        Index 0 is the start and index i is tasks[i - 1]. Every task's search stops
+        once it reached its closest other points, so close pairs are exact while
+        the far pairs that a short tour never uses get a lower bound. Unreachable
+        pairs get a distance larger than any real route so the ordering moves them
+        to the end.
+
+        Args:
+            start (tuple): The (x, y) start location.
+            tasks (list): The (x, y) task locations.
+            stats (dict): Optional search counters passed to the distance fields.
+
+        Returns:
+            list: The square distance matrix as nested lists.
+        """
+        self._check_cache()
+        key = (start, tuple(tasks))
+        if key in self.matrices:
+            return self.matrices[key]
+
+
+        environment = self.environment
+        grid, offsets = environment.grid, environment.neighbor_offsets
+        points = [start] + list(tasks)
+        cells = [environment.cell_id(*point) for point in points]
+        targets = {}  # Free cell id -> point index; a blocked start is reached through its free neighbors
+        for index, cell in enumerate(cells):
+            for neighbor in [cell] if not grid[cell] else [cell + offset for offset in offsets]:
+                if not grid[neighbor]:
+                    targets.setdefault(neighbor, index)
+        limit = None if self.neighbours is None else self.neighbours + 1  # The task itself counts too
+        for task in tasks:
+            if task not in self.fields:
+                self.fields[task] = DistanceField(environment, task, targets, limit, stats)
+
+
+        unreachable = len(grid) * (len(points) + 1)  # Longer than any real route
+        matrix = [[0] * len(points) for _ in points]
+        for j in range(1, len(points)):
+            field = self.fields[points[j]]
+            for i in range(len(points)):
+                if i == j:
+                    continue
+                distance = field.distance(cells[i])
+                if distance is None and i > 0:
+                    distance = self.fields[points[i]].distance(cells[j])  # Distances are symmetric
+                if distance is None:  # Neither search got that far: use a lower bound
+                    (x1, y1), (x2, y2) = points[i], points[j]
+                    bound = max(field.radius, self.fields[points[i]].radius if i > 0 else 0)
+                    distance = max(abs(x1 - x2) + abs(y1 - y2), bound)
+                matrix[i][j] = unreachable if distance == UNREACHABLE else distance
+            matrix[j][0] = matrix[0][j]  # Never used, the route does not return to the start
+        self.matrices[key] = matrix
+        return matrix
+
+
+    def plan_order(self, start, tasks, stats=None):
+        """
+        Order the tasks to keep the total route short.
+
+        Args:
+            start (tuple): The (x, y) start location.
+            tasks (iterable): The (x, y) task locations.
+            stats (dict): Optional search counters passed to the distance fields.
+
+        Returns:
+            list: The task locations in visiting order.
+        """
+        tasks = sorted(tasks)  # Stable order so equal inputs share a cache entry
+        matrix = self.distance_matrix(start, tasks, stats)
+        route = or_opt(matrix, two_opt(matrix, nearest_neighbour_route(matrix)))
+        return [tasks[index - 1] for index in route[1:]]
+
+
+    def leg(self, start, target, stats=None):
+        """
+        Plan the path from the start to one task of the tour.
+
+        The path is read off the target's cached distance field by walking
+        downhill; only if the field does not reach the start is an A* search run.
+
+        Args:
+            start (tuple): The (x, y) start location.
+            target (tuple): The (x, y) task location.
+            stats (dict): Optional search counters.
+
+        Returns:
+            tuple: The path as a list of (x, y) positions excluding the start, and its cost.
+        """
+        self._check_cache()
+        environment = self.environment
+        if target not in self.fields:
+            self.fields[target] = DistanceField(environment, target, stats=stats)
+        field = self.fields[target]
+        current = environment.cell_id(*start)
+        cost = field.distance(current)
+        if cost is None:
+            return self._search(start, target, stats)
+        if cost == UNREACHABLE:
+            return [], 0  # No path found
+
+
+        path = []
+        distances = field.distances
+        for distance in range(cost - 1, -1, -1):
+            for offset in environment.neighbor_offsets:  # Neighbors in (x, y) order
+                if distances[current + offset] == distance:
+                    current += offset
+                    break
+            path.append(environment.cell_position(current))
+        return path, cost
+
+
+    def _search(self, start, target, stats):
+        """Plan a leg with A* when the target's field does not reach the start."""
+        stride = self.environment.stride
+        gx, gy = divmod(self.environment.cell_id(*target), stride)
+
+
+        def heuristic(cell):
+            """Manhattan distance to the target."""
+            x, y = divmod(cell, stride)
+            return abs(x - gx) + abs(y - gy)
+
+
+        return best_first_search(self.environment, self.search_space, start, [target], self.environment.grid,
+                                 heuristic=heuristic, stats=stats)